@@ -17,15 +17,20 @@ from utils.crawler_margin_trading import get_margin_trading
 from utils.etf import ezmoney_data, fhtrust_data
 from config.quick_filter_config import FILTER_CONDITIONS, get_latest_file
 
-# 這裡定義你的 GitHub 基地網址
-GITHUB_BASE_URL = "https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/cache/tw"
+from utils.kline_source import load_daily, load_period_bars
+from utils.cache.period_bars import OHLCV, price_view
+from utils.chart_data import (etf_action_styles, eps_metrics, growth_pct, kline_hover_text, ma_hover_text,
+                              parse_seasons, period_ticks, volume_colors, volume_hover_text)
+
+# 這裡定義你的 GitHub 基地網址 (data/cache 根目錄，市場子目錄由 load_daily 決定)
+GITHUB_BASE_URL = "https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/cache"
 from functools import lru_cache
 
 # 股價快取
 @lru_cache(maxsize=128)
 def cached_kline(stock_code):
     # 這裡放你之前寫好的 get_kline_data 邏輯 (只抓日線 Raw Data)
-    return get_kline_data(stock_code, "D")
+    return get_kline_data(stock_code)
 
 # 三大法人快取
 @lru_cache(maxsize=128)
@@ -106,7 +111,7 @@ def build_stock_tabs_content(stock_code: str, selected_tab: str, period: str = "
     # ========== 1. 技術面 ==========
     if selected_tab == "tab-tech":
         try:
-            df_k = get_kline_data(stock_code, period)
+            df_k = get_processed_kline(stock_code, period)
             return html.Div([
                 html.Div([
                     html.Label("選擇週期:", style={"marginRight": "10px", "fontWeight": "bold"}),
@@ -458,24 +463,18 @@ from functools import lru_cache  # 🆕 新增在檔案頂部
 
 
 # 🆕 加入本地記憶體快取 (最多存 32 檔股票，當天操作時秒開)
+#    快取鍵只有股票代號：日 / 週 / 月共用同一份日線，不會為了切週期重複下載
 @lru_cache(maxsize=32)
-def get_kline_data(stock_code: str, period_type: str) -> pd.DataFrame:
+def get_kline_data(stock_code: str) -> pd.DataFrame:
     """
-    從 GitHub 讀取資料，並加入本地記憶體快取以提升速度
+    取得日線 (Date 欄 + Open/High/Low/Close/Volume)
+    依序讀本地快取 -> HTTP 磁碟快取 -> GitHub，都沒有才改用 yfinance
     """
     pure_code = str(stock_code).split('.')[0]
     full_symbol = get_yahoo_symbol(pure_code)
-    file_name = f"{full_symbol.replace('.', '_')}.parquet"
-    file_url = f"{GITHUB_BASE_URL}/{file_name}"
 
-    df = None
-    # --- 策略 A: GitHub ---
-    try:
-        # 只有在快取失效或第一次執行時才會走到這
-        print(f"📡 [網路請求] 正在從 GitHub 下載: {file_name}")
-        df = pd.read_parquet(file_url, storage_options={"User-Agent": "pandas"})
-    except Exception as e:
-        print(f"⚠️ GitHub 載入失敗: {e}")
+    # --- 策略 A: 本地快取 / GitHub ---
+    df = load_daily(full_symbol, base_url=GITHUB_BASE_URL)
 
     # --- 策略 B: yfinance ---
     if df is None or df.empty:
@@ -486,7 +485,6 @@ def get_kline_data(stock_code: str, period_type: str) -> pd.DataFrame:
                 if isinstance(df_raw.columns, pd.MultiIndex):
                     df_raw.columns = [c[0] for c in df_raw.columns]
                 df = df_raw.dropna()
-                df.index.name = 'Date'
         except Exception as e:
             print(f"❌ 全部失敗: {e}")
 
@@ -496,6 +494,7 @@ def get_kline_data(stock_code: str, period_type: str) -> pd.DataFrame:
     # 標準化與日期處理
     df.columns = [c.capitalize() if c.lower() in ['open', 'high', 'low', 'close', 'volume'] else c for c in df.columns]
     if 'Date' not in df.columns:
+        df.index.name = 'Date'
         df = df.reset_index()
     df['Date'] = pd.to_datetime(df['Date'])
 
@@ -507,15 +506,14 @@ def get_kline_data(stock_code: str, period_type: str) -> pd.DataFrame:
 # 🆕 新增一個輔助函數來處理週期，避免污染快取
 def get_processed_kline(stock_code: str, period_type: str) -> pd.DataFrame:
     # 從快取取得日線 (這步現在會非常快)
-    df = get_kline_data(stock_code, period_type).copy()
+    df = get_kline_data(stock_code)
 
     if period_type in ["W", "M"]:
-        df.set_index('Date', inplace=True)
-        rule = 'W' if period_type == "W" else 'ME'
-        df = df.resample(rule).agg({
-            'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
-        }).dropna().reset_index()
-    return df
+        # 與桌面版 K 線圖相同：週五 / 月底為界，最後一根標在實際最後交易日 (沿用本地預先聚合的週 / 月 K)
+        full_symbol = get_yahoo_symbol(str(stock_code).split('.')[0])
+        bars = load_period_bars(full_symbol, period_type, df.set_index('Date')[list(OHLCV)])
+        return price_view(bars).rename_axis('Date').reset_index()
+    return df.copy()
 # 技術面 K 線圖表
 # ==================================================
 def build_chart(df, stock_code, period_type):
@@ -535,24 +533,12 @@ def build_chart(df, stock_code, period_type):
     df['漲跌'] = df['Close'] - df['Close'].shift(1)
     df['漲跌'] = df['漲跌'].fillna(0)  # 第一筆沒有前一日，設為0
 
-    vol_colors = [
-        "red" if i > 0 and df.Close.iloc[i] > df.Close.iloc[i - 1] else
-        "green" if i > 0 and df.Close.iloc[i] < df.Close.iloc[i - 1] else
-        "lightgray" for i in range(len(df))
-    ]
+    vol_colors = volume_colors(df['Close'])
 
     fig = go.Figure()
 
-    # K線 - 自訂完整 hover 資訊
-    hover_text = []
-    for i, row in df.iterrows():
-        text = (f"日期: {row['Date'].strftime('%Y-%m-%d')}<br>"
-                f"開: {row['Open']:.2f}<br>"
-                f"高: {row['High']:.2f}<br>"
-                f"低: {row['Low']:.2f}<br>"
-                f"收: {row['Close']:.2f}<br>"
-                f"漲跌: {row['漲跌']:+.2f}")
-        hover_text.append(text)
+    # K線 - 自訂完整 hover 資訊 (整欄組字串，不逐列 iterrows)
+    hover_text = kline_hover_text(df, df['漲跌'])
 
     fig.add_trace(go.Candlestick(
         x=x,
@@ -571,10 +557,7 @@ def build_chart(df, stock_code, period_type):
     max_vol = df.Volume.max()
 
     # 成交量 - 加入日期
-    vol_hover_text = []
-    for i, row in df.iterrows():
-        text = (f"成交量: {row['Volume']:,.0f}")
-        vol_hover_text.append(text)
+    vol_hover_text = volume_hover_text(df['Volume'])
 
     fig.add_trace(go.Bar(
         x=x,
@@ -599,58 +582,18 @@ def build_chart(df, stock_code, period_type):
         if len(df) >= p:
             ma_values = df.Close.rolling(p).mean()
 
-            # 均線 hover - 加入日期
-            ma_hover_text = []
-            for i, row in df.iterrows():
-                val = ma_values.iloc[i]
-                if pd.notna(val):
-                    text = (f"{ma}: {val:.2f}")
-                else:
-                    text = ""
-                ma_hover_text.append(text)
-
             fig.add_trace(go.Scatter(
                 x=x,
                 y=ma_values,
                 mode="lines",
                 line=dict(width=1),
                 name=ma,
-                text=ma_hover_text,
+                text=ma_hover_text(ma, ma_values),
                 hoverinfo="text"
             ))
 
-    # 設定 X 軸日期顯示
-    if period_type == "D":
-        tickvals = []
-        ticktext = []
-        current_month = None
-        for i, date in enumerate(df['Date']):
-            if date.month != current_month:
-                tickvals.append(i)
-                ticktext.append(date.strftime('%Y-%m'))
-                current_month = date.month
-
-    elif period_type == "W":
-        tickvals = []
-        ticktext = []
-        last_quarter = None
-        for i, date in enumerate(df['Date']):
-            quarter = (date.month - 1) // 3
-            year_quarter = (date.year, quarter)
-            if year_quarter != last_quarter and quarter % 1 == 0:
-                tickvals.append(i)
-                ticktext.append(date.strftime('%Y-%m'))
-                last_quarter = year_quarter
-
-    else:
-        tickvals = []
-        ticktext = []
-        current_year = None
-        for i, date in enumerate(df['Date']):
-            if date.year != current_year:
-                tickvals.append(i)
-                ticktext.append(date.strftime('%Y'))
-                current_year = date.year
+    # 設定 X 軸日期顯示：日線每月、週線每季、月線每年標一個刻度
+    tickvals, ticktext = period_ticks(df['Date'], period_type)
 
     # 圖表配置
     fig.update_layout(
@@ -911,7 +854,7 @@ def build_fa_price_chart(df_fa, stock_code):
 
     # 固定取得日線資料
     try:
-        df_k_daily = get_kline_data(stock_code, "D")
+        df_k_daily = get_kline_data(stock_code)
     except Exception as e:
         # 如果無法取得日線，返回錯誤圖表
         fig = go.Figure()
@@ -1348,40 +1291,13 @@ def build_etf_special_actions_section(df_diff):
     # 🔴 關鍵修正：重設 index，對齊 DataTable row_index
     df_special = df_special.reset_index(drop=True)
 
-    df_special['shares_today_fmt'] = df_special['shares_today'].apply(lambda x: f"{x:,.0f}")
-    df_special['shares_yesterday_fmt'] = df_special['shares_yesterday'].apply(lambda x: f"{x:,.0f}")
-    df_special['shares_change_fmt'] = df_special['shares_change'].apply(lambda x: f"{x:+,.0f}")
-    df_special['change_pct_fmt'] = df_special['change_pct'].apply(lambda x: f"{x:+.2f}%")
+    df_special['shares_today_fmt'] = df_special['shares_today'].map('{:,.0f}'.format)
+    df_special['shares_yesterday_fmt'] = df_special['shares_yesterday'].map('{:,.0f}'.format)
+    df_special['shares_change_fmt'] = df_special['shares_change'].map('{:+,.0f}'.format)
+    df_special['change_pct_fmt'] = df_special['change_pct'].map('{:+.2f}%'.format)
 
-    style_conditional = []
-
-    for i, row in df_special.iterrows():
-        action = str(row['action_type']).strip()
-
-        if '新買入' in action:
-            bg, fg = "white", "red"
-        elif '完全賣出' in action:
-            bg, fg = "black", "white"
-        elif '大幅增持' in action:
-            bg, fg = "red", "yellow"
-        elif '顯著增持' in action:
-            bg, fg = "#ffb1b1", "black"
-        elif '大幅減持' in action:
-            bg, fg = "green", "white"
-        elif '顯著減持' in action:
-            bg, fg = "#b1ffb1", "black"
-        else:
-            continue
-
-        style_conditional.append({
-            "if": {
-                "row_index": i,
-                "column_id": "action_type"
-            },
-            "backgroundColor": bg,
-            "color": fg,
-            "fontWeight": "bold"
-        })
+    # 依動作類型關鍵字上色 (先命中者優先)
+    style_conditional = etf_action_styles(df_special['action_type'])
 
     table = dash_table.DataTable(
         columns=[
@@ -1605,19 +1521,19 @@ def build_etf_holdings_table(df_latest):
     df_table = df_table.sort_values(by='weight', ascending=False).reset_index(drop=True)
 
     # 格式化顯示
-    df_table['shares'] = df_table['shares'].apply(lambda x: f"{x:,.0f}")
-    df_table['weight'] = df_table['weight'].apply(lambda x: f"{x:.2f}%")
+    df_table['shares'] = df_table['shares'].map('{:,.0f}'.format)
+    df_table['weight'] = df_table['weight'].map('{:.2f}%'.format)
+    df_table['rank'] = range(1, len(df_table) + 1)
 
     # Top 10 樣式
-    style_conditional = []
-
-    for i in range(len(df_table)):
-        if i < 10:
-            style_conditional.append({
-                "if": {"row_index": i},
-                "backgroundColor": "rgba(52, 152, 219, 0.15)",  # 淡藍色
-                "fontWeight": "bold"
-            })
+    style_conditional = [
+        {
+            "if": {"row_index": i},
+            "backgroundColor": "rgba(52, 152, 219, 0.15)",  # 淡藍色
+            "fontWeight": "bold"
+        }
+        for i in range(min(10, len(df_table)))
+    ]
 
     return dash_table.DataTable(
         columns=[
@@ -1627,16 +1543,7 @@ def build_etf_holdings_table(df_latest):
             {"name": "持股股數", "id": "shares"},
             {"name": "持股權重", "id": "weight"},
         ],
-        data=[
-            {
-                "rank": i + 1,
-                "stock_code": row["stock_code"],
-                "stock_name": row["stock_name"],
-                "shares": row["shares"],
-                "weight": row["weight"]
-            }
-            for i, row in df_table.iterrows()
-        ],
+        data=df_table[["rank", "stock_code", "stock_name", "shares", "weight"]].to_dict("records"),
         page_size=15,
         style_table={"overflowX": "auto"},
         style_cell={
@@ -1886,33 +1793,7 @@ def build_eps_chart(stock_code, view_type="quarter", n_quarters=12):
     df = df[::-1].reset_index(drop=True)  # 舊 → 新
 
     # 解析年份和季度
-    def parse_season(season_str):
-        import re
-        season_str = str(season_str).strip()
-
-        match = re.search(r'(\d{4})[\-\s]*Q?(\d)', season_str)
-        if match:
-            return int(match.group(1)), int(match.group(2))
-
-        match = re.search(r'(\d{2,3})\.(\d)', season_str)
-        if match:
-            return int(match.group(1)) + 1911, int(match.group(2))
-
-        match = re.search(r'(\d{3})(\d{2})', season_str)
-        if match:
-            year = int(match.group(1)) + 1911
-            month = int(match.group(2))
-            quarter = (month - 1) // 3 + 1
-            return year, quarter
-
-        return None, None
-
-    df["年"] = None
-    df["季"] = None
-    for i, row in df.iterrows():
-        year, quarter = parse_season(row["季別"])
-        df.loc[i, "年"] = year
-        df.loc[i, "季"] = quarter
+    df[["年", "季"]] = parse_seasons(df["季別"])
 
     df = df[df["年"].notna()].copy().reset_index(drop=True)
     df["年"] = df["年"].astype(int)
@@ -1933,42 +1814,8 @@ def build_eps_chart(stock_code, view_type="quarter", n_quarters=12):
         return fig, None
 
     # ========== 計算各項指標 ==========
-    # 1. 季增率（QoQ）
-    df["季增率"] = None
-    for i in range(1, len(df)):
-        eps_prev = df.iloc[i - 1]["EPS"]
-        eps_curr = df.iloc[i]["EPS"]
-        if eps_prev != 0:
-            df.loc[i, "季增率"] = (eps_curr - eps_prev) / abs(eps_prev) * 100
-
-    # 2. 年增率（YoY）
-    df["年增率"] = None
-    for i in range(4, len(df)):
-        eps_prev = df.iloc[i - 4]["EPS"]
-        eps_curr = df.iloc[i]["EPS"]
-        if eps_prev != 0:
-            df.loc[i, "年增率"] = (eps_curr - eps_prev) / abs(eps_prev) * 100
-
-    # 3. 累計 EPS
-    df["累計EPS"] = 0.0
-    for year in df["年"].unique():
-        year_data = df[df["年"] == year]
-        for idx in year_data.index:
-            quarter = df.loc[idx, "季"]
-            cumulative = df[(df["年"] == year) & (df["季"] <= quarter)]["EPS"].sum()
-            df.loc[idx, "累計EPS"] = cumulative
-
-    # 4. 累計年增率
-    df["累計年增率"] = None
-    for i, row in df.iterrows():
-        year, quarter = row["年"], row["季"]
-        cum_current = row["累計EPS"]
-
-        last_year_same_q = df[(df["年"] == year - 1) & (df["季"] == quarter)]
-        if not last_year_same_q.empty:
-            cum_last_year = last_year_same_q.iloc[0]["累計EPS"]
-            if cum_last_year != 0:
-                df.loc[i, "累計年增率"] = (cum_current - cum_last_year) / abs(cum_last_year) * 100
+    # 季增率（QoQ）/ 年增率（YoY）/ 累計 EPS / 累計年增率
+    df = eps_metrics(df)
 
     # ========== 根據 view_type 準備資料和圖表 ==========
     fig = go.Figure()
@@ -2056,12 +1903,7 @@ def build_eps_chart(stock_code, view_type="quarter", n_quarters=12):
         df_yearly = df_yearly.tail(5).copy().reset_index(drop=True)
 
         # 計算年度年增率
-        df_yearly["年度年增率"] = None
-        for i in range(1, len(df_yearly)):
-            eps_prev = df_yearly.iloc[i - 1]["累計EPS"]
-            eps_curr = df_yearly.iloc[i]["累計EPS"]
-            if eps_prev != 0:
-                df_yearly.loc[i, "年度年增率"] = (eps_curr - eps_prev) / abs(eps_prev) * 100
+        df_yearly["年度年增率"] = growth_pct(df_yearly["累計EPS"], df_yearly["累計EPS"].shift(1))
 
         df_view = df_yearly
         df_table = df_yearly[::-1].copy().reset_index(drop=True)
@@ -2153,34 +1995,8 @@ def build_eps_section(stock_code, view_type="quarter", n_quarters=12):
 
             if not df_full.empty and "EPS" in df_full.columns:
                 # 解析季別
-                def parse_season(season_str):
-                    import re
-                    season_str = str(season_str).strip()
-
-                    match = re.search(r'(\d{4})[\-\s]*Q?(\d)', season_str)
-                    if match:
-                        return int(match.group(1)), int(match.group(2))
-
-                    match = re.search(r'(\d{2,3})\.(\d)', season_str)
-                    if match:
-                        return int(match.group(1)) + 1911, int(match.group(2))
-
-                    match = re.search(r'(\d{3})(\d{2})', season_str)
-                    if match:
-                        year = int(match.group(1)) + 1911
-                        month = int(match.group(2))
-                        quarter = (month - 1) // 3 + 1
-                        return year, quarter
-
-                    return None, None
-
                 df_full = df_full.copy()
-                df_full["年"] = None
-                df_full["季"] = None
-                for i, row in df_full.iterrows():
-                    year, quarter = parse_season(row["季別"])
-                    df_full.loc[i, "年"] = year
-                    df_full.loc[i, "季"] = quarter
+                df_full[["年", "季"]] = parse_seasons(df_full["季別"])
 
                 df_full = df_full[df_full["年"].notna()].copy().reset_index(drop=True)
                 df_full = df_full[::-1].reset_index(drop=True)  # 舊 → 新
@@ -2526,7 +2342,7 @@ def build_margin_chart(df_margin, stock_code):
         return None
     # ✅ 取得對應期間的日線資料
     try:
-        df_k_daily = get_kline_data(stock_code, "D")
+        df_k_daily = get_kline_data(stock_code)
         df_k_daily["Date"] = pd.to_datetime(df_k_daily["Date"])
 
         # 合併股價資料到資券資料
@@ -3456,7 +3272,7 @@ def show_stock_detail(selected_rows, table_data):
     # 🔄 重用戰情室的頁籤邏輯
     # 取得資料
     try:
-        df_k = get_kline_data(stock_code, "D")
+        df_k = get_processed_kline(stock_code, "D")
     except:
         df_k = None
 
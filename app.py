@@ -2,25 +2,19 @@ import pandas as pd
 import plotly.graph_objects as go
 from dash import Dash, dcc, html, Input, Output
 
+from utils.kline_source import load_daily
+
 # --- 1. 設定基礎網址 ---
 # 請將這裡換成你的 GitHub 帳號與專案名
 GITHUB_BASE_URL = "https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/cache"
 
 
 def load_data_from_github(symbol):
-    """根據代號判斷市場並從 GitHub 讀取 Parquet"""
-    market = 'tw' if ('.TW' in symbol or '.TWO' in symbol) else 'us'
-    safe_name = symbol.replace('.', '_')
-    url = f"{GITHUB_BASE_URL}/{market}/{safe_name}.parquet"
-
-    try:
-        print(f"正在從雲端讀取: {url}")
-        # pandas 可以直接讀取網址
-        df = pd.read_parquet(url)
-        return df
-    except Exception as e:
-        print(f"讀取雲端資料失敗 ({symbol}): {e}")
-        return None
+    """根據代號讀取日線：本地快取優先，沒有才從 GitHub 讀取 Parquet (磁碟副本會重複使用)"""
+    df = load_daily(symbol, base_url=GITHUB_BASE_URL)
+    if df is None:
+        print(f"讀取資料失敗 ({symbol})")
+    return df
 
 
 # --- 2. 測試 Dash App ---
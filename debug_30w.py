@@ -4,6 +4,7 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+from utils.cache.period_bars import load_bars, price_view
 # 引入你的策略模組以取得設定
 from utils.strategies.technical import TechnicalStrategies
 
@@ -68,10 +69,7 @@ def debug_30w_interactive():
         return
 
     # 2. 轉換為週線
-    rule = 'W-FRI'
-    logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-    agg_dict = {k: v for k, v in logic.items() if k in df_source.columns}
-    df = df_source.resample(rule).agg(agg_dict).dropna()
+    df = price_view(load_bars(path, 'W', df_source, label_last=False))
 
     if len(df) < 35:
         print("❌ 資料筆數不足 35 週，無法計算 30W 均線。")
@@ -1,5 +1,10 @@
 import sys
 import os
+import importlib
+
+# 啟動剖析需在其他 import 之前開啟 (--trace-startup)
+from utils import startup_trace
+startup_trace.enable_from_argv()
 
 # 系統環境設定完畢後，再 import 你的自訂模組
 from pathlib import Path
@@ -9,7 +14,6 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PyQt6.QtCore import Qt, pyqtSignal,QTimer
 import traceback
 
-from modules.sector_dashboard import SectorDashboard
 from modules.ownership_module import OwnershipModule
 
 def exception_hook(exctype, value, tb):
@@ -33,9 +37,14 @@ from modules.institutional_module import InstitutionalModule
 from modules.margin_module import MarginModule
 from modules.eps_module import EPSModule
 from modules.ratio_module import RatioModule
-from modules.active_etf_module import ActiveETFModule
-from modules.strategy_module import StrategyModule
-from modules.settings_module import SettingsModule
+
+# 非戰情室分頁：第一次切換過去時才 import 並建立 (index -> 模組, 類別, 屬性名稱)
+LAZY_PAGES = {
+    1: ('modules.strategy_module', 'StrategyModule', 'strategy_page'),      # 選股
+    2: ('modules.active_etf_module', 'ActiveETFModule', 'market_page'),     # 市場
+    3: ('modules.settings_module', 'SettingsModule', 'settings_page'),      # 設定
+    4: ('modules.sector_dashboard', 'SectorDashboard', 'sector_dashboard'),  # 板塊輪動 (V9.0)
+}
 
 
 class SideMenu(QFrame):
@@ -133,7 +142,8 @@ class StockWarRoomV3(QMainWindow):
         self.current_stock_id = None
         self.current_stock_name = ""
 
-        self.init_ui()
+        with startup_trace.section("init_ui (戰情室)"):
+            self.init_ui()
         self.connect_signals()
 
         QTimer.singleShot(500, self.load_initial_data)
@@ -195,27 +205,62 @@ class StockWarRoomV3(QMainWindow):
 
         self.pages.addWidget(self.warroom_page)
 
-        # Page 1: 選股
-        self.strategy_page = StrategyModule()
-        self.pages.addWidget(self.strategy_page)
+        # Page 1~4：先放空白佔位，第一次切換時才建立 (見 _ensure_page)
+        for index, (_, _, attr) in sorted(LAZY_PAGES.items()):
+            setattr(self, attr, None)
+            self.pages.addWidget(QWidget())
 
-        # Page 2: 市場
-        self.market_page = ActiveETFModule()
-        self.pages.addWidget(self.market_page)
-
-        # Page 3: 設定
-        self.settings_page = SettingsModule()
-        self.pages.addWidget(self.settings_page)
+        main_layout.addWidget(self.pages)
 
-        # Page 4: 板塊輪動 (新增的 V9.0 模組)
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.sector_dashboard = SectorDashboard(project_root=current_dir)
-        self.pages.addWidget(self.sector_dashboard)
+    def _ensure_page(self, index):
+        """延遲建立分頁：import 模組、建立 widget、取代佔位並接上訊號"""
+        if index not in LAZY_PAGES: return
+        module_name, class_name, attr = LAZY_PAGES[index]
+        if getattr(self, attr) is not None: return
 
-        # 暫時隱藏雙擊切換功能，待 K 線引擎通暢後再來銜接
-        self.sector_dashboard.stock_double_clicked.connect(self.on_strategy_stock_clicked)
-        main_layout.addWidget(self.pages)
+        with startup_trace.section(f"建立分頁 {class_name}"):
+            cls = getattr(importlib.import_module(module_name), class_name)
+            if class_name == 'SectorDashboard':
+                page = cls(project_root=str(current_dir))
+            else:
+                page = cls()
+
+        placeholder = self.pages.widget(index)
+        current = self.pages.currentIndex()
+        self.pages.blockSignals(True)
+        self.pages.insertWidget(index, page)
+        self.pages.removeWidget(placeholder)
+        self.pages.setCurrentIndex(current)
+        self.pages.blockSignals(False)
+        placeholder.deleteLater()
+
+        setattr(self, attr, page)
+        self._connect_page_signals(index, page)
+
+    def _connect_page_signals(self, index, page):
+        if index == 1:
+            page.stock_clicked_signal.connect(self.on_strategy_stock_clicked)
+            page.request_add_watchlist.connect(self.on_add_watchlist_request)
+        elif index == 2:
+            page.stock_clicked_signal.connect(self.on_stock_changed)
+        elif index == 3:
+            page.data_updated.connect(self.on_data_updated)
+        elif index == 4:
+            # 暫時隱藏雙擊切換功能，待 K 線引擎通暢後再來銜接
+            page.stock_double_clicked.connect(self.on_strategy_stock_clicked)
+
+    def show_page(self, index):
+        self._ensure_page(index)
+        self.pages.setCurrentIndex(index)
+
+    def on_data_updated(self):
+        """設定頁更新完成：已建立的分頁重新載入 (尚未建立的分頁建立時自然會讀到最新資料)"""
+        # 1. 板塊戰情室重新載入硬碟最新資料
+        if self.sector_dashboard is not None:
+            self.sector_dashboard.reload_dashboard()
+        # 2. 策略大表也無縫自動刷新 (假設 StrategyModule 有 load_data 函式)
+        if self.strategy_page is not None and hasattr(self.strategy_page, 'load_data'):
+            self.strategy_page.load_data()
 
     def _create_tab_widget(self):
         tabs = QTabWidget()
@@ -233,25 +278,16 @@ class StockWarRoomV3(QMainWindow):
         return tabs
 
     def connect_signals(self):
-        self.side_menu.menu_selected.connect(self.pages.setCurrentIndex)
+        self.side_menu.menu_selected.connect(self.show_page)
         self.pages.currentChanged.connect(self.on_page_changed)
 
         self.list_module.stock_selected.connect(self.on_stock_changed)
-        self.market_page.stock_clicked_signal.connect(self.on_stock_changed)
-        self.strategy_page.stock_clicked_signal.connect(self.on_strategy_stock_clicked)
-        self.strategy_page.request_add_watchlist.connect(self.on_add_watchlist_request)
         # 👇 新增這行，接通 K 線模組的加入清單訊號！
         self.kline_module.request_add_watchlist.connect(self.on_add_watchlist_request)
-
-        # 👇👇👇 在這裡加上這兩段 👇👇👇
-        # 1. 綁定板塊戰情室：當設定頁更新完成，立刻通知板塊戰情室重新載入硬碟最新資料
-        self.settings_page.data_updated.connect(self.sector_dashboard.reload_dashboard)
-
-        # 2. 順便綁定策略選股頁面：讓策略大表也能無縫自動刷新 (假設 StrategyModule 有 load_data 函式)
-        if hasattr(self.strategy_page, 'load_data'):
-            self.settings_page.data_updated.connect(self.strategy_page.load_data)
+        # 其餘分頁的訊號在 _connect_page_signals 中於建立時接上
 
     def on_page_changed(self, index):
+        self._ensure_page(index)
         if index == 0:
             self.list_module.refresh_table()
             if self.current_stock_id:
@@ -353,6 +389,9 @@ class StockWarRoomV3(QMainWindow):
 if __name__ == "__main__":
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
     app = QApplication(sys.argv)
-    window = StockWarRoomV3()
+    with startup_trace.section("StockWarRoomV3()"):
+        window = StockWarRoomV3()
     window.showMaximized()
+    # 事件迴圈第一次空閒 = 視窗已完成首次繪製
+    QTimer.singleShot(0, startup_trace.report)
     sys.exit(app.exec())
\ No newline at end of file
@@ -2,8 +2,6 @@ import sys
 import json
 import pandas as pd
 import numpy as np
-from io import StringIO
-import requests
 from pathlib import Path
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox,
                              QLabel, QTableWidget, QTableWidgetItem, QFrame,
@@ -22,6 +20,9 @@ import matplotlib.gridspec as gridspec
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+from utils.etf import holdings_diff, holdings_store
+from utils.cache.price_table import get_price_table
+
 plt.style.use('dark_background')
 plt.rcParams['font.sans-serif'] = ['Microsoft JhengHei', 'SimHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
@@ -76,6 +77,12 @@ TABLE_STYLE = f"""
     }}
 """
 
+# 資金流向面板的動作標籤 (交給 holdings_diff 統一判斷)
+ETF_ACTION_LABELS = {
+    'new': '★新買入', 'exit': '●清空', 'big_add': '▲大增', 'big_cut': '▼大減',
+    'add': '△增持', 'cut': '▽減持', 'none': '',
+}
+
 PANEL_STYLE = f"background: {BG_PANEL}; border-radius: 8px; border: 1px solid {BORDER};"
 
 
@@ -133,29 +140,15 @@ class ETFDataWorker(QThread):
         self.provider = provider
 
     def run(self):
-        url = f"https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/clean/{self.provider}/{self.etf_id}.csv"
-        lp = Path(f"data/clean/{self.provider}/{self.etf_id}.csv")
-        df = pd.DataFrame()
-        try:
-            r = requests.get(url, timeout=10)
-            df = pd.read_csv(StringIO(r.text)) if r.status_code == 200 else (pd.read_csv(lp) if lp.exists() else df)
-        except:
-            if lp.exists(): df = pd.read_csv(lp)
-        self.data_fetched.emit(self._norm(df) if not df.empty else df, self.etf_id)
-
-    def _norm(self, df):
-        df.columns = [c.lower().strip() for c in df.columns]
-        rm = {}
-        if 'stock_code' in df.columns: rm['stock_code'] = 'stock_id'
-        if 'code' in df.columns: rm['code'] = 'stock_id'
-        if 'stock_name' in df.columns: rm['stock_name'] = 'name'
-        if rm: df.rename(columns=rm, inplace=True)
-        for col in ['shares', 'weight']:
-            if col in df.columns and df[col].dtype == 'object':
-                df[col] = pd.to_numeric(df[col].str.replace(',', '').str.replace('%', ''), errors='coerce')
-        if 'stock_id' in df.columns:
-            df['stock_id'] = df['stock_id'].astype(str).str.replace('.TW', '', regex=False).str.replace('.TWO', '',regex=False).str.strip()
-        return df
+        # 本地優先：直接用記憶體 / parquet 快取，不等網路
+        df = holdings_store.load_holdings(self.provider, self.etf_id)
+        if not df.empty:
+            self.data_fetched.emit(df, self.etf_id)
+
+        # 尚未驗證過的 ETF 才做條件式請求，雲端有更新時再推送一次
+        if holdings_store.sync_clean_csv(self.provider, self.etf_id, timeout=10) or df.empty:
+            df = holdings_store.load_holdings(self.provider, self.etf_id)
+            self.data_fetched.emit(df, self.etf_id)
 
 
 class MultiETFDataWorker(QThread):
@@ -168,32 +161,16 @@ class MultiETFDataWorker(QThread):
     def run(self):
         all_data = []
         for etf_id, (provider, _) in self.mapping.items():
-            url = f"https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/clean/{provider}/{etf_id}.csv"
-            lp = Path(f"data/clean/{provider}/{etf_id}.csv")
-            df = pd.DataFrame()
-            try:
-                r = requests.get(url, timeout=5)
-                df = pd.read_csv(StringIO(r.text)) if r.status_code == 200 else (pd.read_csv(lp) if lp.exists() else df)
-            except:
-                if lp.exists(): df = pd.read_csv(lp)
+            # 開啟模組時統一驗證一次，之後切換單檔 ETF 都落在驗證間隔內
+            holdings_store.sync_clean_csv(provider, etf_id)
+            df = holdings_store.load_holdings(provider, etf_id)
             if not df.empty:
-                df.columns = [c.lower().strip() for c in df.columns]
-                rm = {}
-                if 'stock_code' in df.columns: rm['stock_code'] = 'stock_id'
-                if 'code' in df.columns: rm['code'] = 'stock_id'
-                if 'stock_name' in df.columns: rm['stock_name'] = 'name'
-                if rm: df.rename(columns=rm, inplace=True)
-                for col in ['shares', 'weight']:
-                    if col in df.columns and df[col].dtype == 'object':
-                        df[col] = pd.to_numeric(df[col].str.replace(',', '').str.replace('%', ''), errors='coerce')
-                df['stock_id'] = df['stock_id'].astype(str)
                 df['etf_id'] = etf_id
-                if 'date' in df.columns: df['date'] = pd.to_datetime(df['date'])
                 all_data.append(df)
         self.multi_data_fetched.emit(pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame())
 
 class BatchPriceWorker(QThread):
-    price_data_fetched = pyqtSignal(dict, list, list)
+    price_data_fetched = pyqtSignal(dict, pd.DataFrame, pd.DataFrame)
 
     def __init__(self, stock_ids, market_map, consensus_changes, radar_changes):
         super().__init__()
@@ -203,30 +180,16 @@ class BatchPriceWorker(QThread):
         self.radar_changes = radar_changes
 
     def run(self):
+        empty = {'1d': 0.0, '3d': 0.0, '5d': 0.0, '10d': 0.0, '20d': 0.0}
+        symbols = {sid: f"{sid}_{self.market_map.get(str(sid), 'TW')}" for sid in self.stock_ids}
+        try:
+            table = get_price_table().lookup(symbols.values())
+        except Exception:
+            table = {}
         res = {}
-        for sid in self.stock_ids:
-            mkt = self.market_map.get(str(sid), "TW")
-            p = Path(f"data/cache/tw/{sid}_{mkt}.parquet")
-            res[sid] = {'1d': 0.0, '3d': 0.0, '5d': 0.0, '10d': 0.0, '20d': 0.0}
-            if p.exists():
-                try:
-                    df = pd.read_parquet(p)
-                    if not df.empty:
-                        df.index = pd.to_datetime(df.index)
-                        df = df.sort_index()
-                        col = 'close' if 'close' in df.columns else 'Close'
-                        if col in df.columns and len(df) >= 1:
-                            closes = df[col].values
-                            c_now = closes[-1]
-                            def safe_pct(idx):
-                                return (c_now / closes[idx] - 1) * 100 if len(closes) >= abs(idx) else 0.0
-                            res[sid] = {
-                                '1d': safe_pct(-2), '3d': safe_pct(-4),
-                                '5d': safe_pct(-6), '10d': safe_pct(-11),
-                                '20d': safe_pct(-21)
-                            }
-                except Exception:
-                    pass
+        for sid, sym in symbols.items():
+            row = table.get(sym)
+            res[sid] = {k: row[k] for k in empty} if row else dict(empty)
         self.price_data_fetched.emit(res, self.consensus_changes, self.radar_changes)
 # ─── 主程式 ──────────────────────────────────────────────
 
@@ -242,6 +205,7 @@ class ActiveETFModule(QWidget):
         self.industry_map = {}
         self.latest_data = pd.DataFrame()
         self.merged_data = pd.DataFrame()
+        self.diff_history = pd.DataFrame()
         self.multi_etf_df = pd.DataFrame()
         self._style_etf_data = {}   # cache for style page click interaction
         self._style_ind_colors = {}
@@ -1019,11 +983,7 @@ class ActiveETFModule(QWidget):
 
     def update_all_modules(self):
         if self.multi_etf_df.empty: return
-        df = self.multi_etf_df.copy()
-        etfs = list(self.mapping.keys())
-        etf_latest_stocks, etf_latest_df = {}, {}
-        all_changes, consensus_changes = [], []
-        stock_ids_to_fetch = set()
+        df = self.multi_etf_df
 
         # 每日進出動向的觀察區間（原有邏輯不變）
         tf_text = getattr(self, 'combo_radar_tf', None)
@@ -1037,45 +997,19 @@ class ActiveETFModule(QWidget):
         cons_tf_map = {"1日": 2, "3日": 4, "5日": 6, "20日": 21}
         consensus_period = cons_tf_map.get(cons_val, 4)
 
-        for etf in etfs:
-            sub = df[df['etf_id'] == etf]
-            dates = sorted(sub['date'].unique())
-            if not dates: continue
-            t0 = dates[-1]
-            df0 = sub[sub['date'] == t0]
-            etf_latest_stocks[etf] = set(df0['stock_id'])
-            etf_latest_df[etf] = df0
-
-            if len(dates) >= 2:
-                # 每日進出動向（原有邏輯）
-                r_idx = max(0, len(dates) - radar_period)
-                m_radar = pd.merge(df0, sub[sub['date'] == dates[r_idx]], on=['stock_id', 'name'],
-                                   suffixes=('_now', '_prev'), how='outer').fillna(0)
-                for _, r in m_radar.iterrows():
-                    diff = r['shares_now'] - r['shares_prev']
-                    if diff != 0:
-                        sid = str(r['stock_id'])
-                        all_changes.append({'etf': etf, 'stock_id': sid, 'name': str(r['name']),
-                                            'w_now': r['weight_now'], 'w_prev': r['weight_prev'],
-                                            's_now': r['shares_now'], 's_prev': r['shares_prev'],
-                                            's_diff': diff, 'w_diff': r['weight_now'] - r['weight_prev']})
-                        stock_ids_to_fetch.add(sid)
-
-                # ✅ 籌碼共識：改用動態 consensus_period，不再寫死 -4
-                c_idx = max(0, len(dates) - consensus_period)
-                m_cons = pd.merge(df0, sub[sub['date'] == dates[c_idx]], on=['stock_id', 'name'],
-                                  suffixes=('_now', '_prev'), how='outer').fillna(0)
-                for _, r in m_cons.iterrows():
-                    diff = r['shares_now'] - r['shares_prev']
-                    if diff != 0:
-                        sid = str(r['stock_id'])
-                        consensus_changes.append({'etf': etf, 'stock_id': sid, 'name': str(r['name']), 's_diff': diff})
-                        stock_ids_to_fetch.add(sid)
-
-        self._build_core_data(etf_latest_df)
+        # 所有 ETF 一次計算：各 ETF 最新持股、雷達區間變化、共識區間變化
+        latest = holdings_diff.latest_holdings(df)
+        radar_changes = holdings_diff.window_changes(df, radar_period)
+        consensus_changes = holdings_diff.window_changes(df, consensus_period)[['etf', 'stock_id', 'name', 's_diff']]
+        stock_ids_to_fetch = set(radar_changes['stock_id']) | set(consensus_changes['stock_id'])
+
+        etf_latest_df = {etf: sub for etf, sub in latest.groupby('etf_id', sort=False)}
+        etf_latest_df = {etf: etf_latest_df[etf] for etf in self.mapping if etf in etf_latest_df}
+
+        self._build_core_data(latest)
         self._build_style_data(etf_latest_df)
 
-        self.price_worker = BatchPriceWorker(stock_ids_to_fetch, self.stock_market_map, consensus_changes, all_changes)
+        self.price_worker = BatchPriceWorker(stock_ids_to_fetch, self.stock_market_map, consensus_changes, radar_changes)
         self.price_worker.price_data_fetched.connect(self._on_batch_price_done)
         self.price_worker.start()
 
@@ -1085,17 +1019,9 @@ class ActiveETFModule(QWidget):
 
     # ─── 模組1 資料 ──────────────────────────────────────
 
-    def _build_core_data(self, etf_latest_df):
-        s2e, s_nm, s_wt = {}, {}, {}
-        for etf, ddf in etf_latest_df.items():
-            for _, r in ddf.iterrows():
-                sid, nm, w = str(r['stock_id']), str(r['name']), r['weight']
-                if sid not in s2e: s2e[sid] = []; s_wt[sid] = 0
-                s2e[sid].append(etf); s_nm[sid] = nm; s_wt[sid] += w
-
-        core = [[sid, s_nm[sid], len(el), ", ".join(el), s_wt[sid]]
-                for sid, el in s2e.items() if len(el) >= 3]
-        core.sort(key=lambda x: x[4], reverse=True)
+    def _build_core_data(self, latest):
+        core_df = holdings_diff.core_holdings(latest, etf_order=list(self.mapping.keys()), min_count=3)
+        core = core_df[['stock_id', 'name', 'count', 'etfs', 'weight']].values.tolist()
 
         # 填表
         self.table_core.setRowCount(len(core))
@@ -1226,24 +1152,11 @@ class ActiveETFModule(QWidget):
         if hasattr(self, 'lbl_consensus_sell_hint'):
             self.lbl_consensus_sell_hint.setText(f"近{cons_val} 2家以上同步賣出")
 
-        buy_d, sell_d = {}, {}
-        for c in consensus_changes:
-            sid, nm, etf, diff = c['stock_id'], c['name'], c['etf'], c['s_diff']
-            if diff > 0:
-                if sid not in buy_d: buy_d[sid] = {'name': nm, 'etfs': [], 'tot': 0}
-                buy_d[sid]['etfs'].append(etf);
-                buy_d[sid]['tot'] += diff
-            elif diff < 0:
-                if sid not in sell_d: sell_d[sid] = {'name': nm, 'etfs': [], 'tot': 0}
-                sell_d[sid]['etfs'].append(etf);
-                sell_d[sid]['tot'] += diff
-
-        buy_list = [[k, v['name'], ", ".join(v['etfs']), v['tot'], prices_dict.get(k, {})]
-                    for k, v in buy_d.items() if len(v['etfs']) >= 2]
-        sell_list = [[k, v['name'], ", ".join(v['etfs']), v['tot'], prices_dict.get(k, {})]
-                     for k, v in sell_d.items() if len(v['etfs']) >= 2]
-        buy_list.sort(key=lambda x: x[3], reverse=True)
-        sell_list.sort(key=lambda x: x[3])
+        buy_df, sell_df = holdings_diff.consensus_summary(consensus_changes, min_etfs=2)
+        buy_list = [[k, nm, etfs, tot, prices_dict.get(k, {})]
+                    for k, nm, etfs, tot in buy_df[['stock_id', 'name', 'etfs', 'total']].itertuples(index=False)]
+        sell_list = [[k, nm, etfs, tot, prices_dict.get(k, {})]
+                     for k, nm, etfs, tot in sell_df[['stock_id', 'name', 'etfs', 'total']].itertuples(index=False)]
 
         self.lbl_buy_cnt.setText(f"加碼共識 {len(buy_list)} 檔")
         self.lbl_sell_cnt.setText(f"減碼共識 {len(sell_list)} 檔")
@@ -1371,24 +1284,20 @@ class ActiveETFModule(QWidget):
         p_map = {"每日": "1d", "近3日": "3d", "近5日": "5d", "近10日": "10d", "近20日": "20d"}
         p_key = p_map.get(tf_val, "1d")
 
-        new_list, out_list, chg_list = [], [], []
-        for c in all_changes:
-            sid = c['stock_id']
-            p_val = prices_dict.get(sid, {}).get(p_key, 0.0)
-            if c['s_prev'] == 0 and c['s_now'] > 0:
-                new_list.append([c['etf'], sid, c['name'], f"{c['w_now']:.2f}%"])
-            elif c['s_prev'] > 0 and c['s_now'] == 0:
-                out_list.append([c['etf'], sid, c['name'], f"{c['w_prev']:.2f}%"])
-            elif abs(c['s_diff']) > 0:
-                chg_list.append([c['etf'], sid, c['name'], c['s_diff'], c['w_diff'], p_val])
+        c = all_changes
+        is_new = (c['s_prev'] == 0) & (c['s_now'] > 0)
+        is_out = (c['s_prev'] > 0) & (c['s_now'] == 0)
+        new_df, out_df, chg_df = c[is_new], c[is_out], c[~is_new & ~is_out & (c['s_diff'] != 0)]
 
-        # 執行精密分流排序：右邊全呈現買的(多到少)，再接賣的(少到多)
-        buys = [x for x in chg_list if x[4] >= 0]
-        sells = [x for x in chg_list if x[4] < 0]
-        buys.sort(key=lambda x: x[4], reverse=True)
-        sells.sort(key=lambda x: x[4], reverse=True)
+        new_list = [[e, sid, nm, f"{w:.2f}%"]
+                    for e, sid, nm, w in new_df[['etf', 'stock_id', 'name', 'w_now']].itertuples(index=False)]
+        out_list = [[e, sid, nm, f"{w:.2f}%"]
+                    for e, sid, nm, w in out_df[['etf', 'stock_id', 'name', 'w_prev']].itertuples(index=False)]
 
-        ordered_chg_list = buys + sells
+        # 執行精密分流排序：右邊全呈現買的(多到少)，再接賣的(少到多)
+        chg_df = chg_df.assign(p_val=chg_df['stock_id'].map(lambda sid: prices_dict.get(sid, {}).get(p_key, 0.0)))
+        chg_df = chg_df.sort_values('w_diff', ascending=False, kind='stable')
+        ordered_chg_list = chg_df[['etf', 'stock_id', 'name', 's_diff', 'w_diff', 'p_val']].values.tolist()
 
         self._fill_simple_table(self.table_new, new_list, RED)
         self._fill_simple_table(self.table_out, out_list, TEXT_SEC)
@@ -1558,60 +1467,35 @@ class ActiveETFModule(QWidget):
         self.load_watchlists_to_combo()
 
         if len(dates) >= 2:
-            self.merged_data = pd.merge(
-                self.latest_data, df[df['date'] == dates[-2]],
-                on=['stock_id', 'name'], suffixes=('_now', '_prev'), how='outer').fillna(0)
-            self.merged_data['share_diff'] = self.merged_data['shares_now'] - self.merged_data['shares_prev']
-            self.merged_data['pct_change'] = self.merged_data.apply(
-                lambda r: (r['share_diff'] / r['shares_prev'] * 100) if r['shares_prev'] > 0 else 0, axis=1)
-
-            def ca(r):
-                y, t, p = r['shares_prev'], r['shares_now'], r['pct_change']
-                if y == 0 and t > 0: return '★新買入'
-                if y > 0 and t == 0: return '●清空'
-                if p >= 50:  return '▲大增'
-                if p <= -50: return '▼大減'
-                if 10 <= p < 50:   return '△增持'
-                if -50 < p <= -10: return '▽減持'
-                return None
-
-            self.merged_data['action_type'] = self.merged_data.apply(ca, axis=1)
+            # 一次算出所有相鄰日期的差異，最新一組即為資金流向，整段歷史供連買/連賣判斷
+            self.diff_history = holdings_diff.compute_all_diffs(
+                df, code_col='stock_id', name_col='name', labels=ETF_ACTION_LABELS)
+            latest_diff = self.diff_history[self.diff_history['compare_today'] == self.latest_date]
+            self.merged_data = latest_diff.rename(columns={
+                'shares_today': 'shares_now', 'shares_yesterday': 'shares_prev', 'shares_change': 'share_diff',
+                'weight': 'weight_now'}).reset_index(drop=True)
+            # 資金流向面板沿用舊規則：前日無持股時變化率顯示 0
+            self.merged_data['pct_change'] = np.where(
+                self.merged_data['shares_prev'] > 0, self.merged_data.pop('change_pct'), 0.0)
+
             top12 = (self.merged_data[self.merged_data['share_diff'].abs() > 0]
                      .sort_values('share_diff', key=abs, ascending=False)
-                     .head(12).sort_values('pct_change'))
-
-            # 正式加入連買/連賣狀態判斷邏輯
-            status_list = []
-            for _, r in top12.iterrows():
-                sid = r['stock_id']
-                hist = self.current_df[self.current_df['stock_id'] == sid].sort_values('date', ascending=False)
-                diffs = hist['shares'].diff(-1)
-
-                status = ""
-                consec_days = 0
-
-                if r['shares_prev'] == 0 and r['shares_now'] > 0:
-                    status = "★新買入"
-                elif r['shares_prev'] > 0 and r['shares_now'] == 0:
-                    status = "●清空"
-                elif r['share_diff'] > 0:
-                    for d in diffs:
-                        if pd.isna(d) or d <= 0: break
-                        consec_days += 1
-                    status = f"連買{consec_days}日" if consec_days > 1 else ""
-                elif r['share_diff'] < 0:
-                    for d in diffs:
-                        if pd.isna(d) or d >= 0: break
-                        consec_days += 1
-                    status = f"連賣{consec_days}日" if consec_days > 1 else ""
-
-                status_list.append(status)
-
-            top12 = top12.copy()
-            top12['consec_status'] = status_list
+                     .head(12).sort_values('pct_change')).copy()
+
+            # 連買/連賣狀態：由差異歷史向量化計算連續天數
+            streak = holdings_diff.consecutive_streak(self.diff_history, code_col='stock_id')
+            days = top12['stock_id'].map(streak).fillna(0).astype(int).to_numpy()
+            is_new = (top12['shares_prev'] == 0) & (top12['shares_now'] > 0)
+            is_clear = (top12['shares_prev'] > 0) & (top12['shares_now'] == 0)
+            top12['consec_status'] = np.select(
+                [is_new, is_clear, days > 1, days < -1],
+                [ETF_ACTION_LABELS['new'], ETF_ACTION_LABELS['exit'],
+                 [f"連買{d}日" for d in days], [f"連賣{-d}日" for d in days]],
+                default="")
 
             self.plot_changes(top12, self.latest_date)
         else:
+            self.diff_history = pd.DataFrame()
             self.plot_changes(pd.DataFrame(), self.latest_date)
 
         self.render_table()
@@ -1920,15 +1804,12 @@ class ActiveETFModule(QWidget):
         td = td.sort_values('date')
 
         pd_df = pd.DataFrame()
-        p_pth = Path(f"data/cache/tw/{sid}_{mkt}.parquet")
-        if p_pth.exists():
-            try:
-                pdf = pd.read_parquet(p_pth)
-                pdf.columns = [c.capitalize() for c in pdf.columns]
-                pdf.index = pd.to_datetime(pdf.index).tz_localize(None)
-                pd_df = pdf[pdf.index >= td['date'].min()].copy()
-            except:
-                pass
+        try:
+            closes = get_price_table().close_series(f"{sid}_{mkt}")
+            if not closes.empty:
+                pd_df = closes[closes.index >= td['date'].min()].to_frame('Close')
+        except Exception:
+            pass
 
         self.fig_trend.clear()
         self.fig_trend.patch.set_facecolor(BG_PANEL)
@@ -18,6 +18,8 @@ import matplotlib.patches as patches
 
 from utils.indicators import Indicators
 from utils.quote_worker import QuoteWorker
+from utils.cache.period_bars import aggregation, load_bars, price_view
+from utils.realtime_bars import last_bar, merge_last_bar, merge_quote, refresh_last_row
 from utils.strategies.technical import TechnicalStrategies
 
 
@@ -34,10 +36,11 @@ class ExpandedKLineWindow(QDialog):
         3: '#FFFF00', 6: '#FF8800', 12: '#00FFFF'
     }
 
-    def __init__(self, stock_id, df, stock_name="", parent=None):
+    def __init__(self, stock_id, df, stock_name="", parent=None, data_path=None):
         super().__init__(parent)
 
         self.stock_id = stock_id
+        self.data_path = data_path  # 日線檔路徑 (用來取預先聚合的週 / 月 K)
         self.stock_name = stock_name
         self.display_id = stock_id.split('_')[0]
 
@@ -75,6 +78,8 @@ class ExpandedKLineWindow(QDialog):
         self.last_drag_x = None
 
         self.ma_checks = {}
+        # 指標快取：(週期, 還原, 指標) -> 整段歷史的計算結果；換週期/還原時清空，即時報價只推進最後一根
+        self._indicator_cache = {}
 
         self.vline1 = None
         self.vline2 = None
@@ -284,8 +289,9 @@ class ExpandedKLineWindow(QDialog):
         if not self.df_source.empty:
             self.update_data_frequency(self.current_tf)
 
-    def update_stock_data(self, stock_id, df, stock_name=""):
+    def update_stock_data(self, stock_id, df, stock_name="", data_path=None):
         self.stock_id = stock_id
+        self.data_path = data_path
         self.stock_name = stock_name
         self.display_id = stock_id.split('_')[0]
         self.info_title.setText(f"{self.display_id} {stock_name}")
@@ -307,7 +313,6 @@ class ExpandedKLineWindow(QDialog):
     def on_realtime_quote(self, data_dict):
         if self.is_closing: return
         if self.current_df is None or self.current_df.empty: return
-        if self.current_tf != 'D': return
 
         target_key = self.stock_id.split('_')[0]
         if target_key not in data_dict: return
@@ -349,79 +354,46 @@ class ExpandedKLineWindow(QDialog):
             else:
                 now = datetime.now()
                 if now.weekday() > 4:
-                    today_date = self.current_df.index[-1]
+                    today_date = self.df_source.index[-1]
                 else:
                     today_date = now
             today_date = today_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            last_idx = self.current_df.index[-1]
-            last_date = last_idx.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            need_redraw = False
-            if today_date > last_date:
-                prev_close = self.current_df.iloc[-1]['Close']
-                change = trade_price - prev_close
-                pct_change = (change / prev_close) * 100 if prev_close != 0 else 0
-                new_data = {'Open': open_p, 'High': high_p, 'Low': low_p, 'Close': trade_price, 'Volume': vol,
-                            'PrevClose': prev_close, 'Change': change, 'PctChange': pct_change}
-                for ma in self.MA_CONFIG.get(self.current_tf, []): new_data[f'MA{ma}'] = np.nan
-                new_row = pd.Series(new_data, name=today_date)
-                self.current_df = pd.concat([self.current_df, pd.DataFrame([new_row])])
-                need_redraw = True
-            elif today_date == last_date:
-                current_vol = self.current_df.at[last_idx, 'Volume']
-                current_close = self.current_df.at[last_idx, 'Close']
-                if abs(current_close - trade_price) > 0.0001 or abs(current_vol - vol) > 0.0001:
-                    self.current_df.at[last_idx, 'Open'] = open_p
-                    self.current_df.at[last_idx, 'High'] = max(self.current_df.at[last_idx, 'High'], high_p)
-                    self.current_df.at[last_idx, 'Low'] = min(self.current_df.at[last_idx, 'Low'], low_p)
-                    self.current_df.at[last_idx, 'Close'] = trade_price
-                    self.current_df.at[last_idx, 'Volume'] = vol
-                    pc = self.current_df.at[last_idx, 'PrevClose']
-                    if pc != 0:
-                        self.current_df.at[last_idx, 'Change'] = trade_price - pc
-                        self.current_df.at[last_idx, 'PctChange'] = ((trade_price - pc) / pc) * 100
-                    need_redraw = True
-
-            if need_redraw:
-                self._calculate_ma()
-                self.draw_candles_and_indicators()
-                self._update_info_label(len(self.current_df) - 1)
+
+            # 增量合併：只更新最後一根日 K 與它所屬的週 / 月 K，均線與指標也只往前推進最後一根
+            bar = {'Open': open_p, 'High': high_p, 'Low': low_p, 'Close': trade_price, 'Volume': vol}
+            self.df_source, status = merge_quote(self.df_source, today_date, bar)
+            if status is None: return
+
+            merged = last_bar(self.df_source, self.current_tf, getattr(self, 'use_adj', False), self._sector_agg())
+            self.current_df, appended = merge_last_bar(self.current_df, today_date, merged, self.current_tf)
+            refresh_last_row(self.current_df, self.MA_CONFIG.get(self.current_tf, []))
+            self._advance_indicators()
+
+            self.draw_candles_and_indicators()
+            self._update_info_label(len(self.current_df) - 1)
         except Exception as e:
             pass
 
     def update_data_frequency(self, tf_code):
         self.current_tf = tf_code
-        base_df = self.df_source.copy()
-
-        if getattr(self, 'use_adj', False) and 'Adj_close' in base_df.columns:
-            base_df['Open'] = base_df['Adj_open']
-            base_df['High'] = base_df['Adj_high']
-            base_df['Low'] = base_df['Adj_low']
-            base_df['Close'] = base_df['Adj_close']
+        self._invalidate_indicators()
+        use_adj = getattr(self, 'use_adj', False)
 
         if tf_code == 'D':
+            base_df = self.df_source.copy()
+            if use_adj and 'Adj_close' in base_df.columns:
+                base_df['Open'] = base_df['Adj_open']
+                base_df['High'] = base_df['Adj_high']
+                base_df['Low'] = base_df['Adj_low']
+                base_df['Close'] = base_df['Adj_close']
             self.current_df = base_df
             self.ma_overlay.show()
         else:
-            rule = 'W-FRI' if tf_code == 'W' else 'ME'
-            logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-
-            sector_cols = ['Legal_Diffusion', 'Rev_Diffusion', 'YoY_Median', 'YoY_Accel',
-                           'legal_diffusion', 'rev_diffusion', 'yoy_median', 'yoy_accel']
-            for c in sector_cols:
-                if c in base_df.columns:
-                    logic[c] = 'mean'
-
-            # 修正：只針對 OHLC 進行 dropna，避免因為擴散/營收等輔助指標有 NaN 導致整根 K 棒被刪除，救回 30W 訊號
-            self.current_df = base_df.resample(rule).agg(logic)
-            self.current_df = self.current_df.dropna(subset=['Open', 'High', 'Low', 'Close'])
+            # 沿用 utils.cache.period_bars 的預先聚合表，只以 df_source 重算最後一個週期 (含盤中報價)
+            # OHLCV 以外的板塊擴散類欄位取平均，最後一根標在實際最後交易日
+            # price_view 只針對 OHLC 進行 dropna，避免因為擴散/營收等輔助指標有 NaN 導致整根 K 棒被刪除，救回 30W 訊號
+            self.current_df = price_view(load_bars(self.data_path, tf_code, self.df_source), use_adj)
             self.ma_overlay.hide()
-            if not self.current_df.empty:
-                real_last_date = base_df.index[-1]
-                if self.current_df.index[-1] > real_last_date:
-                    idx_list = self.current_df.index.tolist()
-                    idx_list[-1] = real_last_date
-                    self.current_df.index = pd.DatetimeIndex(idx_list)
 
         self.current_df['PrevClose'] = self.current_df['Close'].shift(1)
         if not self.current_df.empty:
@@ -439,6 +411,159 @@ class ExpandedKLineWindow(QDialog):
         self.draw_candles_and_indicators()
         if total > 0: self._update_info_label(total - 1)
 
+    def _sector_agg(self):
+        """板塊擴散類欄位的聚合方式 (週 / 月 K 取平均)"""
+        return {c: how for c, how in aggregation(self.df_source.columns).items() if how == 'mean'}
+
+    def _invalidate_indicators(self):
+        self._indicator_cache.clear()
+
+    def _advance_indicators(self):
+        """即時報價後把快取中的指標往前推進一根 (只算最後一列)；有長狀態的指標則丟掉，下次繪圖時整段重算"""
+        df = self.current_df
+        n = len(df)
+        for key in list(self._indicator_cache):
+            old = self._indicator_cache.pop(key)
+            tf, adj, name = key
+            if tf != self.current_tf or adj != getattr(self, 'use_adj', False): continue
+            if len(old) not in (n - 1, n) or n < 2: continue
+
+            row = self._advance_indicator(name, old, df)
+            if row is None: continue
+            if len(old) == n:
+                # 同一根 K 棒更新：原地覆寫最後一格
+                if isinstance(old, pd.DataFrame):
+                    for col, val in row.items():
+                        old.iat[-1, old.columns.get_loc(col)] = val
+                else:
+                    old.iat[-1] = row
+                new = old
+            elif isinstance(old, pd.DataFrame):
+                new = pd.concat([old, pd.DataFrame([row], columns=old.columns)])
+            else:
+                new = pd.concat([old, pd.Series([row])])
+            new.index = df.index
+            self._indicator_cache[key] = new
+
+    def _advance_indicator(self, name, old, df):
+        """
+        只算最後一根的指標值 (公式與 _compute_indicator 相同)
+
+        Returns:
+            DataFrame 型指標回傳 {欄位: 值}，Series 型回傳純量；無法增量推進時回傳 None
+        """
+        n = len(df)
+        close = df['Close'].to_numpy(dtype='float64', na_value=np.nan)
+        prev = old.iloc[n - 2]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if name == "布林通道":
+                if n < 20: return None
+                tail = close[-20:]
+                mid, std = tail.mean(), tail.std(ddof=1)
+                upper, lower = mid + 2.0 * std, mid - 2.0 * std
+                return {'BB_Middle': mid, 'BB_Upper': upper, 'BB_Lower': lower,
+                        'BB_Width_Pct': (upper - lower) / mid * 100}
+
+            if name == "RSI":
+                if n < 15: return None
+                delta = np.diff(close[-15:])
+                gain = np.where(delta > 0, delta, 0).mean()
+                loss = np.where(delta < 0, -delta, 0).mean()
+                return 100 - (100 / (1 + gain / loss))
+
+            if name == "Vix Fix":
+                # WVF 需要 22 根最高收盤，RH 再看 50 根 WVF -> 尾段 71 根即可算出最後一列
+                if n < 71: return None
+                highest = np.lib.stride_tricks.sliding_window_view(close[-71:], 22).max(axis=1)
+                low = df['Low'].to_numpy(dtype='float64', na_value=np.nan)[-50:]
+                wvf = np.nan_to_num((highest - low) / highest * 100, nan=0.0)
+                return {'WVF': wvf[-1], 'Upper': wvf[-20:].mean() + 2.0 * wvf[-20:].std(ddof=1),
+                        'RH': wvf.max() * 0.85}
+
+            if name == "KD":
+                # K = 2/3 前K + 1/3 RSV，D = 2/3 前D + 1/3 K
+                rsv = np.nan
+                if n >= 9:
+                    low_min = df['Low'].to_numpy(dtype='float64', na_value=np.nan)[-9:].min()
+                    high_max = df['High'].to_numpy(dtype='float64', na_value=np.nan)[-9:].max()
+                    rsv = (close[-1] - low_min) / (high_max - low_min) * 100
+                if np.isnan(rsv): rsv = 50
+                k = (2 / 3) * prev['K'] + (1 / 3) * rsv
+                return {'K': k, 'D': (2 / 3) * prev['D'] + (1 / 3) * k}
+
+            if name == "MACD":
+                # ewm(adjust=False)：ema = 前ema + α × (x - 前ema)
+                ema12 = prev['EMA12'] + (2 / 13) * (close[-1] - prev['EMA12'])
+                ema26 = prev['EMA26'] + (2 / 27) * (close[-1] - prev['EMA26'])
+                macd = ema12 - ema26
+                signal = prev['Signal'] + (2 / 10) * (macd - prev['Signal'])
+                return {'MACD': macd, 'Signal': signal, 'Hist': macd - signal, 'EMA12': ema12, 'EMA26': ema26}
+
+        # SuperTrend / 30W：逐根迴圈的狀態沒有保存，交給下次繪圖整段重算
+        return None
+
+    def _indicator(self, name):
+        """取得整段歷史的指標結果 (同一份 current_df 只計算一次，滑鼠移動只做索引)"""
+        key = (self.current_tf, getattr(self, 'use_adj', False), name)
+        if key not in self._indicator_cache:
+            self._indicator_cache[key] = self._compute_indicator(name)
+        return self._indicator_cache[key]
+
+    def _compute_indicator(self, name):
+        df = self.current_df
+        if name == "SuperTrend":
+            return TechnicalStrategies.calculate_supertrend(df)
+
+        if name == "布林通道":
+            return TechnicalStrategies.calculate_bollinger_bands(df, window=20)
+
+        if name == "KD":
+            return Indicators.kd(df)
+
+        if name == "Vix Fix":
+            wvf = Indicators.cm_williams_vix_fix(df, period=22)
+            upper = wvf.rolling(20).mean() + (2.0 * wvf.rolling(20).std())
+            rh = wvf.rolling(50).max() * 0.85
+            return pd.DataFrame({'WVF': wvf, 'Upper': upper, 'RH': rh})
+
+        if name == "MACD":
+            exp12 = df['Close'].ewm(span=12, adjust=False).mean()
+            exp26 = df['Close'].ewm(span=26, adjust=False).mean()
+            macd = exp12 - exp26
+            signal = macd.ewm(span=9, adjust=False).mean()
+            return pd.DataFrame({'MACD': macd, 'Signal': signal, 'Hist': macd - signal,
+                                 'EMA12': exp12, 'EMA26': exp26})
+
+        if name == "RSI":
+            delta = df['Close'].diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+
+        if name == "30W":
+            # 🚀 核心修正：動態不完整週校準 (僅校正最後一週的「成交量」，絕不修改歷史收盤價)
+            signal_calc_df = df.copy()
+
+            daily_df = self.df_source
+            # 只修補「未結束週」的成交量，讓量能符合 5 日水準，避免週初量能不足導致訊號消失
+            if len(daily_df) >= 5 and len(signal_calc_df) >= 1:
+                last_idx = signal_calc_df.index[-1]
+                last_5d_vol = daily_df['Volume'].tail(5).sum()
+                # 如果當前週線的量小於近 5 日總量，才進行替換
+                if signal_calc_df.at[last_idx, 'Volume'] < last_5d_vol:
+                    signal_calc_df.at[last_idx, 'Volume'] = last_5d_vol
+
+            # 在純淨未竄改收盤價的資料上重新計算 MA30
+            signal_calc_df['MA30'] = signal_calc_df['Close'].rolling(30).mean()
+
+            # 自動偵測是否為板塊 (IDX_)，並呼叫對應的判定引擎
+            is_sector = self.display_id.startswith('IDX')
+            return TechnicalStrategies.analyze_30w_breakout_details(signal_calc_df, is_sector=is_sector)
+
+        raise KeyError(name)
+
     def _calculate_ma(self):
         ma_list = self.MA_CONFIG.get(self.current_tf, [])
         for ma in ma_list:
@@ -532,31 +657,7 @@ class ExpandedKLineWindow(QDialog):
                         )
 
             try:
-                # 🚀 核心修正：動態不完整週校準 (僅校正最後一週的「成交量」，絕不修改歷史收盤價)
-                signal_calc_df = self.current_df.copy()
-
-                daily_df = self.df_source.copy()
-                if getattr(self, 'use_adj', False) and 'Adj_close' in daily_df.columns:
-                    daily_df['Open'] = daily_df['Adj_open']
-                    daily_df['High'] = daily_df['Adj_high']
-                    daily_df['Low'] = daily_df['Adj_low']
-                    daily_df['Close'] = daily_df['Adj_close']
-                    daily_df['Volume'] = daily_df['Volume']
-
-                # 只修補「未結束週」的成交量，讓量能符合 5 日水準，避免週初量能不足導致訊號消失
-                if len(daily_df) >= 5 and len(signal_calc_df) >= 1:
-                    last_idx = signal_calc_df.index[-1]
-                    last_5d_vol = daily_df['Volume'].tail(5).sum()
-                    # 如果當前週線的量小於近 5 日總量，才進行替換
-                    if signal_calc_df.at[last_idx, 'Volume'] < last_5d_vol:
-                        signal_calc_df.at[last_idx, 'Volume'] = last_5d_vol
-
-                # 在純淨未竄改收盤價的資料上重新計算 MA30
-                signal_calc_df['MA30'] = signal_calc_df['Close'].rolling(30).mean()
-
-                # 自動偵測是否為板塊 (IDX_)，並呼叫對應的判定引擎
-                is_sector = self.display_id.startswith('IDX')
-                signal_df = TechnicalStrategies.analyze_30w_breakout_details(signal_calc_df, is_sector=is_sector)
+                signal_df = self._indicator("30W")
 
                 # 擷取目前畫面可見區間的訊號
                 view_signals = signal_df.iloc[start_idx:end_idx]
@@ -588,32 +689,6 @@ class ExpandedKLineWindow(QDialog):
                     self.ax1.plot(x, view_df[col].values, color=self.MA_COLORS.get(ma, '#FFF'), lw=1.2, alpha=0.9,
                                   label=f'MA{ma}')
 
-                    if self.current_indicator == "SuperTrend":
-                        try:
-                            st_df = TechnicalStrategies.calculate_supertrend(self.current_df)
-                            st_view = st_df.iloc[start_idx:end_idx]
-                            trend_line = st_view['SuperTrend'].values
-                            directions = st_view['Direction'].values
-
-                            up_trend = np.where(directions == 1, trend_line, np.nan)
-                            down_trend = np.where(directions == -1, trend_line, np.nan)
-
-                            self.ax1.plot(x, up_trend, color='#FF3333', lw=2, alpha=0.8, zorder=4)
-                            self.ax1.plot(x, down_trend, color='#00FF00', lw=2, alpha=0.8, zorder=4)
-
-                            signals = st_view[st_view['Signal'] != 0]
-                            for i in range(len(signals)):
-                                sig_idx = view_df.index.get_loc(signals.index[i])
-                                sig_val = signals.iloc[i]['Signal']
-                                st_val = signals.iloc[i]['SuperTrend']
-                                if sig_val == 1:
-                                    self.ax1.scatter(x[sig_idx], st_val * 0.99, s=80, marker='^', color='#FF3333',
-                                                     edgecolors='white', zorder=6)
-                                elif sig_val == -1:
-                                    self.ax1.scatter(x[sig_idx], st_val * 1.01, s=80, marker='v', color='#00FF00',
-                                                     edgecolors='white', zorder=6)
-                        except Exception as e:
-                            pass
 
         v_h, v_l = view_df['High'].max(), view_df['Low'].min()
         if pd.notna(v_h) and pd.notna(v_l):
@@ -625,8 +700,7 @@ class ExpandedKLineWindow(QDialog):
 
         if name == "SuperTrend":
             try:
-                st_df = TechnicalStrategies.calculate_supertrend(self.current_df)
-                st_view = st_df.iloc[start_idx:end_idx]
+                st_view = self._indicator("SuperTrend").iloc[start_idx:end_idx]
                 trend_line = st_view['SuperTrend'].values
                 directions = st_view['Direction'].values
 
@@ -653,8 +727,7 @@ class ExpandedKLineWindow(QDialog):
         # 👇👇👇 新增：當選擇布林通道時，畫在主圖 (ax1) 上
         elif name == "布林通道":
             try:
-                bb_df = TechnicalStrategies.calculate_bollinger_bands(self.current_df, window=20)
-                bb_view = bb_df.iloc[start_idx:end_idx]
+                bb_view = self._indicator("布林通道").iloc[start_idx:end_idx]
 
                 upper = bb_view['BB_Upper'].values
                 lower = bb_view['BB_Lower'].values
@@ -721,14 +794,8 @@ class ExpandedKLineWindow(QDialog):
             self.ax2.bar(x, view_df['Volume'], color=colors, width=0.6, edgecolor='#121212')
 
         elif name == "Vix Fix":
-            full_wvf = Indicators.cm_williams_vix_fix(self.current_df, period=22)
-            wvf_view = full_wvf.iloc[start_idx:end_idx]
-            full_std = full_wvf.rolling(20).std()
-            full_ma = full_wvf.rolling(20).mean()
-            full_upper = full_ma + (2.0 * full_std)
-            full_rh = full_wvf.rolling(50).max() * 0.85
-            v_upper = full_upper.iloc[start_idx:end_idx]
-            v_rh = full_rh.iloc[start_idx:end_idx]
+            vix_view = self._indicator("Vix Fix").iloc[start_idx:end_idx]
+            wvf_view, v_upper, v_rh = vix_view['WVF'], vix_view['Upper'], vix_view['RH']
             is_green = (wvf_view >= v_upper) | (wvf_view >= v_rh)
             bar_colors = np.where(is_green, '#FF3333', '#444')
             self.ax2.bar(x, wvf_view, color=bar_colors, width=0.6, edgecolor='#121212', linewidth=0.5)
@@ -736,7 +803,7 @@ class ExpandedKLineWindow(QDialog):
             self.ax2.plot(x, v_rh.values, color='#FFA500', lw=1, alpha=0.9)
 
         elif name == "KD":
-            kd = Indicators.kd(self.current_df)
+            kd = self._indicator("KD")
             k_view = kd['K'].iloc[start_idx:end_idx]
             d_view = kd['D'].iloc[start_idx:end_idx]
             self.ax2.plot(x, k_view.values, color='#FFA500', lw=1.2)
@@ -746,14 +813,8 @@ class ExpandedKLineWindow(QDialog):
             self.ax2.set_ylim(0, 100)
 
         elif name == "MACD":
-            exp12 = self.current_df['Close'].ewm(span=12, adjust=False).mean()
-            exp26 = self.current_df['Close'].ewm(span=26, adjust=False).mean()
-            macd = exp12 - exp26
-            signal = macd.ewm(span=9, adjust=False).mean()
-            hist = macd - signal
-            macd_v = macd.iloc[start_idx:end_idx]
-            sig_v = signal.iloc[start_idx:end_idx]
-            hist_v = hist.iloc[start_idx:end_idx]
+            macd_view = self._indicator("MACD").iloc[start_idx:end_idx]
+            macd_v, sig_v, hist_v = macd_view['MACD'], macd_view['Signal'], macd_view['Hist']
             self.ax2.plot(x, macd_v.values, color='#00FFFF', lw=1)
             self.ax2.plot(x, sig_v.values, color='#FFA500', lw=1)
             hist_colors = np.where(hist_v >= 0, '#FF3333', '#00FF00')
@@ -761,12 +822,7 @@ class ExpandedKLineWindow(QDialog):
             self.ax2.axhline(0, color='#555', lw=0.5)
 
         elif name == "RSI":
-            delta = self.current_df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            rsi_v = rsi.iloc[start_idx:end_idx]
+            rsi_v = self._indicator("RSI").iloc[start_idx:end_idx]
             self.ax2.plot(x, rsi_v.values, color='#00E5FF', lw=1.2)
             self.ax2.axhline(70, color='#FF3333', ls='--', lw=0.5)
             self.ax2.axhline(30, color='#00FF00', ls='--', lw=0.5)
@@ -829,7 +885,7 @@ class ExpandedKLineWindow(QDialog):
             return f"<span style='color:{color}; font-weight:bold;'>{text}</span>"
 
         if name == "SuperTrend":
-            st_df = TechnicalStrategies.calculate_supertrend(self.current_df)
+            st_df = self._indicator("SuperTrend")
             val = st_df['SuperTrend'].iloc[idx]
             dir_val = st_df['Direction'].iloc[idx]
             color = "#FF3333" if dir_val == 1 else "#00FF00"
@@ -844,7 +900,7 @@ class ExpandedKLineWindow(QDialog):
 
         # 👇👇👇 新增這段：顯示布林通道的數值
         elif name == "布林通道":
-            bb_df = TechnicalStrategies.calculate_bollinger_bands(self.current_df, window=20)
+            bb_df = self._indicator("布林通道")
             upper = bb_df['BB_Upper'].iloc[idx]
             lower = bb_df['BB_Lower'].iloc[idx]
             width = bb_df['BB_Width_Pct'].iloc[idx]
@@ -870,41 +926,28 @@ class ExpandedKLineWindow(QDialog):
             html_text = span(f"Vol: {int(vol):,}", c)
 
         elif name == "KD":
-            kd = Indicators.kd(self.current_df)
+            kd = self._indicator("KD")
             k = kd['K'].iloc[idx]
             d = kd['D'].iloc[idx]
             html_text = f"{span(f'K: {k:.2f}', '#FFA500')} &nbsp; {span(f'D: {d:.2f}', '#00FFFF')}"
 
         elif name == "Vix Fix":
-            wvf = Indicators.cm_williams_vix_fix(self.current_df, period=22)
-            val = wvf.iloc[idx]
-            full_std = wvf.rolling(20).std()
-            full_ma = wvf.rolling(20).mean()
-            upper = (full_ma + (2.0 * full_std)).iloc[idx]
-            rh = (wvf.rolling(50).max() * 0.85).iloc[idx]
+            vix = self._indicator("Vix Fix")
+            val, upper, rh = vix['WVF'].iloc[idx], vix['Upper'].iloc[idx], vix['RH'].iloc[idx]
             is_active = val >= upper or val >= rh
             color = "#00FF00" if is_active else "#999"
             html_text = f"{span(f'Vix: {val:.2f}', color)} &nbsp; {span(f'Upper: {upper:.2f}', '#00FFFF')} &nbsp; {span(f'RH: {rh:.2f}', '#FFA500')}"
 
         elif name == "MACD":
-            exp12 = self.current_df['Close'].ewm(span=12, adjust=False).mean()
-            exp26 = self.current_df['Close'].ewm(span=26, adjust=False).mean()
-            macd = exp12 - exp26
-            signal = macd.ewm(span=9, adjust=False).mean()
-            hist = macd - signal
-            v_macd = macd.iloc[idx]
-            v_sig = signal.iloc[idx]
-            v_hist = hist.iloc[idx]
+            macd = self._indicator("MACD")
+            v_macd = macd['MACD'].iloc[idx]
+            v_sig = macd['Signal'].iloc[idx]
+            v_hist = macd['Hist'].iloc[idx]
             c_hist = "#FF3333" if v_hist >= 0 else "#00FF00"
             html_text = f"{span(f'DIF: {v_macd:.2f}', '#00FFFF')} &nbsp; {span(f'DEA: {v_sig:.2f}', '#FFA500')} &nbsp; {span(f'MACD: {v_hist:.2f}', c_hist)}"
 
         elif name == "RSI":
-            delta = self.current_df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            val = rsi.iloc[idx]
+            val = self._indicator("RSI").iloc[idx]
             html_text = span(f"RSI: {val:.2f}", "#00E5FF")
 
         self.sub_val_label.setText(f"&nbsp;&nbsp;{html_text}")
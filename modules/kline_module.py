@@ -1,4 +1,6 @@
+import os
 import sys
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -6,6 +8,8 @@ from datetime import datetime
 
 from modules.expanded_kline import ExpandedKLineWindow
 from utils.quote_worker import QuoteWorker
+from utils.cache.period_bars import load_bars, price_view
+from utils.realtime_bars import last_bar, merge_last_bar, merge_quote, refresh_last_row
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QButtonGroup, QSizePolicy,
@@ -18,6 +22,8 @@ from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.gridspec as gridspec
 import matplotlib.ticker as ticker
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba_array
 
 plt.style.use('dark_background')
 plt.rcParams['font.sans-serif'] = ['Microsoft JhengHei']
@@ -62,6 +68,9 @@ class KLineModule(QWidget):
         'M': [3, 6]
     }
 
+    # K 棒配色 (RGBA)：漲 / 跌 / 平盤 / 缺值(透明)
+    CANDLE_PALETTE = np.vstack([to_rgba_array(['#FF3333', '#00FF00', '#FFFFFF']), [[0, 0, 0, 0]]])
+
     MA_COLORS = {
         5: '#FFFF00', 10: '#FF00FF', 22: '#00FF00', 55: '#FF8800', 200: '#00FFFF',
         30: '#FFAA00',
@@ -75,6 +84,7 @@ class KLineModule(QWidget):
         self.current_df = None
         self.display_df = None
         self.raw_df = None
+        self.data_path = None  # 日線檔路徑 (用來取預先聚合的週 / 月 K)
 
         self.is_closing = False
         self.timeframe = 'D'
@@ -86,8 +96,15 @@ class KLineModule(QWidget):
         self.ax1 = None
         self.ax2 = None
         self.current_view_df = None
-        self.cross_v1 = None
-        self.y_label_text = None
+        self._arr = None            # display_df 拆成的 NumPy 陣列 (見 _cache_arrays)
+        self._hover_idx = None
+
+        # FPS / 每幀耗時 (SWR_KLINE_FPS=1 時顯示於左上角)
+        self._frame_start = None
+        self._last_frame_at = None
+        self._render_ms = 0.0
+        self._blit_ms = 0.0
+        self._fps = 0.0
 
         self.init_ui()
         self.init_chart_structure()
@@ -261,7 +278,8 @@ class KLineModule(QWidget):
             stock_id=self.current_stock_id,
             df=self.raw_df,  # <--- 改為傳入 raw_df
             stock_name=self.current_stock_name,
-            parent=self
+            parent=self,
+            data_path=self.data_path
         )
         self.expanded_dialog.show()
 
@@ -294,11 +312,42 @@ class KLineModule(QWidget):
         for ax in [self.ax1, self.ax2]:
             ax.set_facecolor('#000000')
             ax.tick_params(colors='#888')
+            ax.grid(True, color='#222', linestyle=':')
+            for spine in ax.spines.values():
+                spine.set_edgecolor('#444')
             ax.yaxis.tick_right()
-            ax.ticklabel_format(style='plain', axis='y')
+            ax.ticklabel_format(style='plain', axis='y', useOffset=False)
+        self.ax1.tick_params(labelbottom=False)
 
         self.fig.subplots_adjust(left=0.01, right=0.92, top=0.98, bottom=0.15)
 
+        # 常駐 artist：捲動 / 縮放時只更新資料，不再 clear() 重建
+        self.wick_coll = LineCollection([], linewidths=0.8)
+        self.body_coll = PolyCollection([], closed=True)
+        self.vol_coll = PolyCollection([], closed=True, linewidths=0)
+        self.ax1.add_collection(self.wick_coll)
+        self.ax1.add_collection(self.body_coll)
+        self.ax2.add_collection(self.vol_coll)
+        self.ma_lines = {}
+        self.div_artists = []
+
+        # 十字線、價格標籤、FPS 皆為 animated artist，由 blitting 單獨重畫
+        self.cross_v1 = self.ax1.axvline(0, color='white', ls='--', lw=0.8, visible=False, animated=True)
+        self.cross_h1 = self.ax1.axhline(0, color='white', ls='--', lw=0.8, visible=False, animated=True)
+        self.cross_v2 = self.ax2.axvline(0, color='white', ls='--', lw=0.8, visible=False, animated=True)
+
+        props = dict(boxstyle='square', facecolor='#FF00FF', alpha=0.9, edgecolor='none')
+        self.y_label_text = self.ax1.text(1.01, 0, "", transform=self.ax1.get_yaxis_transform(),
+                                          color='white', fontsize=10, fontweight='bold',
+                                          va='center', ha='left', bbox=props, visible=False, animated=True)
+        self.fps_text = self.fig.text(0.015, 0.965, "", color='#00E5FF', fontsize=9, family='monospace',
+                                      va='top', ha='left', animated=True,
+                                      visible=os.environ.get('SWR_KLINE_FPS', '') not in ('', '0'))
+        self.overlay_artists = [self.cross_v1, self.cross_h1, self.cross_v2, self.y_label_text, self.fps_text]
+
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
     def load_stock_data(self, stock_id: str, stock_name: str = ""):
         self.current_stock_id = stock_id
         self.current_stock_name = stock_name
@@ -331,6 +380,7 @@ class KLineModule(QWidget):
                 df.columns = [c.capitalize() for c in df.columns]
                 df.index = pd.to_datetime(df.index)
                 self.raw_df = df
+                self.data_path = path
 
                 self.process_data()
 
@@ -351,9 +401,7 @@ class KLineModule(QWidget):
                 print(f"DEBUG: 讀取錯誤 {e}")
 
         if not data_loaded:
-            if self.ax1: self.ax1.clear()
-            if self.ax2: self.ax2.clear()
-            self.canvas.draw()
+            self._clear_view()
             self.lbl_data_date.setText("資料日期: 無資料")
 
         if hasattr(self, 'overlay'):
@@ -370,35 +418,26 @@ class KLineModule(QWidget):
             self.expanded_dialog.update_stock_data(
                 self.current_stock_id,
                 self.raw_df,
-                self.current_stock_name
+                self.current_stock_name,
+                self.data_path
             )
 
     def process_data(self):
         if self.raw_df is None: return
 
-        df_source = self.raw_df.copy()
-
-        # 🔥 [新增] 偷天換日：若啟用還原，將 Adj_ 系列覆蓋原始 OHLC
-        if getattr(self, 'use_adj', False) and 'Adj_close' in df_source.columns:
-            df_source['Open'] = df_source['Adj_open']
-            df_source['High'] = df_source['Adj_high']
-            df_source['Low'] = df_source['Adj_low']
-            df_source['Close'] = df_source['Adj_close']
-
+        use_adj = getattr(self, 'use_adj', False)
         if self.timeframe == 'D':
-            df = df_source
+            df = self.raw_df.copy()
+
+            # 🔥 [新增] 偷天換日：若啟用還原，將 Adj_ 系列覆蓋原始 OHLC
+            if use_adj and 'Adj_close' in df.columns:
+                df['Open'] = df['Adj_open']
+                df['High'] = df['Adj_high']
+                df['Low'] = df['Adj_low']
+                df['Close'] = df['Adj_close']
         else:
-            rule = 'W-FRI' if self.timeframe == 'W' else 'ME'
-            logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-            agg_dict = {k: v for k, v in logic.items() if k in df_source.columns}
-            df = df_source.resample(rule).agg(agg_dict).dropna()
-
-            if not df.empty:
-                real_last_date = df_source.index[-1]
-                if df.index[-1] > real_last_date:
-                    idx_list = df.index.tolist()
-                    idx_list[-1] = real_last_date
-                    df.index = pd.DatetimeIndex(idx_list)
+            # 週 / 月 K：沿用 utils.cache.period_bars 的預先聚合表，只以 raw_df 重算最後一個週期 (含盤中報價)
+            df = price_view(load_bars(self.data_path, self.timeframe, self.raw_df), use_adj)
 
         self._calc_indicators(df)
         self.current_df = df.copy()
@@ -419,7 +458,6 @@ class KLineModule(QWidget):
     def on_realtime_quote(self, data_dict):
         if self.is_closing: return
         if self.display_df is None or self.display_df.empty: return
-        if self.timeframe != 'D': return
 
         target_key = self.current_stock_id.split('_')[0]
         if target_key not in data_dict: return
@@ -469,64 +507,83 @@ class KLineModule(QWidget):
 
             quote_date = quote_date.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            last_idx = self.display_df.index[-1]
-            last_date = last_idx.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            need_redraw = False
+            # 增量合併：報價只寫進最後一根日 K，再重組它所屬的這一根 (日 / 週 / 月)，
+            # 均線與漲跌幅也只重算最後一列，不再整段複製 + resample
+            bar = {'Open': open_p, 'High': high_p, 'Low': low_p, 'Close': trade_price, 'Volume': vol}
+            self.raw_df, status = merge_quote(self.raw_df, quote_date, bar)
+            if status is None: return
 
-            if quote_date > last_date:
-                prev_close = self.display_df.iloc[-1]['Close']
-                change = trade_price - prev_close
-                pct = (change / prev_close) * 100 if prev_close != 0 else 0
+            use_adj = getattr(self, 'use_adj', False)
+            merged = last_bar(self.raw_df, self.timeframe, use_adj)
+            self.display_df, appended = merge_last_bar(self.display_df, quote_date, merged, self.timeframe)
+            refresh_last_row(self.display_df, self.MA_CONFIG.get(self.timeframe, []))
 
-                new_row = pd.Series({
-                    'Open': open_p, 'High': high_p, 'Low': low_p, 'Close': trade_price,
-                    'Volume': vol, 'PrevClose': prev_close, 'Change': change, 'PctChange': pct
-                }, name=quote_date)
-
-                for ma in self.MA_CONFIG.get('D', []): new_row[f'MA{ma}'] = np.nan
-
-                self.display_df = pd.concat([self.display_df, pd.DataFrame([new_row])])
-                need_redraw = True
-
-            elif quote_date == last_date:
-                curr_close = self.display_df.at[last_idx, 'Close']
-                curr_vol = self.display_df.at[last_idx, 'Volume']
-                curr_high = self.display_df.at[last_idx, 'High']
-                curr_low = self.display_df.at[last_idx, 'Low']
-
-                if abs(curr_close - trade_price) > 0.001 or abs(curr_vol - vol) > 0.1 or \
-                        high_p > curr_high or low_p < curr_low:
-
-                    self.display_df.at[last_idx, 'Open'] = open_p
-                    self.display_df.at[last_idx, 'High'] = max(curr_high, high_p)
-                    self.display_df.at[last_idx, 'Low'] = min(curr_low, low_p)
-                    self.display_df.at[last_idx, 'Close'] = trade_price
-                    self.display_df.at[last_idx, 'Volume'] = vol
-
-                    pc = self.display_df.at[last_idx, 'PrevClose']
-                    if pc > 0:
-                        self.display_df.at[last_idx, 'Change'] = trade_price - pc
-                        self.display_df.at[last_idx, 'PctChange'] = ((trade_price - pc) / pc) * 100
-
-                    need_redraw = True
-
-            if need_redraw:
-                self._calc_indicators(self.display_df)
+            if appended:
                 self.redraw_chart()
-                if hasattr(self, 'expanded_dialog') and self.expanded_dialog.isVisible():
-                    self.expanded_dialog.on_realtime_quote(data_dict)
+            else:
+                self._patch_last_bar()
+                self.update_view()
+            if hasattr(self, 'expanded_dialog') and self.expanded_dialog.isVisible():
+                self.expanded_dialog.on_realtime_quote(data_dict)
 
         except Exception as e:
             print(f"DEBUG: KLine Update Error: {e}")
 
+    # ==========================================
+    # 繪圖：常駐 artist + 原地更新資料 + 十字線 blitting
+    # ==========================================
     def redraw_chart(self):
+        """資料本身有變動 (載入 / 切週期 / 即時報價) 時呼叫：重建陣列快取後更新畫面"""
+        if self.is_closing or self.display_df is None: return
+        self._cache_arrays()
+        self.update_view()
+
+    def _cache_arrays(self):
+        """把 display_df 拆成 NumPy 陣列，捲動 / 縮放時只做切片，不再複製 DataFrame"""
+        df = self.display_df
+
+        def col(name, fill=None):
+            if name not in df.columns:
+                return np.full(len(df), np.nan if fill is None else fill)
+            # 可寫副本：即時報價會原地覆寫最後一格 (見 _patch_last_bar)
+            arr = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64', na_value=np.nan, copy=True)
+            return arr if fill is None else np.nan_to_num(arr, nan=fill)
+
+        self._arr = {
+            'Open': col('Open'), 'High': col('High'), 'Low': col('Low'), 'Close': col('Close'),
+            'Volume': col('Volume', fill=0.0),
+            'Dividends': col('Dividends', fill=0.0) if 'Dividends' in df.columns else None,
+        }
+        for ma in self.MA_CONFIG.get(self.timeframe, []):
+            self._arr[f'MA{ma}'] = col(f'MA{ma}')
+
+    def _patch_last_bar(self):
+        """即時報價只改到最後一列：直接覆寫陣列快取的最後一格，不重建整份陣列"""
+        if self._arr is None or len(self._arr['Close']) != len(self.display_df):
+            self._cache_arrays()
+            return
+        row = self.display_df.iloc[-1]
+        for name, arr in self._arr.items():
+            if arr is None or name not in row.index: continue
+            val = pd.to_numeric(row[name], errors='coerce')
+            if name in ('Volume', 'Dividends') and pd.isna(val): val = 0.0
+            arr[-1] = val
+
+    def _bar_colors(self, opens, closes):
+        """每根 K 棒的 RGBA：紅漲、綠跌、白平盤；缺值透明 (與舊版不畫相同)"""
+        kind = np.full(len(opens), 3)
+        kind[closes == opens] = 2
+        kind[closes < opens] = 1
+        kind[closes > opens] = 0
+        return self.CANDLE_PALETTE[kind], kind
+
+    def update_view(self):
+        """依 scroll_pos / visible_candles 取出可視區間，原地更新各 artist 的資料"""
         if self.is_closing or self.display_df is None: return
-
         if self.ax1 is None: self.init_chart_structure()
-
-        self.ax1.clear()
-        self.ax2.clear()
+        if self._arr is None or len(self._arr['Close']) != len(self.display_df):
+            self._cache_arrays()
+        self._frame_start = time.perf_counter()
 
         total_len = len(self.display_df)
         max_scroll = max(0, total_len - self.visible_candles)
@@ -534,83 +591,77 @@ class KLineModule(QWidget):
 
         end_idx = total_len - self.scroll_pos
         start_idx = max(0, end_idx - self.visible_candles)
+        self.current_view_df = self.display_df.iloc[start_idx:end_idx]
+        self._hover_idx = None
 
-        view_df = self.display_df.iloc[start_idx:end_idx].copy()
-        self.current_view_df = view_df
-
-        view_df['Volume'] = pd.to_numeric(view_df['Volume'], errors='coerce').fillna(0)
+        a = {k: (v[start_idx:end_idx] if v is not None else None) for k, v in self._arr.items()}
+        opens, highs, lows, closes, vols = a['Open'], a['High'], a['Low'], a['Close'], a['Volume']
+        n = len(closes)
+        x = np.arange(n, dtype='float64')
 
-        if not view_df.empty:
-            v_high = view_df['High'].max()
-            v_low = view_df['Low'].min()
+        if n:
+            v_high = np.nanmax(highs) if np.isfinite(highs).any() else 100
+            v_low = np.nanmin(lows) if np.isfinite(lows).any() else 0
             padding = (v_high - v_low) * 0.05
             if padding == 0: padding = v_high * 0.01
             ylim_min, ylim_max = v_low - padding, v_high + padding
         else:
             ylim_min, ylim_max = 0, 100
 
-        for ax in [self.ax1, self.ax2]:
-            ax.grid(True, color='#222', linestyle=':')
-            for spine in ax.spines.values():
-                spine.set_edgecolor('#444')
-            ax.yaxis.tick_right()
-            ax.ticklabel_format(style='plain', axis='y', useOffset=False)
-
-        self.ax1.tick_params(labelbottom=False)
-
-        x = np.arange(len(view_df))
-        opens = view_df['Open'].values
-        closes = view_df['Close'].values
-        highs = view_df['High'].values
-        lows = view_df['Low'].values
-
-        up = closes > opens
-        down = closes < opens
-        flat = closes == opens
-        col_up, col_down, col_flat = '#FF3333', '#00FF00', '#FFFFFF'
-        width = 0.6
-
-        self.ax1.vlines(x[up], lows[up], highs[up], color=col_up, lw=0.8)
-        self.ax1.bar(x[up], closes[up] - opens[up], width, bottom=opens[up], color=col_up)
-
-        self.ax1.vlines(x[down], lows[down], highs[down], color=col_down, lw=0.8)
-        self.ax1.bar(x[down], opens[down] - closes[down], width, bottom=closes[down], color=col_down)
-
-        if np.any(flat):
-            self.ax1.vlines(x[flat], lows[flat], highs[flat], color=col_flat, lw=0.8)
-            self.ax1.hlines(closes[flat], x[flat] - width / 2, x[flat] + width / 2, colors=col_flat, lw=2)
-
+        colors, kind = self._bar_colors(opens, closes)
+        half = 0.6 / 2
+
+        # K 棒影線
+        self.wick_coll.set_segments(np.stack([np.column_stack([x, lows]), np.column_stack([x, highs])], axis=1))
+        self.wick_coll.set_color(colors)
+
+        # K 棒實體 (平盤為高度 0 的矩形，以 2pt 邊框畫成橫線)
+        bottom, top = np.fmin(opens, closes), np.fmax(opens, closes)
+        self.body_coll.set_verts(np.stack([
+            np.column_stack([x - half, bottom]), np.column_stack([x - half, top]),
+            np.column_stack([x + half, top]), np.column_stack([x + half, bottom])], axis=1))
+        self.body_coll.set_facecolor(colors)
+        self.body_coll.set_edgecolor(colors)
+        self.body_coll.set_linewidth(np.where(kind == 2, 2.0, 0.0))
+
+        # 成交量
+        vol_half = 0.8 / 2
+        zeros = np.zeros(n)
+        self.vol_coll.set_verts(np.stack([
+            np.column_stack([x - vol_half, zeros]), np.column_stack([x - vol_half, vols]),
+            np.column_stack([x + vol_half, vols]), np.column_stack([x + vol_half, zeros])], axis=1))
+        vol_colors = colors.copy()
+        vol_colors[kind < 3, 3] = 0.9
+        self.vol_coll.set_facecolor(vol_colors)
+
+        # 均線：只保留目前週期要顯示的線
         visible_list = self.DEFAULT_VISIBLE_MA.get(self.timeframe, [])
-        ma_list = self.MA_CONFIG.get(self.timeframe, [])
-
-        for ma in ma_list:
-            col_name = f'MA{ma}'
-            if col_name in view_df.columns:
-                if ma in visible_list:
-                    color = self.MA_COLORS.get(ma, '#FFFFFF')
-                    self.ax1.plot(x, view_df[col_name].values, color=color, lw=1, alpha=0.9, label=f'MA{ma}')
+        wanted = [ma for ma in self.MA_CONFIG.get(self.timeframe, []) if ma in visible_list]
+        for ma in list(self.ma_lines):
+            if ma not in wanted:
+                self.ma_lines.pop(ma).remove()
+        for ma in wanted:
+            line = self.ma_lines.get(ma)
+            if line is None:
+                line, = self.ax1.plot([], [], color=self.MA_COLORS.get(ma, '#FFFFFF'), lw=1, alpha=0.9,
+                                      label=f'MA{ma}')
+                self.ma_lines[ma] = line
+            line.set_data(x, a[f'MA{ma}'])
 
         self.ax1.set_ylim(ylim_min, ylim_max)
-        self.ax1.set_xlim(-0.5, len(view_df) - 0.5)
-
-        self.ax2.bar(x[up], view_df['Volume'][up], color=col_up, alpha=0.9)
-        self.ax2.bar(x[down], view_df['Volume'][down], color=col_down, alpha=0.9)
-        self.ax2.bar(x[flat], view_df['Volume'][flat], color=col_flat, alpha=0.9)
+        self.ax1.set_xlim(-0.5, n - 0.5)
 
-        if not view_df.empty:
-            vol_max = view_df['Volume'].max()
-            if pd.isna(vol_max) or vol_max <= 0:
-                vol_max = 1
-            self.ax2.set_ylim(0, vol_max * 1.05)
-
-        self.ax2.set_xlim(-0.5, len(view_df) - 0.5)
+        vol_max = np.nanmax(vols) if n else 0
+        if pd.isna(vol_max) or vol_max <= 0:
+            vol_max = 1
+        self.ax2.set_ylim(0, vol_max * 1.05)
 
         date_strs = []
         tick_indices = []
-        dates = view_df.index
+        dates = self.current_view_df.index
         last_val = None
-        step = max(1, len(view_df) // 8)
-        for i in range(0, len(dates), step):
+        step = max(1, n // 8)
+        for i in range(0, n, step):
             d = dates[i]
             tick_indices.append(i)
             if self.timeframe == 'D':
@@ -624,51 +675,104 @@ class KLineModule(QWidget):
         self.ax2.set_xticks(tick_indices)
         self.ax2.set_xticklabels(date_strs, rotation=0, fontsize=9, color='#AAA')
 
-        self.cross_v1 = self.ax1.axvline(0, color='white', ls='--', lw=0.8, visible=False)
-        self.cross_h1 = self.ax1.axhline(0, color='white', ls='--', lw=0.8, visible=False)
-        self.cross_v2 = self.ax2.axvline(0, color='white', ls='--', lw=0.8, visible=False)
-
-        props = dict(boxstyle='square', facecolor='#FF00FF', alpha=0.9, edgecolor='none')
-        self.y_label_text = self.ax1.text(1.01, 0, "", transform=self.ax1.get_yaxis_transform(),
-                                          color='white', fontsize=10, fontweight='bold',
-                                          va='center', ha='left', bbox=props, visible=False)
-
-        # === 畫除息標記 (D) ===
-        if 'Dividends' in view_df.columns:
-            # 找出這段期間內有配息的日子
-            div_mask = view_df['Dividends'] > 0
-            if div_mask.any():
-                div_indices = np.where(div_mask)[0]
-                for idx in div_indices:
-                    # 抓取該日的最低價與配息金額
-                    low_p = view_df['Low'].iloc[idx]
-                    div_val = view_df['Dividends'].iloc[idx]
-
-                    # 畫一條從底端延伸到最低價的虛線
-                    self.ax1.vlines(idx, ylim_min, low_p, color='#FFFF00', linestyles=':', lw=1.2, alpha=0.7)
-
-                    # 在虛線頂部（K線下方一點點）畫一個 D 的標籤，附帶金額
-                    bbox_props = dict(boxstyle="circle,pad=0.2", fc="#222222", ec="#FFFF00", lw=1)
+        # === 畫除息標記 (D) === 數量很少，每次重建即可
+        for artist in self.div_artists:
+            artist.remove()
+        self.div_artists = []
+        divs = a['Dividends']
+        if divs is not None:
+            for idx in np.flatnonzero(divs > 0):
+                # 抓取該日的最低價與配息金額
+                low_p = lows[idx]
+                div_val = divs[idx]
+
+                # 畫一條從底端延伸到最低價的虛線
+                self.div_artists.append(
+                    self.ax1.vlines(idx, ylim_min, low_p, color='#FFFF00', linestyles=':', lw=1.2, alpha=0.7))
+
+                # 在虛線頂部（K線下方一點點）畫一個 D 的標籤，附帶金額
+                bbox_props = dict(boxstyle="circle,pad=0.2", fc="#222222", ec="#FFFF00", lw=1)
+                self.div_artists.append(
                     self.ax1.text(idx, ylim_min + (low_p - ylim_min) * 0.1, f"D\n{div_val:.1f}",
                                   color='#FFFF00', fontsize=8, fontweight='bold',
-                                  ha='center', va='center', bbox=bbox_props, zorder=10)
+                                  ha='center', va='center', bbox=bbox_props, zorder=10))
         # =======================
 
+        self._background = None
         self.canvas.draw_idle()
 
+    def _clear_view(self):
+        """無資料時清空圖面 (保留常駐 artist)"""
+        self.display_df = None
+        self.current_view_df = None
+        self._arr = None
+        if self.ax1 is None: return
+        self.wick_coll.set_segments([])
+        self.body_coll.set_verts([])
+        self.vol_coll.set_verts([])
+        for line in self.ma_lines.values():
+            line.set_data([], [])
+        for artist in self.div_artists:
+            artist.remove()
+        self.div_artists = []
+        self._hide_crosshair()
+        self.canvas.draw()
+
+    def _on_draw(self, event):
+        """完整重繪後：記下不含十字線的底圖，再把動態 artist 疊上去"""
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._render_ms = (now - self._frame_start) * 1000
+            self._frame_start = None
+        if self._last_frame_at is not None:
+            dt = now - self._last_frame_at
+            self._fps = 0.8 * self._fps + 0.2 * (1.0 / dt) if dt > 0 else self._fps
+        self._last_frame_at = now
+
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_overlay()
+
+    def _draw_overlay(self):
+        if self.fps_text.get_visible():
+            self.fps_text.set_text(f"render {self._render_ms:5.1f} ms | blit {self._blit_ms:4.1f} ms | {self._fps:4.0f} fps")
+        for artist in self.overlay_artists:
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+
+    def _blit_overlay(self):
+        """只重畫十字線 / 價格標籤 / FPS：還原底圖後疊上動態 artist"""
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        t0 = time.perf_counter()
+        self.canvas.restore_region(self._background)
+        self._draw_overlay()
+        self.canvas.blit(self.fig.bbox)
+        self._blit_ms = (time.perf_counter() - t0) * 1000
+
+    def set_fps_overlay(self, enabled: bool):
+        """開關 FPS / 每幀耗時顯示 (效能量測用，亦可設環境變數 SWR_KLINE_FPS=1)"""
+        self.fps_text.set_visible(enabled)
+        self._blit_overlay()
+
+    def _hide_crosshair(self):
+        for artist in (self.cross_v1, self.cross_h1, self.cross_v2, self.y_label_text):
+            artist.set_visible(False)
+
     def on_scroll_zoom(self, event):
+        if self.display_df is None: return
         if event.button == 'up':
             self.visible_candles = max(20, self.visible_candles - 10)
         elif event.button == 'down':
             self.visible_candles = min(len(self.display_df), self.visible_candles + 10)
-        self.redraw_chart()
+        self.update_view()
 
     def on_mouse_press(self, event):
         if event.button == 1:
             if event.dblclick:
                 self.visible_candles = 80
                 self.scroll_pos = 0
-                self.redraw_chart()
+                self.update_view()
                 return
             self.is_dragging = True
             self.last_mouse_x = event.xdata
@@ -681,19 +785,18 @@ class KLineModule(QWidget):
         if self.overlay.isVisible(): return
 
         if not event.inaxes:
-            if self.cross_v1: self.cross_v1.set_visible(False)
-            if self.cross_h1: self.cross_h1.set_visible(False)
-            if self.cross_v2: self.cross_v2.set_visible(False)
-            if self.y_label_text: self.y_label_text.set_visible(False)
-            self.canvas.draw_idle()
+            self._hide_crosshair()
+            self._hover_idx = None
+            self._blit_overlay()
             return
 
         if self.is_dragging and event.xdata is not None and self.last_mouse_x is not None:
+            if self.display_df is None: return
             dx = int(self.last_mouse_x - event.xdata)
             if abs(dx) > 0:
                 max_scroll = len(self.display_df) - self.visible_candles
                 self.scroll_pos = max(0, min(max_scroll, self.scroll_pos + dx))
-                self.redraw_chart()
+                self.update_view()
                 return
 
         try:
@@ -715,9 +818,12 @@ class KLineModule(QWidget):
                     self.cross_h1.set_visible(False)
                     self.y_label_text.set_visible(False)
 
-                self.canvas.draw_idle()
-                row = self.current_view_df.iloc[x_idx]
-                self.update_info_label(row, row.name)
+                self._blit_overlay()
+                # 資訊列只在換到另一根 K 棒時才更新
+                if x_idx != self._hover_idx:
+                    self._hover_idx = x_idx
+                    row = self.current_view_df.iloc[x_idx]
+                    self.update_info_label(row, row.name)
         except Exception:
             pass
 
@@ -2,6 +2,10 @@
 import os
 import json
 from utils.scoring.l3_score import L3Scorer
+from utils import snapshot_store
+from utils.cache.period_bars import OHLCV, live_weekly, load_bars, price_view
+from utils.strategies.strong_tags import BITS_COLUMN, bits_for
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
@@ -53,6 +57,14 @@ class NumericItem(QTableWidgetItem):
             return super().__lt__(other)
 
 
+# 板塊戰情室用到的快照欄位 (其餘上百欄不載入)
+SNAPSHOT_COLUMNS = ['sid', 'name', '現價', '漲幅1d', '漲幅5d', 'RS強度', 'legal_diff_5d', 'margin_diff_5d',
+                    '強勢特徵', BITS_COLUMN, 'str_30w_week_offset', 'str_st_week_offset', '布林寬度(%)']
+
+# 黑馬特選股的標籤關鍵字 (比對標籤名稱，不分大小寫)
+DARK_HORSE_TAG_KEYWORDS = ("黑馬", "起漲", "轉多", "突破", "壓縮", "ilss", "主力", "特徵")
+
+
 class SectorDashboard(QWidget):
     stock_double_clicked = pyqtSignal(str)
 
@@ -91,8 +103,8 @@ class SectorDashboard(QWidget):
             try:
                 # 強制清除舊有記憶體參照
                 self.snapshot_df = None
-                # 加上 engine='pyarrow', memory_map=False，拒絕作業系統的記憶體殘影，強制從硬碟重讀
-                self.snapshot_df = pd.read_parquet(self.snapshot_path, engine='pyarrow', memory_map=False).copy()
+                # 共用快照服務：檔案 mtime 變動才重讀，且只投影板塊戰情室用到的欄位
+                self.snapshot_df = snapshot_store.load_frame(SNAPSHOT_COLUMNS, path=self.snapshot_path)
 
                 #print("【驗證】當前策略大表的所有欄位:", self.snapshot_df.columns.tolist())
 
@@ -135,6 +147,22 @@ class SectorDashboard(QWidget):
                             if tag not in self.sector_types:
                                 self.sector_types[tag] = s_type
 
+    def _has_tags_mask(self):
+        """是否帶有任何強勢特徵標籤"""
+        if BITS_COLUMN in self.snapshot_df.columns:
+            return self.snapshot_df[BITS_COLUMN].fillna(0).astype('uint64') != 0
+        return self.snapshot_df['強勢特徵標籤'] != ''
+
+    def _tag_keyword_mask(self, keywords):
+        """標籤名稱含任一關鍵字 (不分大小寫)；有位元欄時以位元運算比對"""
+        if BITS_COLUMN in self.snapshot_df.columns:
+            wanted = np.uint64(0)
+            for kw in keywords:
+                wanted |= bits_for(kw, case=False)
+            bits = self.snapshot_df[BITS_COLUMN].fillna(0).to_numpy(dtype=np.uint64)
+            return pd.Series((bits & wanted) != 0, index=self.snapshot_df.index)
+        return self.snapshot_df['強勢特徵標籤'].str.contains("|".join(keywords), na=False, case=False)
+
     def init_ui(self):
         self.setStyleSheet("""
                     QGroupBox {
@@ -463,7 +491,7 @@ class SectorDashboard(QWidget):
         # 僅針對 RS強度 >= 50 或具有強勢標籤的個股進行深度評分，節省運算資源
         df_to_compute = self.snapshot_df[
             self.snapshot_df['股票代號'].isin(all_member_sids) &
-            ((self.snapshot_df['RS強度'] >= 50) | (self.snapshot_df['強勢特徵標籤'] != ''))
+            ((self.snapshot_df['RS強度'] >= 50) | self._has_tags_mask())
         ]
         total_stocks = len(df_to_compute)
 
@@ -580,25 +608,19 @@ class SectorDashboard(QWidget):
 
                 member_count = len(self.sector_members.get(sector_name, []))
 
-                df_w = df.copy()
-                df_w.index = pd.to_datetime(df_w.index)
-                df_w = df_w.resample('W-FRI').agg({
-                    'adj_open': 'first', 'adj_high': 'max', 'adj_low': 'min', 'adj_close': 'last', 'volume': 'sum'
-                }).dropna()
-                df_w = df_w.rename(
-                    columns={'adj_open': 'Open', 'adj_high': 'High', 'adj_low': 'Low', 'adj_close': 'Close',
-                             'volume': 'Volume'})
+                # 週 K 直接讀 build_industry_kline 維護的預先聚合表 (不存在 / 過期時才以日線重算)
+                df_w = load_bars(file_path, 'W', label_last=False)
+                if df_w is None:
+                    df_w = df[['adj_open', 'adj_high', 'adj_low', 'adj_close', 'volume']].copy()
+                    df_w.index = pd.to_datetime(df_w.index)
+                    df_w = load_bars(file_path, 'W', df_w, label_last=False)
+                df_w = price_view(df_w, use_adj=True)[list(OHLCV)]
 
                 is_30w_break = False
                 is_st_break = False
 
-                df_w_live = df_w.copy()
-                if len(df) >= 5 and len(df_w_live) >= 1:
-                    last_idx = df_w_live.index[-1]
-                    last_5d_vol = df['volume'].tail(5).sum()
-
-                    if df_w_live.at[last_idx, 'Volume'] < last_5d_vol:
-                        df_w_live.at[last_idx, 'Volume'] = last_5d_vol
+                # 本週量能不足 5 日總量時以 5 日總量代替 (開高低維持日曆週)
+                df_w_live = live_weekly(df_w, df, ohlc=False)
 
                 if len(df_w) > 30:
                     df_w_live['MA30'] = df_w_live['Close'].rolling(30).mean()
@@ -715,7 +737,7 @@ class SectorDashboard(QWidget):
             elif self.snapshot_df is not None and not self.snapshot_df.empty:
                 try:
                     rs_cond = self.snapshot_df['RS強度'] >= 75
-                    tags_cond = self.snapshot_df['強勢特徵標籤'].str.contains("黑馬|起漲|轉多|突破|壓縮|ilss|主力|特徵", na=False, case=False)
+                    tags_cond = self._tag_keyword_mask(DARK_HORSE_TAG_KEYWORDS)
                     dark_horse_sids = set(self.snapshot_df[rs_cond & tags_cond]['股票代號'].astype(str).tolist())
                 except Exception as e:
                     pass
@@ -822,7 +844,7 @@ class SectorDashboard(QWidget):
             df = df.loc[:, ~df.columns.duplicated()]
 
             if hasattr(self, 'kline_widget') and self.kline_widget is not None:
-                self.kline_widget.update_stock_data(sid, df, f"板塊: {sector_name}")
+                self.kline_widget.update_stock_data(sid, df, f"板塊: {sector_name}", data_path=file_path)
             else:
                 for i in reversed(range(self.kline_layout.count())):
                     widget = self.kline_layout.itemAt(i).widget()
@@ -831,7 +853,8 @@ class SectorDashboard(QWidget):
                         widget.deleteLater()
 
                 from modules.expanded_kline import ExpandedKLineWindow
-                self.kline_widget = ExpandedKLineWindow(stock_id=sid, df=df, stock_name=f"板塊: {sector_name}")
+                self.kline_widget = ExpandedKLineWindow(stock_id=sid, df=df, stock_name=f"板塊: {sector_name}",
+                                                       data_path=file_path)
                 self.kline_widget.setWindowFlags(Qt.WindowType.Widget)
                 self.kline_layout.addWidget(self.kline_widget)
 
@@ -1129,6 +1152,81 @@ class SectorDashboard(QWidget):
 
 from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import QProgressDialog
+from utils.scoring.trend_factors import InstitutionalVWAPBook
+
+
+def load_l3_inputs(project_root, sid, default_boll_width=50.0):
+    """讀取單檔 L3 評分所需的基本面 JSON、K 線與布林寬度"""
+    fundamental_data = {}
+    json_path = project_root / "data" / "fundamentals" / f"{sid}.json"
+    if json_path.exists():
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                fundamental_data = json.load(f)
+        except:
+            pass
+
+    kline_df = pd.DataFrame()
+    parquet_tw = project_root / "data" / "cache" / "tw" / f"{sid}_TW.parquet"
+    parquet_two = project_root / "data" / "cache" / "tw" / f"{sid}_TWO.parquet"
+    kline_path = parquet_tw if parquet_tw.exists() else (parquet_two if parquet_two.exists() else None)
+
+    if kline_path:
+        try:
+            kline_df = pd.read_parquet(kline_path, engine='pyarrow', memory_map=False).copy()
+            kline_df.columns = [str(c).lower() for c in kline_df.columns]
+            if isinstance(kline_df.index, pd.DatetimeIndex):
+                kline_df['date'] = kline_df.index
+            elif 'date' not in kline_df.columns and 'timestamp' in kline_df.columns:
+                kline_df['date'] = pd.to_datetime(kline_df['timestamp'], unit='ms')
+        except:
+            pass
+
+    boll_width = default_boll_width
+    if not kline_df.empty and fundamental_data:
+        try:
+            from utils.strategies.technical import TechnicalStrategies
+            bb_df = TechnicalStrategies.calculate_bollinger_bands(kline_df, window=20)
+            if not bb_df.empty and not pd.isna(bb_df['BB_Width_Pct'].iloc[-1]):
+                boll_width = float(bb_df['BB_Width_Pct'].iloc[-1])
+        except:
+            pass
+
+    return fundamental_data, kline_df, boll_width
+
+
+def collect_l3_inputs(worker, tasks, progress_every=1):
+    """
+    第一階段：逐檔載入評分資料，同時收集全市場法人買賣超與收盤價
+    回傳 (已載入清單, InstitutionalVWAPBook)，後續評分只需 O(1) 查表
+    """
+    loaded = []
+    inst_map, kline_map = {}, {}
+    total = len(tasks)
+
+    for idx, row in enumerate(tasks):
+        if worker._is_cancelled:
+            break
+
+        row_dict = row._asdict() if hasattr(row, '_asdict') else row
+        sid = str(row_dict.get('股票代號', ''))
+        name_str = str(row_dict.get('股票名稱', ''))
+
+        if idx % progress_every == 0 or idx == total - 1:
+            worker.progress_updated.emit(idx, total, f"{sid} {name_str}")
+
+        fundamental_data, kline_df, boll_width = load_l3_inputs(
+            worker.project_root, sid, row_dict.get('布林寬度(%)', 50.0))
+
+        has_inputs = not kline_df.empty and bool(fundamental_data)
+        if has_inputs and {'date', 'close'} <= set(kline_df.columns):
+            # 只保留成本線需要的兩個欄位，避免全市場 K 線同時常駐記憶體
+            inst_map[sid] = fundamental_data.get('institutional_investors', [])
+            kline_map[sid] = kline_df[['date', 'close']]
+
+        loaded.append((row_dict, fundamental_data, has_inputs, boll_width))
+
+    return loaded, InstitutionalVWAPBook.from_records(inst_map, kline_map)
 
 
 class L3ComputeWorker(QThread):
@@ -1147,149 +1245,107 @@ class L3ComputeWorker(QThread):
         self._is_cancelled = True
 
     def run(self):
-        import builtins
-        original_print = builtins.print
-        builtins.print = lambda *args, **kwargs: None
+        total = len(self.tasks)
+        loaded, vwap_book = collect_l3_inputs(self, self.tasks)
 
-        try:
-            total = len(self.tasks)
-            for idx, row in enumerate(self.tasks):
-                if self._is_cancelled:
-                    break
-
-                row_dict = row._asdict() if hasattr(row, '_asdict') else row
-                sid = str(row_dict.get('股票代號', ''))
-                rs_val = row_dict.get('RS強度', 0)
-                tags = str(row_dict.get('強勢特徵標籤', ''))
-                name_str = str(row_dict.get('股票名稱', ''))
-
-                self.progress_updated.emit(idx, total, f"{sid} {name_str}")
-
-                fundamental_data = {}
-                json_path = self.project_root / "data" / "fundamentals" / f"{sid}.json"
-                if json_path.exists():
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            fundamental_data = json.load(f)
-                    except:
-                        pass
+        for row_dict, fundamental_data, has_inputs, boll_width in loaded:
+            if self._is_cancelled:
+                break
 
-                kline_df = pd.DataFrame()
-                parquet_tw = self.project_root / "data" / "cache" / "tw" / f"{sid}_TW.parquet"
-                parquet_two = self.project_root / "data" / "cache" / "tw" / f"{sid}_TWO.parquet"
-                kline_path = parquet_tw if parquet_tw.exists() else (parquet_two if parquet_two.exists() else None)
+            sid = str(row_dict.get('股票代號', ''))
+            rs_val = row_dict.get('RS強度', 0)
+            tags = str(row_dict.get('強勢特徵標籤', ''))
+            name_str = str(row_dict.get('股票名稱', ''))
 
-                if kline_path:
-                    try:
-                        kline_df = pd.read_parquet(kline_path, engine='pyarrow', memory_map=False).copy()
-                        kline_df.columns = [str(c).lower() for c in kline_df.columns]
-                        if isinstance(kline_df.index, pd.DatetimeIndex):
-                            kline_df['date'] = kline_df.index
-                        elif 'date' not in kline_df.columns and 'timestamp' in kline_df.columns:
-                            kline_df['date'] = pd.to_datetime(kline_df['timestamp'], unit='ms')
-                    except:
-                        pass
-
-                l3_score_val = 0.0
-                is_dark_horse = False
-                tooltip_html = ""
+            l3_score_val = 0.0
+            is_dark_horse = False
+            tooltip_html = ""
 
-                if not kline_df.empty and fundamental_data:
-                    boll_width = row_dict.get('布林寬度(%)', 50.0)
-                    try:
-                        from utils.strategies.technical import TechnicalStrategies
-                        bb_df = TechnicalStrategies.calculate_bollinger_bands(kline_df, window=20)
-                        if not bb_df.empty and not pd.isna(bb_df['BB_Width_Pct'].iloc[-1]):
-                            boll_width = float(bb_df['BB_Width_Pct'].iloc[-1])
-                    except:
-                        pass
+            if has_inputs:
+                try:
+                    l3_result = L3Scorer.calculate_score(float(rs_val), fundamental_data, None, tags,
+                                                         float(boll_width), vwap_res=vwap_book.lookup(sid))
+                    l3_score_val = l3_result.get('L3Score', 0.0)
+                    is_dark_horse = l3_result.get('is_dark_horse', False)
+
+                    vwap = l3_result.get('vwap_info', {})
+                    rev = l3_result.get('rev_info', {})
+                    prof = l3_result.get('prof_info', {})
+
+                    breakdown_parts = []
+                    if float(rs_val) >= 80:
+                        breakdown_parts.append("🟢 RS技術強勢分 (+30)")
+                    elif float(rs_val) >= 50:
+                        breakdown_parts.append("🟡 RS技術中等分 (+15)")
+
+                    v_status = vwap.get('status', '')
+                    if "站上" in v_status or "站在" in v_status:
+                        breakdown_parts.append("🟢 法人成本安全分 (+25)")
+
+                    rev_slope = float(rev.get('slope', 0))
+                    if rev_slope > 10:
+                        breakdown_parts.append(f"🟢 營收動能噴發分 ({rev_slope:+.1f}%) (+25)")
+                    elif rev_slope > 0:
+                        breakdown_parts.append(f"🟡 營收穩定成長分 ({rev_slope:+.1f}%) (+15)")
+
+                    op_qoq = float(prof.get('qoq', 0))
+                    if op_qoq > 20:
+                        breakdown_parts.append(f"🟢 獲利加速品質分 ({op_qoq:+.1f}%) (+20)")
+
+                    score_breakdown_html = "<br>".join(breakdown_parts) if breakdown_parts else "基本技術與價量基本分"
+
+                    reasons = []
+                    if is_dark_horse:
+                        if boll_width < 15:
+                            reasons.append(f"⚡ 布林通道極度收斂 ({boll_width:.1f}%) - 蓄勢突破")
+                        if "ilss" in tags.lower() or "主力" in tags.lower():
+                            reasons.append("🐳 主力暗中掃單特徵 (ILSS技術特徵)")
+                        if float(rs_val) >= 85:
+                            reasons.append(f"📈 RS強度高達 {rs_val:.1f} - 超越市場大眾")
+                        vwap_bias = float(vwap.get('bias_pct', 0))
+                        if 0 <= vwap_bias <= 5:
+                            reasons.append(f"🛡️ 貼近法人成本安全邊際 (乖離僅 {vwap_bias:.1f}%)")
+                        if not reasons:
+                            reasons.append("✨ 符合『籌碼沉澱 + 營收爆發 + 剛起漲』之黃金交叉")
+                    reasons_html = "<br>".join(reasons) if reasons else "不符合黑馬指標條件"
+
+                    tooltip_html = f"""
+                    <div style='font-family: Arial, sans-serif; font-size: 13px; color: #E0E0E0; line-height: 1.45;'>
+                        <b style='color: #FFD700; font-size: 14px;'>{sid} {name_str}</b> | L3Score: <b style='color: #B388FF;'>{l3_score_val:.1f}</b> {'<span style="color:#FFD700;">★黑馬特選股</span>' if is_dark_horse else ''}<br>
+                        <hr style='background-color: #555; height: 1px; border: none; margin: 5px 0;'>
+
+                        <b style='color: #00FFCC;'>📊 【L3Score 得分細項拆解】:</b><br>
+                        <span style='color: #FFFFFF;'>{score_breakdown_html}</span><br>
+                        <br>
+                        <b style='color: #FFD700;'>🎯 【黑馬選股判定依據】:</b><br>
+                        <span style='color: #FFB74D; font-weight: bold;'>{reasons_html}</span><br>
+                        <hr style='background-color: #555; height: 1px; border: none; margin: 5px 0;'>
+
+                        <b style='color: #00E5FF;'>[法人成本]</b> {vwap.get('status', '')}<br>
+                        均價: {vwap.get('vwap', 0)} | 乖離率: <b style='color: #FF5252;'>{vwap_bias}%</b><br>
+                        <b style='color: #FF9800;'>[營收動能]</b> {rev.get('status', '')} (斜率: {rev.get('slope', 0)}%)<br>
+                        <b style='color: #69F0AE;'>[獲利純度]</b> {prof.get('status', '')} (營業利益季增: {prof.get('qoq', 0)}%)<br>
+                    </div>
+                    """
+                except:
+                    pass
 
-                    try:
-                        l3_result = L3Scorer.calculate_score(float(rs_val), fundamental_data, kline_df, tags,
-                                                             float(boll_width))
-                        l3_score_val = l3_result.get('L3Score', 0.0)
-                        is_dark_horse = l3_result.get('is_dark_horse', False)
-
-                        vwap = l3_result.get('vwap_info', {})
-                        rev = l3_result.get('rev_info', {})
-                        prof = l3_result.get('prof_info', {})
-
-                        breakdown_parts = []
-                        if float(rs_val) >= 80:
-                            breakdown_parts.append("🟢 RS技術強勢分 (+30)")
-                        elif float(rs_val) >= 50:
-                            breakdown_parts.append("🟡 RS技術中等分 (+15)")
-
-                        v_status = vwap.get('status', '')
-                        if "站上" in v_status or "站在" in v_status:
-                            breakdown_parts.append("🟢 法人成本安全分 (+25)")
-
-                        rev_slope = float(rev.get('slope', 0))
-                        if rev_slope > 10:
-                            breakdown_parts.append(f"🟢 營收動能噴發分 ({rev_slope:+.1f}%) (+25)")
-                        elif rev_slope > 0:
-                            breakdown_parts.append(f"🟡 營收穩定成長分 ({rev_slope:+.1f}%) (+15)")
-
-                        op_qoq = float(prof.get('qoq', 0))
-                        if op_qoq > 20:
-                            breakdown_parts.append(f"🟢 獲利加速品質分 ({op_qoq:+.1f}%) (+20)")
-
-                        score_breakdown_html = "<br>".join(breakdown_parts) if breakdown_parts else "基本技術與價量基本分"
-
-                        reasons = []
-                        if is_dark_horse:
-                            if boll_width < 15:
-                                reasons.append(f"⚡ 布林通道極度收斂 ({boll_width:.1f}%) - 蓄勢突破")
-                            if "ilss" in tags.lower() or "主力" in tags.lower():
-                                reasons.append("🐳 主力暗中掃單特徵 (ILSS技術特徵)")
-                            if float(rs_val) >= 85:
-                                reasons.append(f"📈 RS強度高達 {rs_val:.1f} - 超越市場大眾")
-                            vwap_bias = float(vwap.get('bias_pct', 0))
-                            if 0 <= vwap_bias <= 5:
-                                reasons.append(f"🛡️ 貼近法人成本安全邊際 (乖離僅 {vwap_bias:.1f}%)")
-                            if not reasons:
-                                reasons.append("✨ 符合『籌碼沉澱 + 營收爆發 + 剛起漲』之黃金交叉")
-                        reasons_html = "<br>".join(reasons) if reasons else "不符合黑馬指標條件"
-
-                        tooltip_html = f"""
-                        <div style='font-family: Arial, sans-serif; font-size: 13px; color: #E0E0E0; line-height: 1.45;'>
-                            <b style='color: #FFD700; font-size: 14px;'>{sid} {name_str}</b> | L3Score: <b style='color: #B388FF;'>{l3_score_val:.1f}</b> {'<span style="color:#FFD700;">★黑馬特選股</span>' if is_dark_horse else ''}<br>
-                            <hr style='background-color: #555; height: 1px; border: none; margin: 5px 0;'>
-
-                            <b style='color: #00FFCC;'>📊 【L3Score 得分細項拆解】:</b><br>
-                            <span style='color: #FFFFFF;'>{score_breakdown_html}</span><br>
-                            <br>
-                            <b style='color: #FFD700;'>🎯 【黑馬選股判定依據】:</b><br>
-                            <span style='color: #FFB74D; font-weight: bold;'>{reasons_html}</span><br>
-                            <hr style='background-color: #555; height: 1px; border: none; margin: 5px 0;'>
-
-                            <b style='color: #00E5FF;'>[法人成本]</b> {vwap.get('status', '')}<br>
-                            均價: {vwap.get('vwap', 0)} | 乖離率: <b style='color: #FF5252;'>{vwap_bias}%</b><br>
-                            <b style='color: #FF9800;'>[營收動能]</b> {rev.get('status', '')} (斜率: {rev.get('slope', 0)}%)<br>
-                            <b style='color: #69F0AE;'>[獲利純度]</b> {prof.get('status', '')} (營業利益季增: {prof.get('qoq', 0)}%)<br>
-                        </div>
-                        """
-                    except:
-                        pass
+            res_dict = {
+                "sid": sid, "name": name_str,
+                "close": row_dict.get('今日收盤價', 0),
+                "pct_1d": row_dict.get('今日漲幅(%)', 0),
+                "pct_5d": row_dict.get('5日漲幅(%)', 0),
+                "legal_5d": row_dict.get('法人5日增(%)', 0),
+                "margin_5d": row_dict.get('融資5日增(%)', 0),
+                "rs": rs_val, "tags": tags,
+                "d30w": row_dict.get('30W距離', 99),
+                "dst": row_dict.get('ST距離', 99),
+                "score": l3_score_val, "is_horse": is_dark_horse,
+                "tooltip": tooltip_html
+            }
+            self.stock_computed.emit(res_dict)
 
-                res_dict = {
-                    "sid": sid, "name": name_str,
-                    "close": row_dict.get('今日收盤價', 0),
-                    "pct_1d": row_dict.get('今日漲幅(%)', 0),
-                    "pct_5d": row_dict.get('5日漲幅(%)', 0),
-                    "legal_5d": row_dict.get('法人5日增(%)', 0),
-                    "margin_5d": row_dict.get('融資5日增(%)', 0),
-                    "rs": rs_val, "tags": tags,
-                    "d30w": row_dict.get('30W距離', 99),
-                    "dst": row_dict.get('ST距離', 99),
-                    "score": l3_score_val, "is_horse": is_dark_horse,
-                    "tooltip": tooltip_html
-                }
-                self.stock_computed.emit(res_dict)
-
-            self.progress_updated.emit(total, total, "計算完成")
-        finally:
-            builtins.print = original_print
+        self.progress_updated.emit(total, total, "計算完成")
 
         # 👇 修改：發送完成訊號，並在當前是「黑馬」選單時自動刷新畫面
         self.finished.emit()
@@ -1310,89 +1366,37 @@ class GlobalL3ComputeWorker(QThread):
         self._is_cancelled = True
 
     def run(self):
-        import builtins
-        original_print = builtins.print
-        builtins.print = lambda *args, **kwargs: None
-
         # ✨ 1. 建立集合，負責收集全市場的黑馬股代號
         dark_horse_sids = set()
 
-        try:
-            total = len(self.tasks)
-            for idx, row in enumerate(self.tasks):
-                if self._is_cancelled:
-                    break
-
-                row_dict = row._asdict() if hasattr(row, '_asdict') else row
-                sid = str(row_dict.get('股票代號', ''))
-                rs_val = row_dict.get('RS強度', 0)
-                tags = str(row_dict.get('強勢特徵標籤', ''))
-                name_str = str(row_dict.get('股票名稱', ''))
-
-                # ✨ 2. 降頻渲染：每 5 檔股票才更新一次 UI，防止訊號風暴癱瘓主執行緒
-                if idx % 5 == 0 or idx == total - 1:
-                    self.progress_updated.emit(idx, total, f"{sid} {name_str}")
-
-                fundamental_data = {}
-                json_path = self.project_root / "data" / "fundamentals" / f"{sid}.json"
-                if json_path.exists():
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            fundamental_data = json.load(f)
-                    except:
-                        pass
-
-                kline_df = pd.DataFrame()
-                parquet_tw = self.project_root / "data" / "cache" / "tw" / f"{sid}_TW.parquet"
-                parquet_two = self.project_root / "data" / "cache" / "tw" / f"{sid}_TWO.parquet"
-                kline_path = parquet_tw if parquet_tw.exists() else (parquet_two if parquet_two.exists() else None)
+        # ✨ 2. 降頻渲染：每 5 檔股票才更新一次 UI，防止訊號風暴癱瘓主執行緒
+        loaded, vwap_book = collect_l3_inputs(self, self.tasks, progress_every=5)
 
-                if kline_path:
-                    try:
-                        kline_df = pd.read_parquet(kline_path, engine='pyarrow', memory_map=False).copy()
-                        kline_df.columns = [str(c).lower() for c in kline_df.columns]
-                        if isinstance(kline_df.index, pd.DatetimeIndex):
-                            kline_df['date'] = kline_df.index
-                        elif 'date' not in kline_df.columns and 'timestamp' in kline_df.columns:
-                            kline_df['date'] = pd.to_datetime(kline_df['timestamp'], unit='ms')
-                    except:
-                        pass
+        for row_dict, fundamental_data, has_inputs, boll_width in loaded:
+            if self._is_cancelled:
+                break
 
-                is_dark_horse = False
+            if not has_inputs:
+                continue
 
-                if not kline_df.empty and fundamental_data:
-                    boll_width = row_dict.get('布林寬度(%)', 50.0)
-                    try:
-                        from utils.strategies.technical import TechnicalStrategies
-                        bb_df = TechnicalStrategies.calculate_bollinger_bands(kline_df, window=20)
-                        if not bb_df.empty and not pd.isna(bb_df['BB_Width_Pct'].iloc[-1]):
-                            boll_width = float(bb_df['BB_Width_Pct'].iloc[-1])
-                    except:
-                        pass
+            sid = str(row_dict.get('股票代號', ''))
+            rs_val = row_dict.get('RS強度', 0)
+            tags = str(row_dict.get('強勢特徵標籤', ''))
 
-                    try:
-                        rs_float = float(rs_val) if rs_val else 0.0
-                        boll_float = float(boll_width) if boll_width else 50.0
-
-                        from utils.scoring.l3_score import L3Scorer
-                        l3_result = L3Scorer.calculate_score(rs_float, fundamental_data, kline_df, tags, boll_float)
-                        is_dark_horse = l3_result.get('is_dark_horse', False)
-
-                        # ✨ 3. 如果判定為黑馬特選股，立刻加入集合
-                        if is_dark_horse:
-                            dark_horse_sids.add(sid)
-
-                    except Exception as e:
-                        print(f"❌ {sid} 運算失敗: {e}")
-                        pass
+            try:
+                rs_float = float(rs_val) if rs_val else 0.0
+                boll_float = float(boll_width) if boll_width else 50.0
 
-                # ✨ 4. 這裡原本錯誤呼叫了未定義的 stock_computed，已被徹底拔除。
+                l3_result = L3Scorer.calculate_score(rs_float, fundamental_data, None, tags, boll_float,
+                                                     vwap_res=vwap_book.lookup(sid))
 
-            # ✨ 5. 掃描結束後，將收集到的黑馬名單發送回主 UI
-            if not self._is_cancelled:
-                self.finished_computation.emit(dark_horse_sids)
+                # ✨ 3. 如果判定為黑馬特選股，立刻加入集合
+                if l3_result.get('is_dark_horse', False):
+                    dark_horse_sids.add(sid)
 
-        finally:
-            builtins.print = original_print
+            except Exception as e:
+                print(f"❌ {sid} 運算失敗: {e}")
 
-        self.finished.emit()
\ No newline at end of file
+        # ✨ 4. 掃描結束後，將收集到的黑馬名單發送回主 UI
+        if not self._is_cancelled:
+            self.finished_computation.emit(dark_horse_sids)
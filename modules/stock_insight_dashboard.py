@@ -733,10 +733,12 @@ class StockInsightDashboard(QDialog):
             sid_col = 'sid' if 'sid' in self.full_df.columns else '股票代號'
 
             if not self.full_df.empty and ret_col in self.full_df.columns:
-                self.full_df[ret_col] = pd.to_numeric(self.full_df[ret_col], errors='coerce')
+                # 只取用到的四欄做計算，不修改 (也不複製) 策略頁傳進來的整張大表
+                use_cols = [c for c in dict.fromkeys([ret_col, concept_col, sub_ind_col, sid_col]) if c in self.full_df.columns]
+                full_df = self.full_df[use_cols].assign(**{ret_col: pd.to_numeric(self.full_df[ret_col], errors='coerce')})
 
                 # --- 1. 計算「同業地位」 (找出最精細的產業，算自己的名次) ---
-                if sub_ind_col in self.full_df.columns and sid_col in self.full_df.columns:
+                if sub_ind_col in full_df.columns and sid_col in full_df.columns:
                     my_inds_str = str(self.row_data.get(sub_ind_col, self.row_data.get('MDJ細產業', '')))
                     my_inds = [ind.strip() for ind in my_inds_str.split(',') if ind.strip()]
 
@@ -747,8 +749,8 @@ class StockInsightDashboard(QDialog):
                         if not ind or ind == 'nan': continue
 
                         # 找出全市場屬於這個細產業的所有股票
-                        mask = self.full_df[sub_ind_col].astype(str).str.contains(ind, regex=False, na=False)
-                        group = self.full_df[mask].copy()
+                        mask = full_df[sub_ind_col].astype(str).str.contains(ind, regex=False, na=False)
+                        group = full_df[mask].copy()
                         count = len(group)
 
                         if count >= 2:  # 至少有 2 檔同行才能排名
@@ -771,27 +773,22 @@ class StockInsightDashboard(QDialog):
                         m['industry_text'] = best_ind_display
 
                 # --- 2. 計算「資金風口」 (抓出市場最強題材) ---
-                if concept_col in self.full_df.columns:
-                    all_tags_dict = {}
-                    for idx, row in self.full_df.iterrows():
-                        tags = str(row[concept_col])
-                        if tags and tags != 'nan':
-                            for t in tags.split(','):
-                                t = t.strip()
-                                if t:
-                                    if t not in all_tags_dict:
-                                        all_tags_dict[t] = []
-                                    if pd.notna(row[ret_col]):
-                                        all_tags_dict[t].append(row[ret_col])
+                if concept_col in full_df.columns:
+                    # 攤平成 (題材, 漲幅) 後一次 groupby，取代逐列 iterrows
+                    tags = pd.Series(full_df[concept_col].astype(str).to_numpy())
+                    tags = tags[(tags != '') & (tags != 'nan')].str.split(',').explode().str.strip()
+                    tags = tags[tags != '']
+                    rets = full_df[ret_col].to_numpy()[tags.index.to_numpy(dtype=int)]
+                    tag_rets = pd.DataFrame({'tag': tags.to_numpy(), 'ret': rets})
+                    tag_stats = tag_rets.groupby('tag', sort=False)['ret'].agg(['count', 'sum'])
 
                     valid_tags = []
-                    for t, rets in all_tags_dict.items():
-                        count = len(rets)
+                    for t, count, ret_sum in tag_stats.itertuples(name=None):
                         if 2 <= count <= 45:  # 嚴格過濾大鍋炒標籤 (保留 2~45 檔的精細概念)
                             valid_tags.append({
                                 'tag': t,
-                                'mean_return': sum(rets) / count,
-                                'count': count
+                                'mean_return': ret_sum / count,
+                                'count': int(count)
                             })
 
                     if valid_tags:
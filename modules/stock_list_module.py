@@ -4,13 +4,14 @@ import datetime
 import pandas as pd
 import copy  # <-- 新增這行 (用於深拷貝字典)
 from pathlib import Path
-from PyQt6.QtCore import pyqtSignal, Qt, QStringListModel, QTimer
+from PyQt6.QtCore import (pyqtSignal, Qt, QStringListModel, QTimer, QAbstractTableModel,
+                          QModelIndex, QSortFilterProxyModel)
 from PyQt6.QtGui import QColor, QAction, QFont, QBrush
 
 from utils.data_downloader import DataDownloader
 from utils.quote_worker import QuoteWorker
 from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableView,
                              QHeaderView, QAbstractItemView, QLineEdit,
                              QHBoxLayout, QPushButton, QCompleter, QMenu, QComboBox,
                              QMessageBox, QDialog, QInputDialog, QListWidget)
@@ -243,13 +244,84 @@ class BackgroundDelegate(QStyledItemDelegate):
         # 接著呼叫原生的 paint 來畫出文字與原本的 CSS 底線
         super().paint(painter, option, index)
 
-class NumericTableWidgetItem(QTableWidgetItem):
-    def __lt__(self, other):
-        try:
-            return float(self.text().replace(',', '').replace('%', '')) < float(
-                other.text().replace(',', '').replace('%', ''))
-        except ValueError:
-            return super().__lt__(other)
+# 排序用數值 (QSortFilterProxyModel 以此角色排序，'-' 等非數字排最小)
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+RIGHT_ALIGN = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+
+
+def _sort_key(text):
+    try:
+        return float(str(text).replace(',', '').replace('%', ''))
+    except ValueError:
+        return float('-inf')
+
+
+class WatchlistTableModel(QAbstractTableModel):
+    """
+    自選股表格 Model
+
+    每格存 (文字, 前景色, 背景色)；即時報價只比對並更新有變動的格子 (dataChanged)，
+    不重建整張表
+    """
+
+    def __init__(self, columns_config, parent=None):
+        super().__init__(parent)
+        self.headers = [cfg[1] for cfg in columns_config]
+        self.codes = []
+        self.markets = []
+        self.cells = []           # rows × cols 的 [text, fg, bg]
+        self.row_mapping = {}     # code -> row
+
+    def set_rows(self, rows):
+        """整表重設 (僅在切換群組 / 增刪股票時使用)；rows = [(code, market, [cell, ...]), ...]"""
+        self.beginResetModel()
+        self.codes = [r[0] for r in rows]
+        self.markets = [r[1] for r in rows]
+        self.cells = [[list(c) for c in r[2]] for r in rows]
+        self.row_mapping = {code: i for i, code in enumerate(self.codes)}
+        self.endResetModel()
+
+    def patch_row(self, code, updates):
+        """updates = {col: (text, fg, bg)}，只對實際變動的欄位發出 dataChanged"""
+        row = self.row_mapping.get(code)
+        if row is None: return
+        changed = []
+        for col, cell in updates.items():
+            cell = list(cell)
+            if self.cells[row][col] != cell:
+                self.cells[row][col] = cell
+                changed.append(col)
+        if changed:
+            self.dataChanged.emit(self.index(row, min(changed)), self.index(row, max(changed)))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.cells)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        row, col = index.row(), index.column()
+        text, fg, bg = self.cells[row][col]
+
+        if role == Qt.ItemDataRole.DisplayRole: return text
+        if role == Qt.ItemDataRole.ForegroundRole: return fg
+        if role == Qt.ItemDataRole.BackgroundRole:
+            # 🔥 PyQt6 背景必須是 QBrush 才能成功渲染
+            return QBrush(bg) if bg is not None else None
+        if role == SORT_ROLE: return text if col < 2 else _sort_key(text)
+        if col == 0:
+            if role == Qt.ItemDataRole.FontRole: return QFont("Consolas", 11, QFont.Weight.Bold)
+            if role == Qt.ItemDataRole.UserRole: return self.markets[row]
+        elif col >= 2 and role == Qt.ItemDataRole.TextAlignmentRole:
+            return RIGHT_ALIGN
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
 
 
 class StockListModule(QWidget):
@@ -259,8 +331,8 @@ class StockListModule(QWidget):
         super().__init__(parent)
         self.stock_db = {}
         self.downloader = DataDownloader()
+        # 日線快照 (昨收 / 漲跌 / 量)：整個 session 只讀一次，檔案 mtime 變動才重讀
         self.history_cache = {}
-        self.row_mapping = {}
         self.has_auto_selected = False
 
         self.json_path = Path("data/watchlist.json")
@@ -353,7 +425,13 @@ class StockListModule(QWidget):
         top_layout.addWidget(self.btn_add, 1)
         layout.addWidget(top_container)
 
-        self.table = QTableWidget()
+        self.table = QTableView()
+        self.model = WatchlistTableModel(self.columns_config, self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(SORT_ROLE)
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
         self.setup_table_columns()
         self.table.verticalHeader().setVisible(False)
 
@@ -362,25 +440,29 @@ class StockListModule(QWidget):
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
 
         self.table.setStyleSheet("""
-                    QTableWidget { background-color: #000000; font-family: 'Consolas', 'Microsoft JhengHei'; font-size: 14px; }
+                    QTableView { background-color: #000000; font-family: 'Consolas', 'Microsoft JhengHei'; font-size: 14px; }
                     QHeaderView::section { background-color: #1A1A1A; color: #BBB; border: none; font-weight: bold; }
-                    QTableWidget::item { background-color: transparent; border-bottom: 1px solid #222; padding-right: 5px; }
-                    QTableWidget::item:selected { background-color: #444; color: #FFF; }
+                    QTableView::item { background-color: transparent; border-bottom: 1px solid #222; padding-right: 5px; }
+                    QTableView::item:selected { background-color: #444; color: #FFF; }
                 """)
         self.table.setItemDelegate(BackgroundDelegate(self.table))
-        self.table.cellClicked.connect(self.on_row_clicked)
+        self.table.clicked.connect(self.on_row_clicked)
         self.table.customContextMenuRequested.connect(self.open_context_menu)
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 
         layout.addWidget(self.table)
         self.refresh_table()
 
+    def _code_at(self, view_row):
+        """表格顯示列 (可能已排序) → 股票代號"""
+        return self.proxy.index(view_row, 0).data()
+
     def _auto_select_first_row(self):
-        if self.table.rowCount() > 0:
+        if self.proxy.rowCount() > 0:
             self.table.selectRow(0)
-            item = self.table.item(0, 0)
-            if item:
-                self._emit_smart_stock_id(item.text())
+            code = self._code_at(0)
+            if code:
+                self._emit_smart_stock_id(code)
             self.has_auto_selected = True
 
     def check_if_data_up_to_date(self):
@@ -485,9 +567,6 @@ class StockListModule(QWidget):
             pass
 
     def setup_table_columns(self):
-        col_names = [cfg[1] for cfg in self.columns_config]
-        self.table.setColumnCount(len(col_names))
-        self.table.setHorizontalHeaderLabels(col_names)
         header = self.table.horizontalHeader()
         for i, (key, name, width) in enumerate(self.columns_config):
             if width > 0:
@@ -547,21 +626,20 @@ class StockListModule(QWidget):
             QTimer.singleShot(100, self.refresh_table)
 
     def open_context_menu(self, pos):
-        selected_items = self.table.selectedItems()
-        if not selected_items: return
+        rows = self.table.selectionModel().selectedRows()
+        if not rows: return
 
-        rows = set(item.row() for item in selected_items)
+        codes = [self._code_at(idx.row()) for idx in rows]
 
         menu = QMenu()
         menu.setStyleSheet(
             "QMenu { background: #222; color: #FFF; border: 1px solid #555; } QMenu::item:selected { background: #444; }")
-        act = QAction(f"🗑️ 刪除選取的 {len(rows)} 檔", self)
-        act.triggered.connect(lambda: self.delete_stocks(rows))
+        act = QAction(f"🗑️ 刪除選取的 {len(codes)} 檔", self)
+        act.triggered.connect(lambda: self.delete_stocks(codes))
         menu.addAction(act)
         menu.exec(self.table.viewport().mapToGlobal(pos))
 
-    def delete_stocks(self, rows):
-        codes_to_delete = [self.table.item(r, 0).text() for r in rows]
+    def delete_stocks(self, codes_to_delete):
         curr = self.watchlists[self.current_group]
 
         for code in codes_to_delete:
@@ -605,210 +683,160 @@ class StockListModule(QWidget):
         suffix = "_TWO" if market in ['TWO', 'OTC', '上櫃'] else "_TW"
         self.stock_selected.emit(f"{code}{suffix}")
 
-    def on_row_clicked(self, row, col):
-        item = self.table.item(row, 0)
-        if item: self._emit_smart_stock_id(item.text())
-
-
-    def _set_cell(self, row, col, text, color=None, bg_color=None, is_num=False):
-        if is_num:
-            item = NumericTableWidgetItem(str(text))
-        else:
-            item = QTableWidgetItem(str(text))
+    def on_row_clicked(self, index):
+        code = self._code_at(index.row())
+        if code: self._emit_smart_stock_id(code)
 
-        if color:
-            item.setForeground(color)
-        else:
-            item.setForeground(QColor("white"))
 
-        if bg_color:
-            # 🔥 關鍵修正：在 PyQt6 中，背景必須套上 QBrush(畫刷) 才能成功渲染！
-            item.setBackground(QBrush(QColor(bg_color)))
+    @staticmethod
+    def _price_cells(price, prev_close):
+        """成交 / 漲跌 / 漲跌% 三格 (含漲跌停底色)"""
+        color, bg_color = QColor("white"), None
+        change_str, pct_str = "-", "-"
+
+        if prev_close > 0:
+            change = price - prev_close
+            pct = (change / prev_close) * 100
+
+            change_str = f"{change:+.2f}"
+            pct_str = f"{pct:+.2f}%"
+
+            if pct >= 9.5:
+                color = QColor("#FFFFFF")  # 漲停字體維持白色以確保對比度
+                bg_color = QColor("#D32F2F")  # 恢復明顯的實心紅底色
+            elif pct <= -9.5:
+                color = QColor("#FFFFFF")  # 跌停字體維持白色
+                bg_color = QColor("#2E7D32")  # 恢復明顯的實心綠底色
+            elif change > 0:
+                color = QColor("#FF3333")
+            elif change < 0:
+                color = QColor("#00FF00")
+
+        return {2: (f"{price:.2f}", color, bg_color),
+                3: (change_str, color, bg_color),
+                4: (pct_str, color, bg_color)}
+
+    def _find_cache_file(self, code):
+        base_cache_path = Path("data/cache/tw")
+        for suffix in ["_TW.parquet", "_TWO.parquet", ".parquet"]:
+            p = base_cache_path / f"{code}{suffix}"
+            if p.exists():
+                return p
+        return None
 
-        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-        self.table.setItem(row, col, item)
+    def _daily_snapshot(self, code):
+        """
+        日線快照 {'last', 'prev', 'volume'}；以檔案 mtime 為鍵快取，
+        切換群組 / 回到戰情室時不再重讀 parquet
+        """
+        target_file = self._find_cache_file(code)
+        if target_file is None:
+            return None
+        mtime = target_file.stat().st_mtime
+        cached = self.history_cache.get(code)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        snap = None
+        try:
+            df = pd.read_parquet(target_file)
+            cols = {c.lower(): c for c in df.columns}
+            c_col, v_col = cols.get('close'), cols.get('volume')
+            if c_col and not df.empty:
+                tail = df.iloc[-2:]
+                snap = {
+                    'last': float(tail[c_col].iloc[-1]),
+                    'prev': float(tail[c_col].iloc[0]) if len(tail) >= 2 else 0.0,
+                    'volume': float(tail[v_col].iloc[-1]) if v_col else None,
+                }
+        except Exception as e:
+            print(f"Error reading {target_file}: {e}")
+        self.history_cache[code] = (mtime, snap)
+        return snap
 
     def refresh_table(self):
-        self.table.setUpdatesEnabled(False)
-        self.table.setSortingEnabled(False)
-
         try:
-            self.table.setRowCount(0)
-            self.history_cache = {}
-            self.row_mapping = {}
-
             current_list = self.watchlists.get(self.current_group, [])
-            self.table.setRowCount(len(current_list))
 
             if hasattr(self, 'quote_worker') and self.btn_monitor.isChecked():
                 self.quote_worker.set_monitoring_stocks(current_list, source='watchlist')
 
-            base_cache_path = Path("data/cache/tw")
-
-            for i, code in enumerate(current_list):
-                self.row_mapping[code] = i
+            white, gray = QColor("white"), QColor("#CCCCCC")
+            rows = []
+            for code in current_list:
                 info = self.stock_db.get(code, {"name": code, "market": "TW"})
-
-                last_close = 0
-                target_file = None
-
-                for suffix in ["_TW.parquet", "_TWO.parquet", ".parquet"]:
-                    p = base_cache_path / f"{code}{suffix}"
-                    if p.exists():
-                        target_file = p
-                        break
-
-                item_id = QTableWidgetItem(code)
-                item_id.setForeground(QColor("#00E5FF"))
-                item_id.setFont(QFont("Consolas", 11, QFont.Weight.Bold))
-                item_id.setData(Qt.ItemDataRole.UserRole, info['market'])
-                self.table.setItem(i, 0, item_id)
-
-                item_name = QTableWidgetItem(info['name'])
-                item_name.setForeground(QColor("white"))
-                self.table.setItem(i, 1, item_name)
-
-                change_str, pct_str = "-", "-"
-                fg_color = QColor("#CCCCCC")
-                bg_color = None
-                vol_str = "-"
-
-                if target_file:
-                    try:
-                        df = pd.read_parquet(target_file)
-                        if not df.empty and len(df) >= 1:
-                            cols = {c.lower(): c for c in df.columns}
-                            c_col = cols.get('close')
-                            v_col = cols.get('volume')
-
-                            if c_col:
-                                last_close = float(df.iloc[-1][c_col])
-                                self.history_cache[code] = {'prev': last_close}
-
-                            if c_col and len(df) >= 2:
-                                prev_close = float(df.iloc[-2][c_col])
-                                change = last_close - prev_close
-                                pct = (change / prev_close) * 100 if prev_close != 0 else 0
-
-                                change_str = f"{change:+.2f}"
-                                pct_str = f"{pct:+.2f}%"
-
-                                if pct >= 9.5:
-                                    fg_color = QColor("#FFFFFF")  # 漲停字體維持白色以確保對比度
-                                    bg_color = "#D32F2F"  # 恢復明顯的實心紅底色
-                                elif pct <= -9.5:
-                                    fg_color = QColor("#FFFFFF")  # 跌停字體維持白色
-                                    bg_color = "#2E7D32"  # 恢復明顯的實心綠底色
-                                elif change > 0:
-                                    fg_color = QColor("#FF3333")
-                                elif change < 0:
-                                    fg_color = QColor("#00FF00")
-                                else:
-                                    fg_color = QColor("#FFFFFF")
-
-                            if v_col:
-                                volume = float(df.iloc[-1][v_col])
-                                vol_str = f"{int(volume / 1000):,}"
-
-                    except Exception as e:
-                        print(f"Error reading {target_file}: {e}")
-
-                if last_close > 0:
-                    self._set_cell(i, 2, f"{last_close:.2f}", fg_color, bg_color=bg_color, is_num=True)
-                    self._set_cell(i, 3, change_str, fg_color, bg_color=bg_color, is_num=True)
-                    self._set_cell(i, 4, pct_str, fg_color, bg_color=bg_color, is_num=True)
-                    self._set_cell(i, 5, vol_str, QColor("#FFFF00"), is_num=True)
-                    self._set_cell(i, 6, vol_str, QColor("#CCCCCC"), is_num=True)
+                cells = [(code, QColor("#00E5FF"), None), (info['name'], white, None)]
+
+                snap = self._daily_snapshot(code)
+                if snap and snap['last'] > 0:
+                    vol_str = f"{int(snap['volume'] / 1000):,}" if snap['volume'] is not None else "-"
+                    price_cells = self._price_cells(snap['last'], snap['prev'])
+                    if snap['prev'] <= 0:
+                        # 只有一筆資料時沒有漲跌，維持灰字
+                        price_cells = {c: (t, gray, None) for c, (t, _, _) in price_cells.items()}
+                    cells += [price_cells[2], price_cells[3], price_cells[4],
+                              (vol_str, QColor("#FFFF00"), None), (vol_str, gray, None)]
                 else:
-                    for c in range(2, 7):
-                        self._set_cell(i, c, "-", is_num=True)
+                    cells += [("-", white, None)] * 5
+                cells.append(("", white, None))
+                rows.append((code, info['market'], cells))
+
+            self.model.set_rows(rows)
 
         except Exception as e:
             print(f"Error refreshing table: {e}")
         finally:
-            self.table.setSortingEnabled(True)
-            self.table.setUpdatesEnabled(True)
-
             if not self.has_auto_selected:
                 QTimer.singleShot(500, self._auto_select_first_row)
 
     def force_trigger_first_selection(self):
-        if self.table.rowCount() > 0:
+        if self.proxy.rowCount() > 0:
             self.table.selectRow(0)
-            item = self.table.item(0, 0)
-            if item:
-                self.on_row_clicked(0, 0)
+            self.on_row_clicked(self.proxy.index(0, 0))
 
     def update_streaming_data(self, data):
-        self.table.setUpdatesEnabled(False)
-        try:
-            def safe_float(v):
-                try:
-                    return float(v)
-                except:
-                    return 0.0
-
-            def to_lots_str(v):
-                if v == '-' or v == '' or v is None: return '-'
-                try:
-                    return f"{int(float(v) / 1000):,}"
-                except:
-                    return '-'
-
-            for code, stock_data in data.items():
-                row = self.row_mapping.get(code)
-                if row is None: continue
-
-                real = stock_data.get('realtime', {})
-                info = stock_data.get('info', {})
-
-                try:
-                    latest = safe_float(real.get('latest_trade_price'))
-                    close_p = safe_float(real.get('close'))
-                    price = latest if latest > 0 else close_p
-                    if price == 0: continue
-
-                    api_prev = safe_float(real.get('previous_close'))
-                    prev_close = api_prev if api_prev > 0 else self.history_cache.get(code, {}).get('prev', 0)
-
-                    color = QColor("white")
-                    bg_color = None
-                    change_str = "-"
-                    pct_str = "-"
-
-                    if prev_close > 0:
-                        change = price - prev_close
-                        pct = (change / prev_close) * 100
-
-                        change_str = f"{change:+.2f}"
-                        pct_str = f"{pct:+.2f}%"
-
-                        if pct >= 9.5:
-                            color = QColor("#FFFFFF")  # 漲停字體維持白色
-                            bg_color = "#D32F2F"  # 恢復明顯的實心紅底色
-                        elif pct <= -9.5:
-                            color = QColor("#FFFFFF")  # 跌停字體維持白色
-                            bg_color = "#2E7D32"  # 恢復明顯的實心綠底色
-                        elif change > 0:
-                            color = QColor("#FF3333")
-                        elif change < 0:
-                            color = QColor("#00FF00")
-
-                    self._set_cell(row, 2, f"{price:.2f}", color, bg_color=bg_color, is_num=True)
-                    self._set_cell(row, 3, change_str, color, bg_color=bg_color, is_num=True)
-                    self._set_cell(row, 4, pct_str, color, bg_color=bg_color, is_num=True)
-
-                    vol_str = to_lots_str(real.get('trade_volume', '-'))
-                    total_vol_str = to_lots_str(real.get('accumulate_trade_volume', '-'))
-
-                    self._set_cell(row, 5, vol_str, QColor("#FFFF00"), is_num=True)
-                    self._set_cell(row, 6, total_vol_str, QColor("#CCCCCC"), is_num=True)
-
-                    t = info.get('time', '-')
-                    if ' ' in t: t = t.split(' ')[1]
-                    self._set_cell(row, 7, t, QColor("#AAA"))
-
-                except Exception:
-                    pass
-        finally:
-            self.table.setUpdatesEnabled(True)
\ No newline at end of file
+        """接收合併後的報價 frame，只更新有變動的格子"""
+        def safe_float(v):
+            try:
+                return float(v)
+            except:
+                return 0.0
+
+        def to_lots_str(v):
+            if v == '-' or v == '' or v is None: return '-'
+            try:
+                return f"{int(float(v) / 1000):,}"
+            except:
+                return '-'
+
+        for code, stock_data in data.items():
+            if code not in self.model.row_mapping: continue
+
+            real = stock_data.get('realtime', {})
+            info = stock_data.get('info', {})
+
+            try:
+                latest = safe_float(real.get('latest_trade_price'))
+                close_p = safe_float(real.get('close'))
+                price = latest if latest > 0 else close_p
+                if price == 0: continue
+
+                api_prev = safe_float(real.get('previous_close'))
+                if api_prev > 0:
+                    prev_close = api_prev
+                else:
+                    snap = self._daily_snapshot(code)
+                    prev_close = snap['last'] if snap else 0
+
+                updates = self._price_cells(price, prev_close)
+                updates[5] = (to_lots_str(real.get('trade_volume', '-')), QColor("#FFFF00"), None)
+                updates[6] = (to_lots_str(real.get('accumulate_trade_volume', '-')), QColor("#CCCCCC"), None)
+
+                t = info.get('time', '-')
+                if ' ' in t: t = t.split(' ')[1]
+                updates[7] = (t, QColor("#AAA"), None)
+
+                self.model.patch_row(code, updates)
+
+            except Exception:
+                pass
@@ -1,6 +1,7 @@
 import sys
 import json
 import time
+import numpy as np
 import pandas as pd
 import webbrowser
 from PyQt6.QtWidgets import QApplication  # 如果原本沒有 QApplication 請補上
@@ -13,9 +14,12 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QDialogButtonBox, QRadioButton, QButtonGroup, QToolButton,
                              QSizePolicy, QInputDialog, QLineEdit, QListWidget, QListWidgetItem,
                              QCompleter,QTabWidget)
-from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QSortFilterProxyModel, QThread, QTimer, QSize
+from PyQt6.QtCore import (Qt, pyqtSignal, QAbstractTableModel, QIdentityProxyModel, QModelIndex, QThread, QTimer,
+                          QSize)
 from PyQt6.QtGui import QColor, QAction, QCursor, QFont
 from modules.stock_insight_dashboard import StockInsightDashboard
+from utils import snapshot_store
+from utils.strategy_filter import StrategyFilterEngine
 
 # ==========================================
 # 1. 全欄位設定
@@ -249,7 +253,8 @@ class DataLoaderThread(QThread):
             csv_path = base_path / "data" / "strategy_results" / "戰情室今日快照_全中文版.csv"
             df = pd.DataFrame()
             if f_path.exists():
-                df = pd.read_parquet(f_path)
+                # 共用快照 (與板塊戰情室同一份 Arrow Table，檔案未變動時不重讀)
+                df = snapshot_store.load_frame(path=f_path)
             elif csv_path.exists():
                 df = pd.read_csv(csv_path)
             else:
@@ -649,24 +654,137 @@ class RangeFilterWidget(QWidget):
         self.emit_change()
 
 
+# 表格配色 (共用同一批 QColor 物件，data() 不再每次建立)
+COLOR_UP = QColor("#FF4444")
+COLOR_DOWN = QColor("#00CC00")
+COLOR_TEXT = QColor("#E0E0E0")
+COLOR_LIMIT_TEXT = QColor("#FFFFFF")
+COLOR_LIMIT_UP_BG = QColor("#D32F2F")
+COLOR_LIMIT_DOWN_BG = QColor("#2E7D32")
+LIMIT_COLS = ('現價', '漲幅1d')
+SIGNED_COLOR_KEYS = ('漲幅', 'sum', 'net', 'yoy', 'eps', 'streak', 'qoq', 'diff', 'cash_flow')
+
+
+def _cell_formatter(col_key):
+    """依欄位名稱決定數值格式 (每欄只判斷一次)"""
+    if col_key == '現價': return lambda v: f"{v:,.2f}".rstrip('0').rstrip('.')
+    if col_key in ['RS強度', 'pe', 'pbr', '量比', 'fund_eps_cum']: return lambda v: f"{v:.1f}"
+    if any(x in col_key for x in ['漲幅', 'yield', 'width', 'yoy', 'qoq', 'diff']): return lambda v: f"{v:.2f}%"
+    if any(x in col_key for x in ['sum', 'net', 'cash_flow']): return lambda v: f"{v:,.0f}"
+    if any(x in col_key for x in ['streak', 'offset']): return lambda v: f"{int(v)}"
+    return lambda v: f"{v:,.2f}"
+
+
+class _ColumnCache:
+    """單一欄位的顯示快取：原始值、顯示字串、字色、底色 (皆為與列號對齊的陣列)"""
+    __slots__ = ('values', 'display', 'foreground', 'background')
+
+    def __init__(self, col_key, values, pct_1d, limit_up, limit_down):
+        self.values = values
+        n = len(values)
+
+        # 與舊版相同：只有 Python/NumPy 的 int、float 走數值格式，其餘一律 str()
+        is_num = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=n)
+        if col_key == 'insight':
+            self.display = np.full(n, "🔍", dtype=object)
+        else:
+            fmt = _cell_formatter(col_key)
+            self.display = np.array([fmt(v) if num else str(v) for v, num in zip(values, is_num)], dtype=object)
+
+        fg = np.full(n, COLOR_TEXT, dtype=object)
+        if any(x in col_key for x in SIGNED_COLOR_KEYS):
+            nums = np.array([float(v) if num else np.nan for v, num in zip(values, is_num)], dtype='float64')
+            fg[nums > 0] = COLOR_UP
+            fg[nums < 0] = COLOR_DOWN
+        if col_key == '現價':
+            fg[pct_1d > 0] = COLOR_UP
+            fg[pct_1d < 0] = COLOR_DOWN
+        self.background = None
+        if col_key in LIMIT_COLS:
+            # 漲跌停亮燈時，為了配深色底，字體強制為「純白色」
+            fg[limit_up | limit_down] = COLOR_LIMIT_TEXT
+            self.background = np.full(n, None, dtype=object)
+            self.background[limit_up] = COLOR_LIMIT_UP_BG      # 漲停板：實心暗紅色
+            self.background[limit_down] = COLOR_LIMIT_DOWN_BG  # 跌停板：實心暗綠色
+        self.foreground = fg
+
+
 class StrategyTableModel(QAbstractTableModel):
+    """
+    以欄位陣列為底的表格模型
+    update_data() 時只擷取各欄的 NumPy 陣列與漲跌停旗標；顯示字串與顏色在該欄第一次繪製時整欄算好，
+    之後 data() 都只是陣列索引
+    """
+
     def __init__(self, df=pd.DataFrame(), visible_cols=[]):
         super().__init__()
+        self.checked_sids = set()  # 用於記錄打勾的股票代號
+        self._set_frame(df, visible_cols)
+
+    def _set_frame(self, df, visible_cols):
         self._df = df
         self.visible_cols = visible_cols
-        self.checked_sids = set()  # 用於記錄打勾的股票代號
+        self._n = len(df)
+        self._sids = df['sid'].astype(str).to_numpy(dtype=object) if 'sid' in df.columns else np.full(self._n, '', dtype=object)
+
+        # ==========================================
+        # 🚀 漲跌停板計算規則 (台股漲跌幅限制 10%，因升降單位取 >= 9.85% 最準確)
+        # ==========================================
+        if '漲幅1d' in df.columns:
+            self._pct_1d = pd.to_numeric(df['漲幅1d'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            self._pct_1d = np.zeros(self._n)
+        with np.errstate(invalid='ignore'):
+            self._limit_up = self._pct_1d >= 9.85
+            self._limit_down = self._pct_1d <= -9.85
+        self._columns = [None] * len(visible_cols)
 
     def update_data(self, df, visible_cols):
         self.beginResetModel()
-        self._df = df
-        self.visible_cols = visible_cols
+        self._set_frame(df, visible_cols)
         # 過濾後，只保留還在當前表格內的打勾名單
-        current_sids = set(df['sid'].astype(str)) if 'sid' in df.columns else set()
-        self.checked_sids = self.checked_sids.intersection(current_sids)
+        self.checked_sids = self.checked_sids.intersection(self._sids)
         self.endResetModel()
 
+    def _column(self, c):
+        cache = self._columns[c]
+        if cache is None:
+            col_key = self.visible_cols[c]
+            values = self._df[col_key].to_numpy() if col_key in self._df.columns else np.full(self._n, '', dtype=object)
+            cache = self._columns[c] = _ColumnCache(col_key, values, self._pct_1d, self._limit_up, self._limit_down)
+        return cache
+
+    def sid_at(self, row):
+        return self._sids[row]
+
+    def argsort(self, column, descending=False):
+        """
+        整欄一次算出排序後的來源列號 (穩定排序)
+        數值欄依數值、其餘依字串；缺值不論升降冪一律排最後；第 0 欄依是否打勾
+        """
+        if column == 0:
+            keys = np.fromiter((sid in self.checked_sids for sid in self._sids), dtype=bool, count=self._n)
+            keys = keys.astype('float64')
+        elif 0 < column <= len(self.visible_cols):
+            col_key = self.visible_cols[column - 1]
+            series = self._df[col_key] if col_key in self._df.columns else pd.Series(np.nan, index=self._df.index)
+            nums = pd.to_numeric(series, errors='coerce')
+            if pd.api.types.is_numeric_dtype(series) or nums.notna().sum() == series.notna().sum():
+                keys = nums.to_numpy(dtype='float64', na_value=np.nan)
+            else:
+                # 字串欄：先轉成排名，再與數值欄共用同一套排序
+                missing = series.isna().to_numpy()
+                codes = np.unique(np.array([str(v) for v in series], dtype=str), return_inverse=True)[1].astype('float64')
+                keys = np.where(missing, np.nan, codes)
+        else:
+            return np.arange(self._n)
+
+        valid = np.flatnonzero(~np.isnan(keys))
+        order = np.argsort(-keys[valid] if descending else keys[valid], kind='stable')
+        return np.concatenate([valid[order], np.flatnonzero(np.isnan(keys))])
+
     def rowCount(self, parent=None):
-        return self._df.shape[0]
+        return self._n
 
     def columnCount(self, parent=None):
         return len(self.visible_cols) + 1  # 第 0 欄為 Checkbox
@@ -680,65 +798,23 @@ class StrategyTableModel(QAbstractTableModel):
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid(): return None
+        row = index.row()
         if index.column() == 0:
-            sid = str(self._df.iloc[index.row()].get('sid', ''))
             if role == Qt.ItemDataRole.CheckStateRole:
-                return Qt.CheckState.Checked if sid in self.checked_sids else Qt.CheckState.Unchecked
+                return Qt.CheckState.Checked if self._sids[row] in self.checked_sids else Qt.CheckState.Unchecked
             return None
 
-        col_key = self.visible_cols[index.column() - 1]
-        value = self._df.iloc[index.row()][col_key]
-
-        if col_key == 'insight' and role == Qt.ItemDataRole.DisplayRole: return "🔍"
-        if role == Qt.ItemDataRole.UserRole: return value
-
-        if role == Qt.ItemDataRole.DisplayRole:
-            if isinstance(value, (int, float)):
-                if col_key == '現價': return f"{value:,.2f}".rstrip('0').rstrip('.')
-                if col_key in ['RS強度', 'pe', 'pbr', '量比', 'fund_eps_cum']: return f"{value:.1f}"
-                if any(x in col_key for x in ['漲幅', 'yield', 'width', 'yoy', 'qoq', 'diff']): return f"{value:.2f}%"
-                if any(x in col_key for x in ['sum', 'net', 'cash_flow']): return f"{value:,.0f}"
-                if any(x in col_key for x in ['streak', 'offset']): return f"{int(value)}"
-                return f"{value:,.2f}"
-            return str(value)
-
-        # ==========================================
-        # 🚀 漲跌停板計算規則 (台股漲跌幅限制 10%，因升降單位取 >= 9.85% 最準確)
-        # ==========================================
-        pct_1d = self._df.iloc[index.row()].get('漲幅1d', 0)
-        is_limit_up = (pct_1d >= 9.85)
-        is_limit_down = (pct_1d <= -9.85)
-
-        # 🚀 字體顏色 (ForegroundRole)
-        if role == Qt.ItemDataRole.ForegroundRole:
-            # 漲跌停亮燈時，為了配深色底，字體強制為「純白色」
-            if (is_limit_up or is_limit_down) and col_key in ['現價', '漲幅1d']:
-                return QColor("#FFFFFF")
-
-            # 一般紅綠字體邏輯
-            if col_key == '現價':
-                if pct_1d > 0: return QColor("#FF4444")
-                if pct_1d < 0: return QColor("#00CC00")
-            if isinstance(value, (int, float)):
-                if any(x in col_key for x in ['漲幅', 'sum', 'net', 'yoy', 'eps', 'streak', 'qoq', 'diff', 'cash_flow']):
-                    if value > 0: return QColor("#FF4444")
-                    if value < 0: return QColor("#00CC00")
-            return QColor("#E0E0E0")
-
-        # 🚀 背景顏色 (BackgroundRole) - 製作亮燈底色
+        if role == Qt.ItemDataRole.DisplayRole: return self._column(index.column() - 1).display[row]
+        if role == Qt.ItemDataRole.ForegroundRole: return self._column(index.column() - 1).foreground[row]
         if role == Qt.ItemDataRole.BackgroundRole:
-            # 漲停板：漂亮不刺眼的「實心暗紅色」
-            if is_limit_up and col_key in ['現價', '漲幅1d']:
-                return QColor("#D32F2F")
-            # 跌停板：漂亮不刺眼的「實心暗綠色」
-            if is_limit_down and col_key in ['現價', '漲幅1d']:
-                return QColor("#2E7D32")
-
+            bg = self._column(index.column() - 1).background
+            return None if bg is None else bg[row]
+        if role == Qt.ItemDataRole.UserRole: return self._column(index.column() - 1).values[row]
         return None
 
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
         if index.isValid() and role == Qt.ItemDataRole.CheckStateRole and index.column() == 0:
-            sid = str(self._df.iloc[index.row()].get('sid', ''))
+            sid = self._sids[index.row()]
             if value == Qt.CheckState.Checked.value:
                 self.checked_sids.add(sid)
             else:
@@ -759,40 +835,75 @@ class StrategyTableModel(QAbstractTableModel):
         return None
 
 
-class NumericSortProxy(QSortFilterProxyModel):
-    def sort(self, column, order):
-        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-        try:
-            self.setDynamicSortFilter(False)
-            super().sort(column, order)
-        finally:
-            self.setDynamicSortFilter(True)
-            QApplication.restoreOverrideCursor()
+class NumericSortProxy(QIdentityProxyModel):
+    """
+    以列號陣列做排序的代理模型
+    點擊表頭時由來源模型一次算好 argsort 排列，代理只負責「畫面列 <-> 來源列」的陣列查表，
+    不再走 QSortFilterProxyModel 每次比較都回呼 lessThan 的 O(n log n) 路徑
+    """
 
-    def lessThan(self, left, right):
-        source = self.sourceModel()
-        l_row, r_row = left.row(), right.row()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._perm = None   # 畫面列 -> 來源列
+        self._inv = None    # 來源列 -> 畫面列
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
 
-        # 🚀 極速優化：使用 .values (Numpy Array) 直接讀取記憶體，避開 .iloc 造成的龐大物件生成負擔
-        if left.column() == 0:
-            sids = source._df['sid'].values
-            l_checked = str(sids[l_row]) in source.checked_sids
-            r_checked = str(sids[r_row]) in source.checked_sids
-            return bool(l_checked < r_checked)
+    def _mapping_valid(self):
+        source = self.sourceModel()
+        return self._perm is not None and source is not None and len(self._perm) == source.rowCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount() and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        # 來源重設 (重新篩選) 時舊排列作廢，待 invalidate() 依目前排序欄位重算
+        model.modelAboutToBeReset.connect(self._drop_mapping)
+
+    def _drop_mapping(self):
+        self._perm = self._inv = None
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = proxy_index.row()
+        if self._mapping_valid():
+            row = int(self._perm[row])
+        return self.sourceModel().index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if self._mapping_valid():
+            row = int(self._inv[row])
+        return self.createIndex(row, source_index.column())
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        source = self.sourceModel()
+        if source is None or column < 0:
+            return
 
-        col_key = source.visible_cols[left.column() - 1]
-        vals = source._df[col_key].values
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        old_sources = [self.mapToSource(idx) for idx in old_persistent]
 
-        l_val = vals[l_row]
-        r_val = vals[r_row]
+        perm = source.argsort(column, order == Qt.SortOrder.DescendingOrder)
+        inv = np.empty_like(perm)
+        inv[perm] = np.arange(len(perm))
+        self._perm, self._inv = perm, inv
 
-        if pd.isna(l_val): l_val = -999999
-        if pd.isna(r_val): r_val = -999999
+        self.changePersistentIndexList(old_persistent, [self.mapFromSource(src) for src in old_sources])
+        self.layoutChanged.emit()
 
-        try:
-            return bool(float(l_val) < float(r_val))
-        except (ValueError, TypeError):
-            return bool(str(l_val) < str(r_val))
+    def invalidate(self):
+        """來源資料重設後，依目前的排序欄位重新排列"""
+        self._drop_mapping()
+        self.sort(self._sort_column, self._sort_order)
 
 
 class ZeroWidthVerticalHeader(QHeaderView):
@@ -948,6 +1059,7 @@ class StrategyModule(QWidget):
         self.setStyleSheet(GLOBAL_STYLE)
 
         self.full_df = pd.DataFrame()
+        self.filter_engine = None  # 載入快照時建立的預編譯過濾引擎
         self.display_df = pd.DataFrame()
         self.watchlist_data = {}
 
@@ -1535,6 +1647,7 @@ class StrategyModule(QWidget):
 
     def on_data_loaded(self, df):
         self.full_df = df
+        self.filter_engine = StrategyFilterEngine(df)
         self.update_industry_combo()
         self._update_tag_checkboxes()
         self.apply_filters_real()
@@ -1767,84 +1880,40 @@ class StrategyModule(QWidget):
 
         self.setUpdatesEnabled(False)  # 暫停畫面重繪
         try:
-            df = self.full_df.copy()
-            df['insight'] = ''
+            if self.filter_engine is None or self.filter_engine.df is not self.full_df:
+                self.filter_engine = StrategyFilterEngine(self.full_df)
+            engine = self.filter_engine
 
             # A. 基本搜尋
             search_txt = self.txt_search.text().strip()
-            if search_txt:
-                mask = df['sid'].str.contains(search_txt, case=False, na=False) | \
-                       df['name'].str.contains(search_txt, case=False, na=False)
-                df = df[mask]
 
             # B. 產業/自選/概念/細產業 (🚀 修復下拉選單無反應問題)
             ind = self.combo_industry.currentText()
+            watchlist = None
             if ind.startswith("[自選] "):
                 group_name = ind.replace("[自選] ", "")
-                df = df[df['sid'].isin(self.watchlist_data.get(group_name, []))]
-            elif ind != "全部" and ind != "":
-                df = df[df['industry'] == ind]
+                watchlist = self.watchlist_data.get(group_name, [])
+            elif ind == "全部":
+                ind = ""
 
             concept = self.combo_concept.currentText().strip()
-            if concept and concept != "全部" and 'sub_concepts' in df.columns:
-                # 確保欄位不是 NaN，並且進行字串模糊比對
-                df = df[df['sub_concepts'].fillna("").str.contains(concept, regex=False)]
-                print(f"👉 [驗證] 套用概念題材 '{concept}'，剩餘檔數: {len(df)}")
+            if concept == "全部": concept = ""
 
             dj_ind = self.combo_dj_ind.currentText().strip()
-            if dj_ind and dj_ind != "全部" and 'dj_sub_ind' in df.columns:
-                # 下拉清單格式為 "[主業] 細產業"，我們提取出 "細產業" 來做比對
-                sub_ind_target = dj_ind.split("] ")[-1] if "] " in dj_ind else dj_ind
-                df = df[df['dj_sub_ind'].fillna("").str.contains(sub_ind_target, regex=False)]
-                print(f"👉 [驗證] 套用細產業 '{sub_ind_target}'，剩餘檔數: {len(df)}")
+            if dj_ind == "全部": dj_ind = ""
+            # 下拉清單格式為 "[主業] 細產業"，我們提取出 "細產業" 來做比對
+            sub_ind_target = dj_ind.split("] ")[-1] if "] " in dj_ind else dj_ind
 
             # C. 數值過濾 🚀 (核心修正：僅過濾「有被更動」的滑桿)
-            is_numeric_dirty = False
-            for w in self.dynamic_filters:
-                if w.is_modified():
-                    is_numeric_dirty = True
-                    df = df[(df[w.key] >= w.spin_min.value()) & (df[w.key] <= w.spin_max.value())]
+            ranges = {w.key: (w.spin_min.value(), w.spin_max.value())
+                      for w in self.dynamic_filters if w.is_modified()}
 
             # D. 特徵標籤
             selected_tags = [t for t, chk in self.chk_tags.items() if chk.isChecked()]
-            if selected_tags and '強勢特徵' in df.columns:
-                df['強勢特徵'] = df['強勢特徵'].fillna("")
-
-                # 🚀 深度診斷：列印前端讀取的絕對路徑與修改時間
-                import os
-                import time
-                base_path = Path(__file__).resolve().parent.parent
-                f_path = base_path / "data" / "strategy_results" / "factor_snapshot.parquet"
-
-                print(f"\n🔍 [UI Debug] 開始過濾特徵標籤:")
-                print(f"   - 📂 前端讀取的 Parquet 絕對路徑: {f_path.resolve()}")
-                if f_path.exists():
-                    print(f"   - 🕒 該檔案最後修改時間: {time.ctime(f_path.stat().st_mtime)}")
-                else:
-                    print(f"   - ⚠️ [警告] Parquet 檔案不存在！")
-
-                # 🔎 掃描全表看看到底有沒有任何一檔含有「三率三升」
-                any_three_up = df['強勢特徵'].str.contains('三率三升', regex=False, na=False).sum()
-                print(f"   - 🔎 檢查前端記憶體：全表含有 '三率三升' 關鍵字的股票總數為: {any_three_up} 檔")
-
-                print(f"   - 已勾選的標籤: {selected_tags}")
-                print(f"   - 目前表格過濾前總筆數: {len(df)}")
-                print(f"   - 隨機抽取 3 筆強勢特徵數據樣本作對照:")
-                sample_df = df[df['強勢特徵'] != ""].head(3)
-                if not sample_df.empty:
-                    for i, (idx, row_data) in enumerate(sample_df.iterrows()):
-                        print(
-                            f"     👉 股票 [{row_data.get('sid')} {row_data.get('name')}]: {row_data.get('強勢特徵')}")
-
-                import re  # 確保有載入正則套件
-                if self.rb_and.isChecked():
-                    for tag in selected_tags:
-                        df = df[df['強勢特徵'].str.contains(tag, regex=False, na=False)]
-                        print(f"   - 👉 套用交集 (AND) 標籤 '{tag}' 後，剩餘筆數: {len(df)}")
-                else:
-                    pattern = "|".join([re.escape(str(t)) for t in selected_tags])
-                    df = df[df['強勢特徵'].str.contains(pattern, regex=True, na=False)]
-                    print(f"   - 👉 套用聯集 (OR) 模式 '{pattern}' 後，剩餘筆數: {len(df)}")
+
+            idx = engine.filter(search=search_txt, industry=ind, watchlist=watchlist,
+                                concept=concept, dj_sub=sub_ind_target, ranges=ranges,
+                                tags=selected_tags, tag_mode='and' if self.rb_and.isChecked() else 'or')
 
             # ==========================================
             # 整理欄位顯示 (🚀 關鍵修復：強制鎖死 5 大核心欄位)
@@ -1856,16 +1925,18 @@ class StrategyModule(QWidget):
             if FULL_COLUMN_SPECS.get('insight', {}).get('show', True): fixed_keys.append('insight')
             fixed_keys.extend(['sid', 'name', '現價', '漲幅1d'])
 
-            # 確保這些欄位存在才加入顯示名單
+            # 確保這些欄位存在才加入顯示名單 (insight 為前端欄位，不在快照內)
+            available = set(self.full_df.columns) | {'insight'}
             for k in fixed_keys:
-                if k in df.columns: visible_cols.append(k)
+                if k in available: visible_cols.append(k)
 
             # 其餘欄位依照使用者設定的順序排在後面
             for key in self.column_order:
                 if key not in fixed_keys and FULL_COLUMN_SPECS.get(key, {}).get('show'):
-                    if key in df.columns: visible_cols.append(key)
+                    if key in available: visible_cols.append(key)
 
-            self.display_df = df[visible_cols].copy()
+            # 只取出最終入選的列與顯示欄
+            self.display_df = engine.materialize(idx, visible_cols)
             self.model.update_data(self.display_df, visible_cols)
             self.proxy_model.invalidate()
             self.lbl_status.setText(f"篩選結果: {len(self.display_df)} 檔")
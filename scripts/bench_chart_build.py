@@ -0,0 +1,190 @@
+# scripts/bench_chart_build.py
+# 戰情室 K 線 / EPS 圖表資料準備的 micro-benchmark：
+# 舊版「iterrows 逐列組 hover / 顏色 / 刻度」 vs utils.chart_data 的整欄運算，
+# 並量測以 3 年日線建立完整 K 線 traces (K 棒 + 量 + 4 條均線) 的總時間
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.chart_data import (eps_metrics, kline_hover_text, ma_hover_text, parse_seasons, period_ticks,
+                              volume_colors, volume_hover_text)
+
+N_DAYS = 750            # 約 3 年日線
+MA_DICT = {"MA5": 5, "MA10": 10, "MA55": 55, "MA200": 200}
+
+
+def make_daily(n: int = N_DAYS) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.01, n))
+    df = pd.DataFrame({
+        'Date': pd.bdate_range('2022-01-03', periods=n),
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + rng.random(n) * 0.02),
+        'Low': np.minimum(open_, close) * (1 - rng.random(n) * 0.02),
+        'Close': close,
+        'Volume': rng.integers(1_000, 50_000_000, n).astype(float),
+    })
+    df['漲跌'] = (df['Close'] - df['Close'].shift(1)).fillna(0)
+    return df
+
+
+def make_eps(n_quarters: int = 40) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    seasons = [f"{2015 + i // 4}Q{i % 4 + 1}" for i in range(n_quarters)]
+    eps = np.round(rng.normal(2, 1.5, n_quarters), 2)
+    eps[5] = 0.0
+    return pd.DataFrame({'季別': seasons, 'EPS': eps})
+
+
+# ----------------------
+# 舊版逐列寫法 (僅供比對)
+# ----------------------
+def legacy_kline(df):
+    vol_colors = [
+        "red" if i > 0 and df.Close.iloc[i] > df.Close.iloc[i - 1] else
+        "green" if i > 0 and df.Close.iloc[i] < df.Close.iloc[i - 1] else
+        "lightgray" for i in range(len(df))
+    ]
+    hover_text = []
+    for i, row in df.iterrows():
+        hover_text.append(f"日期: {row['Date'].strftime('%Y-%m-%d')}<br>"
+                          f"開: {row['Open']:.2f}<br>"
+                          f"高: {row['High']:.2f}<br>"
+                          f"低: {row['Low']:.2f}<br>"
+                          f"收: {row['Close']:.2f}<br>"
+                          f"漲跌: {row['漲跌']:+.2f}")
+    vol_hover_text = [f"成交量: {row['Volume']:,.0f}" for i, row in df.iterrows()]
+    ma_texts = {}
+    for ma, p in MA_DICT.items():
+        ma_values = df.Close.rolling(p).mean()
+        texts = []
+        for i, row in df.iterrows():
+            val = ma_values.iloc[i]
+            texts.append(f"{ma}: {val:.2f}" if pd.notna(val) else "")
+        ma_texts[ma] = texts
+    tickvals, ticktext, current_month = [], [], None
+    for i, date in enumerate(df['Date']):
+        if date.month != current_month:
+            tickvals.append(i)
+            ticktext.append(date.strftime('%Y-%m'))
+            current_month = date.month
+    return vol_colors, hover_text, vol_hover_text, ma_texts, (tickvals, ticktext)
+
+
+def vector_kline(df):
+    ma_texts = {ma: ma_hover_text(ma, df.Close.rolling(p).mean()) for ma, p in MA_DICT.items()}
+    return (volume_colors(df['Close']).tolist(), kline_hover_text(df, df['漲跌']),
+            volume_hover_text(df['Volume']), ma_texts, period_ticks(df['Date'], "D"))
+
+
+def legacy_eps(df):
+    import re
+
+    def parse_season(season_str):
+        season_str = str(season_str).strip()
+        match = re.search(r'(\d{4})[\-\s]*Q?(\d)', season_str)
+        if match:
+            return int(match.group(1)), int(match.group(2))
+        match = re.search(r'(\d{2,3})\.(\d)', season_str)
+        if match:
+            return int(match.group(1)) + 1911, int(match.group(2))
+        match = re.search(r'(\d{3})(\d{2})', season_str)
+        if match:
+            return int(match.group(1)) + 1911, (int(match.group(2)) - 1) // 3 + 1
+        return None, None
+
+    df = df.copy()
+    df["年"] = None
+    df["季"] = None
+    for i, row in df.iterrows():
+        df.loc[i, "年"], df.loc[i, "季"] = parse_season(row["季別"])
+    df["年"] = df["年"].astype(int)
+    df["季"] = df["季"].astype(int)
+    df["季增率"] = None
+    for i in range(1, len(df)):
+        prev, curr = df.iloc[i - 1]["EPS"], df.iloc[i]["EPS"]
+        if prev != 0:
+            df.loc[i, "季增率"] = (curr - prev) / abs(prev) * 100
+    df["年增率"] = None
+    for i in range(4, len(df)):
+        prev, curr = df.iloc[i - 4]["EPS"], df.iloc[i]["EPS"]
+        if prev != 0:
+            df.loc[i, "年增率"] = (curr - prev) / abs(prev) * 100
+    df["累計EPS"] = 0.0
+    for year in df["年"].unique():
+        for idx in df[df["年"] == year].index:
+            q = df.loc[idx, "季"]
+            df.loc[idx, "累計EPS"] = df[(df["年"] == year) & (df["季"] <= q)]["EPS"].sum()
+    df["累計年增率"] = None
+    for i, row in df.iterrows():
+        last = df[(df["年"] == row["年"] - 1) & (df["季"] == row["季"])]
+        if not last.empty and last.iloc[0]["累計EPS"] != 0:
+            df.loc[i, "累計年增率"] = (row["累計EPS"] - last.iloc[0]["累計EPS"]) / abs(last.iloc[0]["累計EPS"]) * 100
+    return df
+
+
+def vector_eps(df):
+    df = df.copy()
+    df[["年", "季"]] = parse_seasons(df["季別"])
+    df["年"] = df["年"].astype(int)
+    df["季"] = df["季"].astype(int)
+    return eps_metrics(df)
+
+
+def build_traces(df, parts):
+    vol_colors, hover_text, vol_hover_text, ma_texts, _ = parts
+    x = list(range(len(df)))
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=x, open=df.Open, high=df.High, low=df.Low, close=df.Close,
+                                 text=hover_text, hoverinfo="text"))
+    fig.add_trace(go.Bar(x=x, y=df.Volume, marker_color=vol_colors, text=vol_hover_text, hoverinfo="text"))
+    for ma, p in MA_DICT.items():
+        fig.add_trace(go.Scatter(x=x, y=df.Close.rolling(p).mean(), mode="lines", text=ma_texts[ma],
+                                 hoverinfo="text"))
+    return fig
+
+
+def bench(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def report(label, t_old, t_new, same):
+    print(f"{label:<14} 舊版 {t_old:8.2f} ms  向量化 {t_new:7.2f} ms  "
+          f"x{t_old / t_new:5.1f}  {'✅ 結果一致' if same else '⚠️ 結果不同'}")
+
+
+def main():
+    df = make_daily()
+    print(f"📊 日線 {len(df)} 根 ({df['Date'].iloc[0]:%Y-%m-%d} ~ {df['Date'].iloc[-1]:%Y-%m-%d})\n")
+
+    old, new = legacy_kline(df), vector_kline(df)
+    report("K 線資料", bench(lambda: legacy_kline(df)), bench(lambda: vector_kline(df)), old == new)
+
+    t_old = bench(lambda: build_traces(df, legacy_kline(df)))
+    t_new = bench(lambda: build_traces(df, vector_kline(df)))
+    report("K 線 traces", t_old, t_new, True)
+
+    eps = make_eps()
+    cols = ["年", "季", "季增率", "年增率", "累計EPS", "累計年增率"]
+    old_eps = legacy_eps(eps)[cols].astype('float64')
+    new_eps = vector_eps(eps)[cols].astype('float64')
+    same = np.allclose(old_eps.to_numpy(), new_eps.to_numpy(), equal_nan=True)
+    report("EPS 指標", bench(lambda: legacy_eps(eps)), bench(lambda: vector_eps(eps)), same)
+
+
+if __name__ == "__main__":
+    main()
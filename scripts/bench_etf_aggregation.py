@@ -0,0 +1,93 @@
+# scripts/bench_etf_aggregation.py
+# 主動式 ETF 模組彙總計算的 micro-benchmark：
+# 舊版「逐 ETF merge + iterrows」 vs holdings_diff 的一次性向量化計算
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.etf import holdings_diff
+from utils.etf.holdings_store import normalize_holdings
+
+CLEAN_DIR = PROJECT_ROOT / "data" / "clean"
+PERIODS = [2, 4, 6, 11, 21]
+
+
+def load_all_etfs() -> pd.DataFrame:
+    frames = []
+    for csv in sorted(CLEAN_DIR.glob("*/*.csv")):
+        df = normalize_holdings(pd.read_csv(csv, encoding='utf-8-sig'))
+        df['etf_id'] = csv.stem
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def legacy_changes(df, period):
+    """舊版 update_all_modules 的迴圈寫法 (僅供比對)"""
+    changes, latest = [], {}
+    for etf in df['etf_id'].unique():
+        sub = df[df['etf_id'] == etf]
+        dates = sorted(sub['date'].unique())
+        df0 = sub[sub['date'] == dates[-1]]
+        latest[etf] = df0
+        if len(dates) < 2: continue
+        idx = max(0, len(dates) - period)
+        m = pd.merge(df0, sub[sub['date'] == dates[idx]], on=['stock_id', 'name'],
+                     suffixes=('_now', '_prev'), how='outer').fillna(0)
+        for _, r in m.iterrows():
+            diff = r['shares_now'] - r['shares_prev']
+            if diff != 0:
+                changes.append({'etf': etf, 'stock_id': str(r['stock_id']), 's_diff': diff})
+    return changes, latest
+
+
+def legacy_core(latest):
+    s2e, s_wt = {}, {}
+    for etf, ddf in latest.items():
+        for _, r in ddf.iterrows():
+            sid = str(r['stock_id'])
+            s2e.setdefault(sid, []).append(etf)
+            s_wt[sid] = s_wt.get(sid, 0) + r['weight']
+    return sorted([sid for sid, el in s2e.items() if len(el) >= 3])
+
+
+def bench(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def main():
+    df = load_all_etfs()
+    print(f"📊 {df['etf_id'].nunique()} 檔 ETF / {len(df):,} 筆持股 / {df['date'].nunique()} 個日期\n")
+
+    for period in PERIODS:
+        old_changes, old_latest = legacy_changes(df, period)
+        new_changes = holdings_diff.window_changes(df, period)
+        same = (sorted((c['etf'], c['stock_id'], c['s_diff']) for c in old_changes)
+                == sorted(new_changes[['etf', 'stock_id', 's_diff']].itertuples(index=False, name=None)))
+
+        t_old = bench(lambda: legacy_changes(df, period))
+        t_new = bench(lambda: holdings_diff.window_changes(df, period))
+        print(f"區間 {period:>2} 日  舊版 {t_old:8.2f} ms  向量化 {t_new:7.2f} ms  "
+              f"x{t_old / t_new:5.1f}  {'✅ 結果一致' if same else '⚠️ 結果不同'}")
+
+    _, old_latest = legacy_changes(df, 2)
+    latest = holdings_diff.latest_holdings(df)
+    same = legacy_core(old_latest) == sorted(holdings_diff.core_holdings(latest)['stock_id'])
+    t_old = bench(lambda: legacy_core(old_latest))
+    t_new = bench(lambda: holdings_diff.core_holdings(latest))
+    print(f"\n共同持股      舊版 {t_old:8.2f} ms  向量化 {t_new:7.2f} ms  "
+          f"x{t_old / t_new:5.1f}  {'✅ 結果一致' if same else '⚠️ 結果不同'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from utils.cache.manager import CacheManager
+from utils.cache import period_bars
+from utils import snapshot_store
 
 # ── 全域共享變數（繞過進程通訊瓶頸） ──────────────────────────────────
 GLOBAL_STOCK_DFS = {}
@@ -93,16 +95,16 @@ def load_issued_shares(project_root, all_sids):
 
     if not shares_dict:
         snapshot_path = project_root / 'data' / 'strategy_results' / 'factor_snapshot.parquet'
-        if snapshot_path.exists():
-            try:
-                df = pd.read_parquet(snapshot_path)
-                for _, row in df.iterrows():
-                    sid = str(row.get('sid', '')).strip()
-                    shares = float(row.get('issued_shares', 0) or 0)
-                    if sid and shares > 0:
-                        shares_dict[sid] = shares
-            except Exception:
-                pass
+        try:
+            # 只投影需要的兩欄，不把整張百欄快照讀進來
+            df = snapshot_store.load_frame(['sid', 'issued_shares'], path=snapshot_path)
+            if {'sid', 'issued_shares'} <= set(df.columns):
+                sids = df['sid'].astype(str).str.strip()
+                shares = pd.to_numeric(df['issued_shares'], errors='coerce').fillna(0).astype(float)
+                ok = (sids != '') & (shares > 0)
+                shares_dict = dict(zip(sids[ok], shares[ok]))
+        except Exception:
+            pass
 
     if not shares_dict:
         for sid in all_sids:
@@ -262,6 +264,12 @@ def build_one_sector(args):
         # ── 4. 存檔 ──────────────────────────────────────────────────────────
         save_path = Path(output_dir_str) / f"IDX_{tag}.parquet"
         result_df.to_parquet(save_path)
+
+        # 同步增量更新週 / 月 K 聚合表 (失敗不影響日線存檔，板塊儀表板讀取時會自動重算)
+        try:
+            period_bars.write_bars(save_path, result_df)
+        except Exception as e:
+            print(f"⚠️ 【{tag}】週/月 K 聚合表更新失敗: {e}")
         return tag, True
 
     except Exception as e:
@@ -30,7 +30,10 @@ except ImportError:
 
 try:
     from utils.cache.manager import CacheManager
+    from utils.cache.period_bars import OHLCV, live_weekly, price_view, resample_bars
     from utils.strategies.technical import TechnicalStrategies
+    from utils.strategies.features import StrategyFeatures
+    from utils.strategies.strong_tags import compute_strong_tags, TAG_BIT, BITS_COLUMN
 except ImportError as e:
     print(f"[Error] 匯入 utils 模組失敗: {e}")
     sys.exit(1)
@@ -38,7 +41,11 @@ except ImportError as e:
 # ==========================================
 # 核心邏輯 - 技術面 (維持你原本的完美邏輯，無任何刪減)
 # ==========================================
-def calculate_advanced_factors(df, sid=None):
+def calculate_advanced_factors(df, sid=None, weekly=None, weekly_live=None):
+    """
+    weekly / weekly_live: CacheManager.load_bars() 讀出的預先聚合週 K / 滾動週 (label_last=False)；
+    未提供時以日線即時聚合
+    """
     if df is None or len(df) == 0:
         return None
 
@@ -154,42 +161,32 @@ def calculate_advanced_factors(df, sid=None):
 
         # === 呼叫外部 Technical 策略群 ===
         # (由於 df 的 Open/High/Low/Close 已被替換為還原股價，策略皆自動平滑過渡)
-        factors['str_break_30w'] = check_recent(TechnicalStrategies.break_30w_ma(df))
-        factors['str_uptrend'] = int(TechnicalStrategies.strong_uptrend(df).iloc[-1])
-        factors['str_high_60'] = check_recent(TechnicalStrategies.breakout_n_days_high(df, 60))
-        factors['str_high_30'] = check_recent(TechnicalStrategies.breakout_n_days_high(df, 30))
-        factors['str_ma55_sup'] = check_recent(TechnicalStrategies.near_ma_support(df, 55))
-        factors['str_ma200_sup'] = check_recent(TechnicalStrategies.near_ma_support(df, 200))
-        factors['str_vix_rev'] = check_recent(TechnicalStrategies.vix_reversal(df))
+        # 共用同一份特徵快取，各策略的均線與滾動高點只算一次
+        feats = StrategyFeatures(df)
+        factors['str_break_30w'] = check_recent(TechnicalStrategies.break_30w_ma(df, feats=feats))
+        factors['str_uptrend'] = int(TechnicalStrategies.strong_uptrend(df, feats=feats).iloc[-1])
+        factors['str_high_60'] = check_recent(TechnicalStrategies.breakout_n_days_high(df, 60, feats=feats))
+        factors['str_high_30'] = check_recent(TechnicalStrategies.breakout_n_days_high(df, 30, feats=feats))
+        factors['str_ma55_sup'] = check_recent(TechnicalStrategies.near_ma_support(df, 55, feats=feats))
+        factors['str_ma200_sup'] = check_recent(TechnicalStrategies.near_ma_support(df, 200, feats=feats))
+        factors['str_vix_rev'] = check_recent(TechnicalStrategies.vix_reversal(df, feats=feats))
 
         # 檔案路徑: scripts/calc_snapshot_factors.py
         # ... (其他程式碼不變) ...
 
         try:
-            logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
             # 1. 產生標準的「日曆週」資料 (確保歷史均線與 expanded_kline.py 完全一致)
-            df_weekly = df.resample('W-FRI').agg(logic).dropna()
-
+            #    優先使用預先聚合表的還原價；沒有時只取已換成還原價的 OHLCV 即時聚合，避免與原始價欄位重複聚合
             # =========================================================
-            # 🚀 終極解決方案：動態不完整週校準 (僅校正量能，不破壞歷史收盤)
+            # 🚀 終極解決方案：動態不完整週校準 (不破壞歷史收盤)
             # =========================================================
-            df_weekly_live = df_weekly.copy()
-            if len(df) >= 5 and len(df_weekly_live) >= 1:
-                last_idx = df_weekly_live.index[-1]
-
-                # 抓取近 5 日的日線實體資料 (例如上週三 ~ 本週二)
-                recent_5d = df.tail(5)
-
-                # 校正本週 K 線的四要素，讓它具備完整的 5 日漲跌幅與波動區間
-                df_weekly_live.at[last_idx, 'Open'] = recent_5d['Open'].iloc[0]
-                df_weekly_live.at[last_idx, 'High'] = recent_5d['High'].max()
-                df_weekly_live.at[last_idx, 'Low'] = recent_5d['Low'].min()
-                # Close 已經是最新的，不需變動
-
-                # 量能校正 (取近5日總量)
-                last_5d_vol = recent_5d['Volume'].sum()
-                if df_weekly_live.at[last_idx, 'Volume'] < last_5d_vol:
-                    df_weekly_live.at[last_idx, 'Volume'] = last_5d_vol
+            # 本週 K 線的開高低改用近 5 日 (例如上週三 ~ 本週二)，量能取近 5 日總量
+            if weekly is not None and weekly_live is not None:
+                df_weekly = price_view(weekly, use_adj=True)[list(OHLCV)]
+                df_weekly_live = price_view(weekly_live, use_adj=True)[list(OHLCV)]
+            else:
+                df_weekly = price_view(resample_bars(df[list(OHLCV)], 'W', label_last=False))
+                df_weekly_live = live_weekly(df_weekly, df[list(OHLCV)])
 
             # -------------------- 訊號判定區 --------------------
             if len(df_weekly) >= 10:
@@ -617,119 +614,19 @@ def calculate_json_factors(sid_str):
     return res
 
 
-def get_strong_tags(row):
-    tags = []
-    st_week = row.get('str_st_week_offset', -1)
-    if st_week == 0:
-        tags.append('ST轉多(本週)')
-    elif 0 < st_week <= 4:
-        tags.append(f'ST轉多({int(st_week)}週前)')
-
-    if row.get('str_break_30w', 0) == 1: tags.append('突破30週')
-    if row.get('str_high_60', 0) == 1: tags.append('創季高')
-    if row.get('str_high_30', 0) == 1: tags.append('創月高')
-    if row.get('str_uptrend', 0) == 1: tags.append('強勢多頭')
-    if row.get('漲幅60d', 0) > 30: tags.append('波段黑馬')
-    if row.get('RS強度', 0) > 90: tags.append('超強勢')
-
-    bb_width = row.get('bb_width', 100)
-    if bb_width < 5.0:
-        tags.append('極度壓縮')
-    elif bb_width < 8.0:
-        tags.append('波動壓縮')
-
-    if row.get('str_consol_5', 0) == 1: tags.append('盤整5日')
-    if row.get('str_consol_10', 0) == 1: tags.append('盤整10日')
-    if row.get('str_consol_20', 0) == 1: tags.append('盤整20日')
-    if row.get('str_consol_60', 0) == 1: tags.append('盤整60日')
-
-    if row.get('str_ilss_sweep', 0) == 1 and row.get('rev_cum_yoy', 0) > 0 and (
-            row.get('m_net_today', 0) < 0 or row.get('m_sum_5d', 0) < 0): tags.append('主力掃單(ILSS)')
-
-    # === 投信認養 (近5日買3日版，嚴格濾網) ===
-    iss_shares = row.get('issued_shares', 0)
-    it_pct = row.get('invest_trust_hold_pct', 0)
-    t_net = row.get('t_net_today', 0)
-    vol = row.get('今日成交股數', 0)
-    t_buy_5d = row.get('t_buy_days_5', 0)
-
-    c1 = (0 < iss_shares < 500000)
-    c2 = (1.0 <= it_pct <= 8.0)
-    c3 = (t_buy_5d >= 3 and t_net > 0)
-    c4 = (t_net * 1000 / vol * 100 > 10.0) if vol > 0 else False
-
-    if c1 and c2 and c3 and c4:
-        tags.append('投信認養')
-    # ===============================
-
-    if row.get('m_net_today', 0) <= -200: tags.append('散戶退場')
-
-    # === 終極版：土洋對作 (10日與20日雙雷達波段換手 + 5日價格點火) ===
-    t_10d, f_10d = row.get('t_sum_10d', 0), row.get('f_sum_10d', 0)
-    t_20d, f_20d = row.get('t_sum_20d', 0), row.get('f_sum_20d', 0)
-    pct_5d = row.get('漲幅5d', 0)
-
-    # 判定投信接刀成功 (內資軋外資)：近10日或近20日，投信買盤吃掉外資賣壓 30% 以上
-    cond_t_win_10 = (t_10d > 0 and f_10d < 0 and t_10d >= abs(f_10d) * 0.3)
-    cond_t_win_20 = (t_20d > 0 and f_20d < 0 and t_20d >= abs(f_20d) * 0.3)
-
-    if (cond_t_win_10 or cond_t_win_20) and pct_5d > 0:
-        tags.append('土洋對作(投勝)')
-
-    # 判定外資掃貨成功 (外資軋內資)：近10日或近20日，外資買盤吃掉投信賣壓 30% 以上
-    cond_f_win_10 = (f_10d > 0 and t_10d < 0 and f_10d >= abs(t_10d) * 0.3)
-    cond_f_win_20 = (f_20d > 0 and t_20d < 0 and f_20d >= abs(t_20d) * 0.3)
-
-    if (cond_f_win_10 or cond_f_win_20) and pct_5d > 0:
-        tags.append('土洋對作(外勝)')
-    # ================================================
-
-    if row.get('legal_diff_20d', 0) > 1.5 and row.get('t_net_today', 0) > 0: tags.append('波段吸籌發動')
-
-    offset = row.get('str_30w_week_offset', -1)
-    suffix = "(本週)" if offset == 0 else (f"({int(offset)}週前)" if offset > 0 else "")
-    if row.get('str_30w_adh', 0) == 1: tags.append(f"30W黏貼後突破{suffix}")
-    if row.get('str_30w_shk', 0) == 1: tags.append(f"30W甩轎{suffix}")
-    if row.get('str_fake_breakdown', 0) == 1: tags.append('假跌破')
-    if row.get('str_ma55_sup', 0) == 1: tags.append('回測季線')
-    if row.get('str_ma200_sup', 0) == 1: tags.append('回測年線')
-    if row.get('str_vix_rev', 0) == 1: tags.append('Vix反轉')
-    if row.get('str_30w_standby', 0) == 1: tags.append('30W臨門一腳')
-
-    # === 營收創高標籤 ===
-    rev_highest = row.get('rev_highest_months', 0)
-    rev_consec = row.get('rev_consecutive_highs', 0)
-
-    # 🚀 新增：防禦性宣告，若 Pandas 讀取到 NaN 則自動轉為 0，防止比對失效
-    if pd.isna(rev_highest): rev_highest = 0
-    if pd.isna(rev_consec): rev_consec = 0
-
-    # 1. 處理創年高與創兩年高
-    if rev_highest >= 23:
-        tags.append('營收創兩年高')
-    if rev_highest >= 11:
-        tags.append('營收創年高')
-
-    # 2. 🚀 核心修正：只要最新單月創歷史新高 (>= 1)，即賦予「營收連創新高」標籤
-    # 如此能確保「歷史新高」與「創年高」在交集 (AND) 時邏輯完全相通，不為 0
-    if rev_consec >= 1:
-        tags.append('營收連創新高')
-        tags.append(f'連{int(rev_consec)}月創高')
-
-    # === 🚀 新增：三率三升標籤 (補齊與後端對對碰缺失的部分) ===
-    three_up_qoq = row.get('fund_three_up_qoq', 0)
-    three_up_yoy = row.get('fund_three_up_yoy', 0)
-
-    # 🚀 防禦機制：防止 NaN 導致比對失效，並強制轉為 float 進行精準匹配
-    if pd.isna(three_up_qoq): three_up_qoq = 0
-    if pd.isna(three_up_yoy): three_up_yoy = 0
-
-    if float(three_up_qoq) == 1.0:
-        tags.append('三率三升(季增)')
-    if float(three_up_yoy) == 1.0:
-        tags.append('三率三升(年增)')
-
-    return ','.join(tags)
+def apply_strong_tags(df):
+    """
+    整表向量化產生強勢特徵 (規則見 utils/strategies/strong_tags.py)
+      - 強勢特徵      : 逗號串接的顯示字串
+      - 強勢特徵_bits : uint64 位元遮罩，UI 端以位元運算篩選 / 統計
+      - is_tu_yang    : 由位元直接判定土洋對作
+    """
+    labels, bits = compute_strong_tags(df)
+    df['強勢特徵'] = labels
+    df[BITS_COLUMN] = bits
+    tu_yang = TAG_BIT['土洋對作(投勝)'] | TAG_BIT['土洋對作(外勝)']
+    df['is_tu_yang'] = ((bits.to_numpy() & tu_yang) != 0).astype(int)
+    return df
 
 
 # 👇 插入在 def main(): 之上 👇
@@ -745,11 +642,19 @@ def worker_full_calc(args):
         from utils.cache.manager import CacheManager
         cache = CacheManager()
 
-        df = cache.load(f"{sid}.TW")
+        symbol = f"{sid}.TW"
+        df = cache.load(symbol)
         if df is None or df.empty:
-            df = cache.load(f"{sid}.TWO")
+            symbol = f"{sid}.TWO"
+            df = cache.load(symbol)
+
+        # 週 K / 滾動週直接讀 save() 維護的預先聚合表 (不存在 / 過期時 load_bars 會以日線重算)
+        weekly = weekly_live = None
+        if df is not None and not df.empty:
+            weekly = cache.load_bars(symbol, 'W', label_last=False)
+            weekly_live = cache.load_bars(symbol, 'W_live', label_last=False)
 
-        tech_factors = calculate_advanced_factors(df, sid=sid)
+        tech_factors = calculate_advanced_factors(df, sid=sid, weekly=weekly, weekly_live=weekly_live)
         if tech_factors is None:
             return None
 
@@ -886,8 +791,7 @@ def main():
         final_df['RS強度'] = final_df['漲幅20d'].rank(pct=True) * 100
         final_df['RS強度'] = final_df['RS強度'].round(1)
 
-    final_df['強勢特徵'] = final_df.apply(get_strong_tags, axis=1)
-    final_df['is_tu_yang'] = final_df['強勢特徵'].apply(lambda x: 1 if '土洋對作' in str(x) else 0)
+    final_df = apply_strong_tags(final_df)
 
     # (中文字典對照維持你原本的，不用改)
     chinese_map = {
@@ -1004,8 +908,7 @@ def run_fast_patch():
     df.update(df_new_chips)
     df.reset_index(inplace=True)
 
-    df['強勢特徵'] = df.apply(get_strong_tags, axis=1)
-    df['is_tu_yang'] = df['強勢特徵'].apply(lambda x: 1 if '土洋對作' in str(x) else 0)
+    df = apply_strong_tags(df)
 
     strategy_dir = project_root / 'data' / 'strategy_results'
     df.to_parquet(strategy_dir / 'factor_snapshot.parquet')
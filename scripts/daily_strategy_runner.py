@@ -11,45 +11,47 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from utils.stock_list import get_stock_list
-from utils.indicator_writer import write_daily_indicators
+from utils.indicator_store import events_from_frame, write_events
 from utils.indicator_index import build_indicator_index
 from utils.strategies.technical import TechnicalStrategies
+from utils.strategies.features import StrategyFeatures
 # 確保輸出目錄存在
 INDICATOR_DIR = PROJECT_ROOT / "data" / "indicators"
 INDICATOR_DIR.mkdir(parents=True, exist_ok=True)
 
 # 註冊你的策略
 # scripts/daily_strategy_runner.py 的 STRATEGY_MAP 部分
+# 每個策略接收 (df, f)：f 為該檔股票共用的 StrategyFeatures，均線/滾動高低點等只會算一次
 
 STRATEGY_MAP = {
-    "break_30w": lambda df: TechnicalStrategies.break_30w_ma(df),
+    "break_30w": lambda df, f: TechnicalStrategies.break_30w_ma(df, feats=f),
 
     # 修改：把震幅改小一點，例如 10日盤整原本 12% 改成 10%
     # 加上 technical.py 新增的「量縮」條件，篩選出來的股票會少很多
-    "consol_5": lambda df: TechnicalStrategies.consolidation(df, 5, 0.05),  # 5天內波動 < 5%
-    "consol_10": lambda df: TechnicalStrategies.consolidation(df, 10, 0.08),  # 10天內波動 < 8%
-    "consol_20": lambda df: TechnicalStrategies.consolidation(df, 20, 0.12),  # 20天內波動 < 12%
-    "consol_60": lambda df: TechnicalStrategies.consolidation(df, 60, 0.20),  # 60天內波動 < 20%
+    "consol_5": lambda df, f: TechnicalStrategies.consolidation(df, 5, 0.05, feats=f),  # 5天內波動 < 5%
+    "consol_10": lambda df, f: TechnicalStrategies.consolidation(df, 10, 0.08, feats=f),  # 10天內波動 < 8%
+    "consol_20": lambda df, f: TechnicalStrategies.consolidation(df, 20, 0.12, feats=f),  # 20天內波動 < 12%
+    "consol_60": lambda df, f: TechnicalStrategies.consolidation(df, 60, 0.20, feats=f),  # 60天內波動 < 20%
 
-    "strong_uptrend": lambda df: TechnicalStrategies.strong_uptrend(df),
+    "strong_uptrend": lambda df, f: TechnicalStrategies.strong_uptrend(df, feats=f),
 
     # 🟢 [新增] 創新高策略
-    "high_30": lambda df: TechnicalStrategies.breakout_n_days_high(df, 30), # 創月新高
-    "high_60": lambda df: TechnicalStrategies.breakout_n_days_high(df, 60), # 創季新高
+    "high_30": lambda df, f: TechnicalStrategies.breakout_n_days_high(df, 30, feats=f), # 創月新高
+    "high_60": lambda df, f: TechnicalStrategies.breakout_n_days_high(df, 60, feats=f), # 創季新高
 
     # [新增] 均線策略
-    "support_ma_55": lambda df: TechnicalStrategies.near_ma_support(df, 55),
-    "support_ma_200": lambda df: TechnicalStrategies.near_ma_support(df, 200),
+    "support_ma_55": lambda df, f: TechnicalStrategies.near_ma_support(df, 55, feats=f),
+    "support_ma_200": lambda df, f: TechnicalStrategies.near_ma_support(df, 200, feats=f),
 
     # [新增] Vix
     # 這裡的 key 對應 index.json 的目錄名
-    "vix_reversal": lambda df: TechnicalStrategies.vix_reversal(df),
+    "vix_reversal": lambda df, f: TechnicalStrategies.vix_reversal(df, feats=f),
 }
 
 
 
 def process_single_stock(args):
-    """處理單一股票"""
+    """處理單一股票，回傳 (觸發策略數, 事件 DataFrame)；事件由主程序統一寫入事件表"""
     stock_id, market = args
     stock_suffix = f"{stock_id}_{market}"
 
@@ -60,14 +62,14 @@ def process_single_stock(args):
         if cache_path_dot.exists():
             cache_path = cache_path_dot
         else:
-            return 0
+            return 0, None
 
     try:
         # 讀取 Parquet
         df = pd.read_parquet(cache_path)
 
         if df.empty:
-            return 0
+            return 0, None
 
         # 1. 重設索引 (將 Date 變成欄位)
         df = df.reset_index()
@@ -90,36 +92,31 @@ def process_single_stock(args):
         # 3. 檢查必要欄位
         if 'Close' not in df.columns or 'Volume' not in df.columns:
             # print(f"⚠️ {stock_id}: 缺欄位 {df.columns.tolist()}")
-            return 0
+            return 0, None
 
-        triggers = 0
+        fired_cols = []
+        feats = StrategyFeatures(df)
 
-        # 迴圈執行所有策略
+        # 迴圈執行所有策略 (共用同一份特徵快取)
         for strategy_name, func in STRATEGY_MAP.items():
             try:
-                result_series = func(df)
+                result_series = func(df, feats)
 
                 # 暫存結果
                 col_name = strategy_name
                 df[col_name] = result_series
 
-                # 如果有訊號，寫入檔案
                 if df[col_name].any():
-                    write_daily_indicators(
-                        df=df,
-                        stock_id=stock_suffix,
-                        indicator_cols=[col_name],
-                        sub_folder=strategy_name,
-                        market="tw"
-                    )
-                    triggers += 1
+                    fired_cols.append(col_name)
             except Exception as e:
                 continue
 
-        return triggers
+        # 所有策略的訊號攤平成 (indicator, sid, date) 事件，交回主程序一次寫入
+        events = events_from_frame(df, stock_suffix, fired_cols) if fired_cols else None
+        return len(fired_cols), events
 
     except Exception as e:
-        return 0
+        return 0, None
 
 def main():
     print("🚀 開始執行策略運算...")
@@ -162,7 +159,13 @@ def main():
     # 在 GitHub Actions 環境下，建議 max_workers 不要太高，2-4 即可
     with ProcessPoolExecutor(max_workers=4) as executor:
         results = list(executor.map(process_single_stock, stock_list))
-        total_triggers = sum(results)
+        total_triggers = sum(r[0] for r in results)
+
+    # 全市場訊號合併成一張事件表，整批覆寫 (每日都是全歷史重算)
+    event_frames = [r[1] for r in results if r[1] is not None and not r[1].empty]
+    all_events = pd.concat(event_frames, ignore_index=True) if event_frames else None
+    written = write_events(all_events, replace=True)
+    print(f"💾 事件表已寫入 {written} 筆訊號")
 
     # --- 4. 更新索引 ---
     print("\n🔧 正在重建指標索引 (build_indicator_index)...")
@@ -10,6 +10,13 @@ import json
 import logging
 from typing import Optional, List, Dict
 
+try:
+    from .price_table import get_price_table
+    from . import period_bars
+except ImportError:
+    from price_table import get_price_table
+    import period_bars
+
 
 class CacheManager:
     """股票資料快取管理器"""
@@ -241,6 +248,20 @@ class CacheManager:
             # 儲存（使用 snappy 壓縮）
             df.to_parquet(stock_path, compression='snappy', index=True)
 
+            # 同步更新最新價 / 報酬精簡表 (失敗不影響日線存檔，查詢時會依 mtime 自動重算)
+            try:
+                price_table = get_price_table()
+                if stock_path.parent == price_table.tw_dir:
+                    price_table.update(stock_path.stem, df)
+            except Exception as e:
+                self.logger.warning(f"⚠️  {symbol} 最新價精簡表更新失敗: {e}")
+
+            # 同步增量更新週 / 月 K 聚合表 (失敗不影響日線存檔，讀取時會自動重算)
+            try:
+                period_bars.write_bars(stock_path, df)
+            except Exception as e:
+                self.logger.warning(f"⚠️  {symbol} 週/月 K 聚合表更新失敗: {e}")
+
             self.logger.info(f"✓ 儲存 {symbol}: {len(df)} 筆資料")
             return True
 
@@ -248,6 +269,37 @@ class CacheManager:
             self.logger.error(f"✗ 儲存失敗 {symbol}: {e}")
             return False
 
+    def load_bars(self, symbol: str, timeframe: str = 'W', df: Optional[pd.DataFrame] = None,
+                  label_last: bool = True) -> Optional[pd.DataFrame]:
+        """
+        載入週 / 月 K (優先使用 save() 維護的預先聚合表)
+
+        Args:
+            symbol: 股票代號 (IDX_ 開頭為板塊指數)
+            timeframe: 'W' / 'M' / 'W_live' (30W 戰法用的滾動週)；'D' 等同 load()
+            df: 手上已有的日線 (可含盤中報價)；提供時只重算最後一個週期
+            label_last: False = 最後一根維持週五 / 月底標籤
+
+        Returns:
+            欄位沿用日線的 DataFrame；沒有快取時回傳 None
+        """
+        if timeframe == 'D':
+            return self.load(symbol) if df is None else df
+
+        if symbol.startswith('IDX_'):
+            daily_path = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'sector' / f"{symbol}.parquet"
+        else:
+            daily_path = self._get_stock_path(symbol)
+
+        if df is None:
+            bars = period_bars.load_bars(daily_path, timeframe, label_last=label_last)
+            if bars is not None:
+                return bars
+            df = self.load(symbol)
+            if df is None or df.empty:
+                return None
+        return period_bars.load_bars(daily_path, timeframe, df, label_last=label_last)
+
     def get_last_date(self, symbol: str) -> Optional[pd.Timestamp]:
         """
         取得股票最後一筆資料的日期
@@ -411,6 +463,7 @@ class CacheManager:
         if stock_path.exists():
             try:
                 stock_path.unlink()
+                period_bars.delete_bars(stock_path)
                 self.logger.info(f"已刪除快取: {symbol}")
                 return True
             except Exception as e:
@@ -0,0 +1,402 @@
+"""
+週 / 月 K 預先聚合表
+
+CacheManager.save() 存日線時同步維護 data/cache/bars/<市場>/<週期>/<檔名>.parquet
+(板塊指數由 build_industry_kline 存檔時維護 data/cache/bars/sector/...)：
+- W / M：欄位沿用日線 (open/high/low/close/volume/dividends/adj_*，板塊檔另含擴散類欄位)，
+  索引為週五 / 月底標籤，最後一根改標實際最後交易日 (與 K 線圖切週期時相同)
+- W_live：30W 戰法用的「滾動週」，最後一根改用近 5 日的開高低與量 (見 live_weekly)
+- 增量更新：沿用舊表的歷史週期，只重算「舊表最後一個週期」之後的日線；
+  歷史對不上 (除權息後還原價整段改變、欄位變動、日線被改短) 才整段重算
+- 讀取：load_bars() 供 K 線切週期、板塊儀表板、因子計算使用；手上有日線時只重算最後一個週期
+  (含盤中即時報價合併進來的最後一根)，聚合表不存在 / 對不上時退回 resample_bars()
+- 聚合以 reduceat 逐段計算 (約為 resample 的 1/4 時間)
+"""
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+BARS_DIR = PROJECT_ROOT / 'data' / 'cache' / 'bars'
+
+TIMEFRAMES = ('W', 'M', 'W_live')
+_MEMO_SIZE = 64          # 程序內保留最近讀過的聚合表 (切週期來回不必重讀檔)
+
+# 依欄位名稱 (不分大小寫) 決定聚合方式；不在表內的欄位不聚合
+AGG_BY_NAME = {
+    'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'dividends': 'sum',
+    'adj_open': 'first', 'adj_high': 'max', 'adj_low': 'min', 'adj_close': 'last',
+    # 板塊指數的擴散 / 營收類欄位
+    'legal_diffusion': 'mean', 'rev_diffusion': 'mean', 'yoy_median': 'mean', 'yoy_accel': 'mean',
+}
+PRICE_NAMES = ('open', 'high', 'low', 'close', 'adj_open', 'adj_high', 'adj_low', 'adj_close')
+MEAN_NAMES = tuple(k for k, v in AGG_BY_NAME.items() if v == 'mean')
+OHLCV = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def aggregation(columns: Iterable[str]) -> Dict[str, str]:
+    """欄位 -> resample 聚合方式"""
+    return {c: AGG_BY_NAME[c.lower()] for c in columns if c.lower() in AGG_BY_NAME}
+
+
+def _period_end_days(index: pd.DatetimeIndex, tf: str) -> np.ndarray:
+    """每個日期所屬週期的結束日 (datetime64[D])：週五 / 月底"""
+    days = index.to_numpy().astype('datetime64[D]')
+    if tf == 'W':
+        weekday = (days.astype('int64') + 3) % 7      # 1970-01-01 是週四 -> 週一 = 0
+        return days + ((4 - weekday) % 7)
+    return (days.astype('datetime64[M]') + 1).astype('datetime64[D]') - 1
+
+
+def _label_last(bars: pd.DataFrame, last_date) -> pd.DataFrame:
+    # 最後一根還沒走完：標籤改成實際最後交易日
+    if not bars.empty and bars.index[-1] > last_date:
+        bars.index = bars.index[:-1].append(pd.DatetimeIndex([last_date]))
+    return bars
+
+
+def _reduce(values: np.ndarray, how: str, starts: np.ndarray, ends: np.ndarray):
+    """依 [starts, ends] 區段聚合單一欄位；語意同 resample (略過缺值，全缺值的 sum 為 0)"""
+    if values.dtype.kind not in 'fiub':
+        return None
+    isnan = np.isnan(values) if values.dtype.kind == 'f' else None
+    has_nan = isnan is not None and isnan.any()
+    if how in ('first', 'last'):
+        if has_nan:
+            return None
+        return values[starts] if how == 'first' else values[ends]
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    if how == 'sum':
+        return np.add.reduceat(np.where(isnan, 0, values) if has_nan else values, starts)
+    if how == 'mean':
+        filled = np.where(isnan, 0, values) if has_nan else values.astype('float64')
+        count = np.add.reduceat(~isnan if has_nan else np.ones(len(values)), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.add.reduceat(filled, starts) / count
+    return None
+
+
+def _aggregate(daily: pd.DataFrame, tf: str) -> pd.DataFrame:
+    """
+    等同 daily.resample(rule).agg(...) 但不產生空週期：
+    日線已依日期排序，同一週期的列必定相鄰，直接用 reduceat 逐段聚合 (缺值的 first/last 才退回 groupby)
+    """
+    logic = aggregation(daily.columns)
+    labels = _period_end_days(daily.index, tf)
+    change = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    starts = np.r_[0, change]
+    ends = np.r_[change - 1, len(daily) - 1]
+    index = pd.DatetimeIndex(labels[starts].astype(daily.index.dtype), name=daily.index.name)
+
+    out = {}
+    for col, how in logic.items():
+        reduced = _reduce(daily[col].to_numpy(), how, starts, ends)
+        if reduced is None:
+            reduced = daily[col].groupby(labels).agg(how).to_numpy()
+        out[col] = reduced
+    return pd.DataFrame(out, index=index)
+
+
+def resample_bars(daily: pd.DataFrame, tf: str, label_last: bool = True) -> pd.DataFrame:
+    """
+    日線 -> 週 / 月 K (整段重算)
+
+    只刪除所有價格欄都缺值的週期 (例如整週休市)；個別價格欄的缺值交給 price_view() 依使用的欄位處理
+    """
+    if daily.empty:
+        return daily.iloc[:0]
+    bars = _aggregate(daily, tf)
+    price = [c for c in bars.columns if c.lower() in PRICE_NAMES]
+    if price:
+        bars = bars.dropna(subset=price, how='all')
+    return _label_last(bars, daily.index[-1]) if label_last else bars
+
+
+def live_weekly(weekly: pd.DataFrame, daily: pd.DataFrame, ohlc: bool = True) -> pd.DataFrame:
+    """
+    30W 戰法的「滾動週」：本週 K 棒改用近 5 日的資料 (不動歷史週)
+
+    Args:
+        ohlc: True = 開高低一併換成近 5 日 (收盤本來就是最新)；False = 只校正成交量
+    量能：本週量小於近 5 日總量時改用 5 日總量，避免週初量能不足導致訊號消失
+    """
+    live = weekly.copy()
+    if len(daily) < 5 or live.empty:
+        return live
+
+    recent = daily.tail(5)
+    daily_cols = {c.lower(): c for c in recent.columns}
+    last = live.index[-1]
+    for col in live.columns:
+        src = daily_cols.get(col.lower())
+        if src is None:
+            continue
+        how = AGG_BY_NAME.get(col.lower())
+        if col.lower() == 'volume':
+            vol_5d = recent[src].sum()
+            if live.at[last, col] < vol_5d:
+                live.at[last, col] = vol_5d
+        elif ohlc and how == 'first':
+            live.at[last, col] = recent[src].iloc[0]
+        elif ohlc and how == 'max':
+            live.at[last, col] = recent[src].max()
+        elif ohlc and how == 'min':
+            live.at[last, col] = recent[src].min()
+    return live
+
+
+def price_view(bars: pd.DataFrame, use_adj: bool = False) -> pd.DataFrame:
+    """
+    取出 Open/High/Low/Close/Volume (+ 板塊擴散類欄位)
+
+    Args:
+        use_adj: 以 adj_ 系列作為 OHLC (沒有還原欄位時自動退回原始價)
+    """
+    cols = {c.lower(): c for c in bars.columns}
+    prefix = 'adj_' if use_adj and 'adj_close' in cols else ''
+    src = {name: cols.get(prefix + name.lower()) for name in OHLCV[:4]}
+    src['Volume'] = cols.get('volume')
+    src = {name: c for name, c in src.items() if c is not None}
+
+    view = pd.DataFrame({name: bars[c] for name, c in src.items()}, index=bars.index)
+    for name in MEAN_NAMES:
+        if name in cols:
+            view[cols[name]] = bars[cols[name]]
+    return view.dropna(subset=[c for c in OHLCV[:4] if c in view.columns])
+
+
+
+# ----------------------
+# 增量更新
+# ----------------------
+def _column_map(bars: pd.DataFrame, daily: pd.DataFrame) -> Optional[Dict[str, str]]:
+    """日線聚合欄位 -> 聚合表欄位 (不分大小寫)；日線有聚合表沒有的欄位時回傳 None"""
+    stored = {}
+    for c in bars.columns:
+        if c.lower() in stored:
+            return None
+        stored[c.lower()] = c
+    logic = aggregation(daily.columns)
+    if len({c.lower() for c in logic}) != len(logic):
+        return None
+    mapping = {c: stored.get(c.lower()) for c in logic}
+    return None if None in mapping.values() else mapping
+
+
+def extend_bars(bars: Optional[pd.DataFrame], daily: pd.DataFrame, tf: str) -> Optional[pd.DataFrame]:
+    """
+    以既有聚合表 + 日線算出最新的週 / 月 K (結果等同 resample_bars(daily, tf))
+
+    沿用 bars 的中間週期，只重算日線第一個週期 (前面可能被裁掉) 與 bars 最後一個週期之後的日線
+
+    Returns:
+        欄位名稱沿用 bars；bars 與日線的歷史對不上時回傳 None (交給呼叫端整段重算)
+    """
+    if bars is None or bars.empty or daily.empty:
+        return None
+    mapping = _column_map(bars, daily)
+    if mapping is None:
+        return None
+
+    labels = _period_end_days(daily.index, tf)
+    last_label = _period_end_days(bars.index[-1:], tf)[0]
+    if labels[-1] < last_label:
+        return None
+    start = int(np.searchsorted(labels, last_label))
+    first_end = int(np.searchsorted(labels, labels[0], side='right'))
+    if start <= first_end:
+        return None
+
+    # 中間週期：標籤必須與日線的週期一一對應，且最後一根的收盤類欄位與日線一致 (除權息會讓還原價整段改變)
+    bar_days = bars.index.to_numpy().astype('datetime64[D]')
+    keep = (bar_days > labels[0]) & (bar_days < last_label)
+    middle_labels = labels[first_end:start]
+    expected = middle_labels[np.r_[True, middle_labels[1:] != middle_labels[:-1]]]
+    if not np.array_equal(bar_days[keep], expected):
+        return None
+    for src, dst in mapping.items():
+        if AGG_BY_NAME[src.lower()] == 'last':
+            a, b = bars[dst].to_numpy()[keep][-1], daily[src].iat[start - 1]
+            if not (a == b or (pd.isna(a) and pd.isna(b)) or np.isclose(a, b, rtol=1e-9, atol=0)):
+                return None
+
+    # 第一個週期與最後幾個週期直接以陣列聚合，再與中間週期接起來
+    edge_days, edge_values = _edge_bars(daily, np.r_[0:first_end, start:len(daily)], tf, mapping)
+    k = int(np.count_nonzero(edge_days.astype('datetime64[D]') <= labels[0]))
+    index = pd.DatetimeIndex(np.concatenate([edge_days[:k], bar_days[keep].astype(edge_days.dtype), edge_days[k:]]),
+                             name=daily.index.name)
+    return pd.DataFrame({
+        dst: np.concatenate([edge_values[src][:k], bars[dst].to_numpy()[keep], edge_values[src][k:]])
+        for src, dst in mapping.items()
+    }, index=index)
+
+
+def _edge_bars(daily: pd.DataFrame, rows: np.ndarray, tf: str, mapping: Dict[str, str]):
+    """
+    只聚合 rows 指定的日線 (與 resample_bars 相同的缺值處理與最後一根標籤)
+
+    Returns:
+        (標籤陣列, {日線欄位: 聚合值})
+    """
+    labels = _period_end_days(daily.index[rows], tf)
+    change = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    starts = np.r_[0, change]
+    ends = np.r_[change - 1, len(rows) - 1]
+
+    values = {}
+    for src in mapping:
+        reduced = _reduce(daily[src].to_numpy()[rows], AGG_BY_NAME[src.lower()], starts, ends)
+        if reduced is None:
+            # first / last 欄位有缺值 (例如板塊指數第一天沒有開盤價)：這幾列改走 resample_bars
+            edge = resample_bars(daily.iloc[rows][list(mapping)], tf)
+            return edge.index.to_numpy(), {c: edge[c].to_numpy() for c in mapping}
+        values[src] = reduced
+
+    days = labels[starts].astype(daily.index.dtype)
+    price = [values[c] for c in mapping if c.lower() in PRICE_NAMES]
+    if price:
+        valid = ~np.logical_and.reduce([np.isnan(np.asarray(v, dtype='float64')) for v in price])
+        if not valid.all():
+            days = days[valid]
+            values = {c: v[valid] for c, v in values.items()}
+    last_date = daily.index[-1].to_datetime64()
+    if len(days) and days[-1] > last_date:
+        days = days.copy()
+        days[-1] = last_date
+    return days, values
+
+
+# ----------------------
+# 檔案存取
+# ----------------------
+_memo = OrderedDict()     # 聚合表路徑 -> ((mtime, size), DataFrame)
+
+
+def bars_path(daily_path, tf: str) -> Path:
+    # 依日線所在目錄 (tw / us / sector) 分開存放，避免同名檔互相覆蓋
+    daily_path = Path(daily_path)
+    return BARS_DIR / daily_path.parent.name / tf / daily_path.name
+
+
+def _remember(path: Path, bars: pd.DataFrame):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return
+    _memo[path] = ((st.st_mtime, st.st_size), bars)
+    _memo.move_to_end(path)
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+
+
+def _read(path: Path):
+    """讀取聚合表 (同一個檔案版本只解碼一次)；回傳 (DataFrame 或 None, 檔案 mtime 或 None)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    hit = _memo.get(path)
+    if hit is not None and hit[0] == (st.st_mtime, st.st_size):
+        _memo.move_to_end(path)
+        return hit[1], st.st_mtime
+    try:
+        bars = pq.read_table(path).to_pandas()
+    except Exception:
+        return None, st.st_mtime
+    _remember(path, bars)
+    return bars, st.st_mtime
+
+
+def read_bars(daily_path, tf: str) -> Optional[pd.DataFrame]:
+    """
+    直接讀取預先聚合表 (不需要日線)
+
+    Returns:
+        DataFrame；檔案不存在、或日線檔比聚合表新 (其他程序改過日線，已過期) 時回傳 None
+    """
+    bars, mtime = _read(bars_path(daily_path, tf))
+    if bars is None:
+        return None
+    try:
+        if os.stat(daily_path).st_mtime > mtime:
+            return None
+    except OSError:
+        pass
+    return bars.copy()
+
+
+def write_bars(daily_path, daily: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    依剛存好的日線增量更新 W / M / W_live 三張表
+
+    Returns:
+        {週期: 聚合表}
+    """
+    if daily.index.tz is not None:
+        # 與 CacheManager.load() 一致：讀回的日線不帶時區
+        daily = daily.tz_localize(None)
+    result = {}
+    for tf in ('W', 'M'):
+        stored, _ = _read(bars_path(daily_path, tf))
+        bars = extend_bars(stored, daily, tf)
+        result[tf] = bars if bars is not None else resample_bars(daily, tf)
+    result['W_live'] = live_weekly(result['W'], daily)
+
+    for tf, bars in result.items():
+        path = bars_path(daily_path, tf)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        bars.to_parquet(tmp, compression='snappy', index=True)
+        tmp.replace(path)
+        _remember(path, bars.copy())
+    return result
+
+
+def delete_bars(daily_path):
+    for tf in TIMEFRAMES:
+        path = bars_path(daily_path, tf)
+        path.unlink(missing_ok=True)
+        _memo.pop(path, None)
+
+
+def load_bars(daily_path, tf: str, daily: Optional[pd.DataFrame] = None,
+              label_last: bool = True) -> Optional[pd.DataFrame]:
+    """
+    取得週 / 月 K (優先使用預先聚合表)
+
+    Args:
+        daily_path: 日線檔路徑 (用來定位聚合表)；None = 沒有對應的檔案
+        tf: 'W' / 'M' / 'W_live'
+        daily: 手上已有的日線 (可含盤中報價合併後的最後一根)。提供時沿用聚合表的歷史週期，
+               只以它重算最後一個週期；聚合表不存在或對不上時整段 resample_bars()
+        label_last: False = 最後一根維持週五 / 月底標籤 (同 resample_bars)
+
+    Returns:
+        欄位名稱沿用聚合表 (沒有聚合表時沿用日線)；沒有 daily 且聚合表不存在 / 過期時回傳 None
+    """
+    base = 'W' if tf == 'W_live' else tf
+    if daily is None:
+        bars = read_bars(daily_path, tf) if daily_path is not None else None
+    else:
+        bars = None
+        if daily_path is not None:
+            stored, _ = _read(bars_path(daily_path, base))
+            bars = extend_bars(stored, daily, base)
+        if bars is None:
+            bars = resample_bars(daily, base)
+        if tf == 'W_live':
+            bars = live_weekly(bars, daily)
+
+    if bars is not None and not label_last and not bars.empty:
+        end = _period_end_days(bars.index[-1:], base).astype(bars.index.dtype)
+        bars.index = bars.index[:-1].append(pd.DatetimeIndex(end, name=bars.index.name))
+    return bars
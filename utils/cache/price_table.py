@@ -0,0 +1,173 @@
+"""
+最新價與 N 日報酬精簡表
+
+把 data/cache/tw/*.parquet 壓成一張「每檔一列」的表 (metadata/price_table.parquet)：
+- 查詢多檔股票時只需 stat 檔案確認是否過期，不必逐檔解碼 parquet
+- CacheManager.save() 存檔時同步更新該檔的列；其他程序改動的檔案則在查詢時依 mtime 自動重算
+"""
+
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+CACHE_DIR = PROJECT_ROOT / 'data' / 'cache'
+TABLE_PATH = CACHE_DIR / 'metadata' / 'price_table.parquet'
+
+# 報酬欄位：key → 往回幾根 K 棒
+RETURN_PERIODS = {'1d': 1, '3d': 3, '5d': 5, '10d': 10, '20d': 20}
+TABLE_COLUMNS = ['symbol', 'mtime', 'size', 'last_date', 'close'] + list(RETURN_PERIODS)
+
+
+def read_close_series(path: Path) -> pd.Series:
+    """讀取快取檔的收盤價 (DatetimeIndex，已排序、去時區)"""
+    df = pd.read_parquet(path)
+    if 'Date' in df.columns:
+        df = df.set_index(pd.to_datetime(df['Date'], unit='ms'))
+    col = 'close' if 'close' in df.columns else 'Close'
+    if df.empty or col not in df.columns:
+        return pd.Series(dtype=float)
+
+    idx = df.index
+    if not isinstance(idx, pd.DatetimeIndex):
+        idx = pd.to_datetime(idx, unit='ms') if pd.api.types.is_numeric_dtype(idx) else pd.to_datetime(idx)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return pd.Series(df[col].to_numpy(dtype=float), index=idx).sort_index()
+
+
+def summarize_closes(closes) -> dict:
+    """最新收盤價與各區間報酬 (%)；資料不足的區間為 0"""
+    closes = np.asarray(closes, dtype=float)
+    row = {'close': float(closes[-1]) if len(closes) else 0.0}
+    for key, n in RETURN_PERIODS.items():
+        row[key] = float((closes[-1] / closes[-1 - n] - 1) * 100) if len(closes) > n else 0.0
+    return row
+
+
+class PriceTable:
+    """最新價 / N 日報酬查詢服務 (以 '2330_TW' 形式的快取檔名為鍵)"""
+
+    SERIES_CACHE_SIZE = 64
+
+    def __init__(self, tw_dir: Optional[Path] = None, table_path: Optional[Path] = None):
+        self.tw_dir = Path(tw_dir) if tw_dir else CACHE_DIR / 'tw'
+        self.table_path = Path(table_path) if table_path else TABLE_PATH
+        self._rows: Dict[str, dict] = {}
+        self._series = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.table_path.exists():
+            return
+        try:
+            df = pd.read_parquet(self.table_path)
+            self._rows = {r['symbol']: r for r in df.to_dict('records')}
+        except Exception:
+            self._rows = {}
+
+    def flush(self):
+        """有變動時將整張表寫回磁碟"""
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = list(self._rows.values())
+            self._dirty = False
+        try:
+            self.table_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.table_path.with_suffix('.tmp')
+            pd.DataFrame(rows, columns=TABLE_COLUMNS).to_parquet(tmp, index=False)
+            tmp.replace(self.table_path)
+        except Exception:
+            self._dirty = True
+
+    def _path(self, symbol: str) -> Path:
+        return self.tw_dir / f"{symbol}.parquet"
+
+    def _store(self, symbol: str, st, closes: pd.Series):
+        row = {'symbol': symbol, 'mtime': st.st_mtime, 'size': st.st_size,
+               'last_date': closes.index[-1] if len(closes) else pd.NaT}
+        row.update(summarize_closes(closes.to_numpy()))
+        with self._lock:
+            self._rows[symbol] = row
+            self._dirty = True
+        return row
+
+    def update(self, symbol: str, df: pd.DataFrame):
+        """CacheManager.save() 存檔後呼叫：直接用手上的 DataFrame 更新該列"""
+        path = self._path(symbol)
+        col = 'close' if 'close' in df.columns else 'Close'
+        if not path.exists() or col not in df.columns:
+            return
+        closes = pd.Series(df[col].to_numpy(dtype=float), index=pd.to_datetime(df.index)).sort_index()
+        self._store(symbol, path.stat(), closes)
+
+    def lookup(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """
+        批次查詢最新價與報酬
+
+        Returns:
+            {symbol: {'close', '1d', '3d', '5d', '10d', '20d'}}；沒有快取檔的 symbol 不會出現在結果中
+        """
+        result, changed = {}, False
+        for symbol in symbols:
+            try:
+                st = os.stat(self._path(symbol))
+            except OSError:
+                continue
+
+            row = self._rows.get(symbol)
+            if row is None or row['mtime'] != st.st_mtime or row['size'] != st.st_size:
+                try:
+                    row = self._store(symbol, st, read_close_series(self._path(symbol)))
+                    changed = True
+                except Exception:
+                    continue
+            result[symbol] = {k: row[k] for k in ['close'] + list(RETURN_PERIODS)}
+
+        if changed:
+            self.flush()
+        return result
+
+    def close_series(self, symbol: str) -> pd.Series:
+        """單檔完整收盤價 (依 mtime 快取在記憶體，重複點選不再解碼 parquet)"""
+        path = self._path(symbol)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return pd.Series(dtype=float)
+
+        key = (symbol, st.st_mtime, st.st_size)
+        with self._lock:
+            if key in self._series:
+                self._series.move_to_end(key)
+                return self._series[key]
+
+        closes = read_close_series(path)
+        with self._lock:
+            self._series[key] = closes
+            while len(self._series) > self.SERIES_CACHE_SIZE:
+                self._series.popitem(last=False)
+        return closes
+
+
+_PRICE_TABLE: Optional[PriceTable] = None
+_INSTANCE_LOCK = threading.Lock()
+
+
+def get_price_table() -> PriceTable:
+    """程序內共用的 PriceTable (結束時自動寫回未儲存的變動)"""
+    global _PRICE_TABLE
+    with _INSTANCE_LOCK:
+        if _PRICE_TABLE is None:
+            _PRICE_TABLE = PriceTable()
+            atexit.register(_PRICE_TABLE.flush)
+        return _PRICE_TABLE
@@ -0,0 +1,141 @@
+# ==================================================
+# chart_data.py
+# Dash 戰情室圖表的向量化資料準備
+# ==================================================
+#  - K 線 hover 文字、量能顏色、均線 hover、X 軸刻度都由整欄運算產生，不再逐列 iterrows
+#  - EPS 的季別解析、季增 / 年增 / 累計 / 累計年增以 str.extract、shift、groupby 計算
+#  - 結果與舊版逐列迴圈相同 (scripts/bench_chart_build.py 會逐項比對並計時)
+
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _fmt(values: pd.Series, spec: str) -> pd.Series:
+    """整欄套用 format 規格 (例如 ':.2f'、':,.0f')"""
+    return values.map(('{' + spec + '}').format)
+
+
+# ----------------------
+# K 線
+# ----------------------
+def kline_hover_text(df: pd.DataFrame, change: pd.Series) -> List[str]:
+    """K 棒 hover：日期 / 開高低收 / 漲跌"""
+    text = ("日期: " + df['Date'].dt.strftime('%Y-%m-%d')
+            + "<br>開: " + _fmt(df['Open'], ':.2f')
+            + "<br>高: " + _fmt(df['High'], ':.2f')
+            + "<br>低: " + _fmt(df['Low'], ':.2f')
+            + "<br>收: " + _fmt(df['Close'], ':.2f')
+            + "<br>漲跌: " + _fmt(change, ':+.2f'))
+    return text.tolist()
+
+
+def volume_hover_text(volume: pd.Series) -> List[str]:
+    return ("成交量: " + _fmt(volume, ':,.0f')).tolist()
+
+
+def volume_colors(close: pd.Series) -> np.ndarray:
+    """收盤比前一根高 = 紅、低 = 綠、持平 (含第一根) = 淺灰"""
+    diff = close.diff().to_numpy()
+    return np.select([diff > 0, diff < 0], ['red', 'green'], default='lightgray')
+
+
+def ma_hover_text(name: str, values: pd.Series) -> List[str]:
+    """均線 hover；尚未滿窗 (NaN) 的位置為空字串"""
+    text = (name + ": " + _fmt(values, ':.2f')).where(values.notna(), '')
+    return text.tolist()
+
+
+def period_ticks(dates: pd.Series, period_type: str) -> Tuple[List[int], List[str]]:
+    """
+    X 軸刻度：日線每月第一根、週線每季第一根標 "YYYY-MM"，月線每年第一根標 "YYYY"
+
+    Returns:
+        (tickvals, ticktext)
+    """
+    dates = pd.Series(pd.to_datetime(dates).to_numpy())
+    if period_type == "D":
+        key, fmt = dates.dt.month, '%Y-%m'
+    elif period_type == "W":
+        key, fmt = dates.dt.year * 4 + (dates.dt.month - 1) // 3, '%Y-%m'
+    else:
+        key, fmt = dates.dt.year, '%Y'
+    key = key.to_numpy()
+    pos = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype=int)
+    return pos.tolist(), dates.iloc[pos].dt.strftime(fmt).tolist()
+
+
+# ----------------------
+# EPS
+# ----------------------
+def parse_seasons(season: pd.Series) -> pd.DataFrame:
+    """
+    季別字串 -> 年 / 季 (解析不到為 NaN)
+
+    依序嘗試 "2024Q3" / "2024-3"、民國 "113.3"、民國年月 "11309"
+    """
+    s = season.astype(str).str.strip()
+    western = s.str.extract(r'(\d{4})[\-\s]*Q?(\d)').astype('float64')
+    roc = s.str.extract(r'(\d{2,3})\.(\d)').astype('float64')
+    roc_month = s.str.extract(r'(\d{3})(\d{2})').astype('float64')
+
+    year = western[0].fillna(roc[0] + 1911).fillna(roc_month[0] + 1911)
+    quarter = western[1].fillna(roc[1]).fillna((roc_month[1] - 1) // 3 + 1)
+    return pd.DataFrame({"年": year, "季": quarter}, index=season.index)
+
+
+def growth_pct(curr: pd.Series, prev: pd.Series) -> pd.Series:
+    """(本期 - 前期) / |前期| * 100；前期為 0 時為 NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ((curr - prev) / prev.abs() * 100).where(prev != 0)
+
+
+def eps_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    加上 季增率 / 年增率 / 累計EPS / 累計年增率 (df 需為舊 → 新且已有 年 / 季 欄)
+    """
+    df = df.copy()
+    eps = df["EPS"]
+    df["季增率"] = growth_pct(eps, eps.shift(1))
+    df["年增率"] = growth_pct(eps, eps.shift(4))
+
+    # 累計 EPS = 同年度中季別 <= 本季的 EPS 總和 (同季重複時一併計入)
+    keys = pd.MultiIndex.from_frame(df[["年", "季"]])
+    cum = df.groupby(["年", "季"])["EPS"].sum().groupby(level=0).cumsum()
+    df["累計EPS"] = cum.reindex(keys).to_numpy()
+
+    # 累計年增率：與去年同季的累計 EPS 比較
+    last_year = pd.MultiIndex.from_arrays([df["年"] - 1, df["季"]])
+    df["累計年增率"] = growth_pct(df["累計EPS"], pd.Series(cum.reindex(last_year).to_numpy(), index=df.index))
+    return df
+
+
+# ----------------------
+# 表格樣式
+# ----------------------
+# 依序比對 (先命中者優先)：關鍵字 -> (底色, 字色)
+ETF_ACTION_STYLES = (
+    ('新買入', ("white", "red")),
+    ('完全賣出', ("black", "white")),
+    ('大幅增持', ("red", "yellow")),
+    ('顯著增持', ("#ffb1b1", "black")),
+    ('大幅減持', ("green", "white")),
+    ('顯著減持', ("#b1ffb1", "black")),
+)
+
+
+def etf_action_styles(actions: pd.Series) -> List[dict]:
+    """ETF 特殊異動表 action_type 欄的 style_data_conditional (actions 需為 0..n-1 連續索引)"""
+    text = actions.astype(str).str.strip()
+    hits = [text.str.contains(key, regex=False).to_numpy() for key, _ in ETF_ACTION_STYLES]
+    choice = np.select(hits, np.arange(len(ETF_ACTION_STYLES)), default=-1)
+    return [
+        {
+            "if": {"row_index": int(i), "column_id": "action_type"},
+            "backgroundColor": ETF_ACTION_STYLES[c][1][0],
+            "color": ETF_ACTION_STYLES[c][1][1],
+            "fontWeight": "bold",
+        }
+        for i, c in zip(np.flatnonzero(choice >= 0), choice[choice >= 0])
+    ]
@@ -4,9 +4,9 @@
 # ==================================================
 
 import pandas as pd
-import io
 from pathlib import Path
-import requests
+
+from utils.etf import holdings_diff, holdings_store
 
 # ----------------------
 # 基本參數
@@ -25,27 +25,13 @@ def load_history(etf_code: str = None, days: int = 30) -> pd.DataFrame:
     讀取 clean CSV，取過去 N 天資料
     etf_code: ETF 代號（例如 "00991A"），如果為 None 則使用預設值
     """
-    github_url = f"https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/clean/{FUND}/{ETF_CODE}.csv"
-    df = None
-
-    # 優先嘗試讀取 GitHub (雲端化 2.0)
-    try:
-        print(f"🌐 獲取雲端基金資料: {github_url}")
-        # 加入 timeout 防止網路卡住
-        response = requests.get(github_url, timeout=5)
-        if response.status_code == 200:
-            df = pd.read_csv(io.StringIO(response.text), parse_dates=['date'])
-            print("✅ 雲端資料讀取成功")
-    except Exception as e:
-        print(f"⚠️ 雲端讀取失敗，嘗試本地 fallback: {e}")
+    etf_code = etf_code or ETF_CODE
 
-    # 若雲端失敗，才讀取本地 (原本的邏輯)
-    if df is None:
-        csv_path = BASE_DIR / "data" / "clean" / FUND / f"{etf_code}.csv"
-        df = pd.read_csv(str(csv_path), parse_dates=['date'])
-        print(f"🏠 本地資料讀取成功: {csv_path}")
+    # 本地優先：雲端只做條件式驗證，有更新才下載；解析結果由 holdings_store 快取
+    holdings_store.sync_clean_csv(FUND, etf_code)
+    df = holdings_store.load_holdings(FUND, etf_code)
+    df = df.rename(columns={'stock_id': 'stock_code', 'name': 'stock_name'})
 
-    # 後續處理... (不變)
     df = df.sort_values(['date', 'stock_code'])
     return df
 
@@ -54,105 +40,10 @@ def compute_diff(df: pd.DataFrame, highlight_pct: float = 10) -> pd.DataFrame:
     """
     計算最新一次 vs 前一次「有資料的日期」的股數差異
     - 自動略過假日 / 缺資料日
+    - 只有一天資料 (新上市 ETF) 時回傳最新持股，差異欄位為 0
     """
+    return holdings_diff.compute_diff(df, highlight_pct)
 
-    if df.empty:
-        return df
-
-    # 取得所有有資料的日期（由新到舊）
-    available_dates = (
-        df['date']
-        .dropna()
-        .drop_duplicates()
-        .sort_values()
-        .tolist()
-    )
-
-    # 若不足兩天資料，無法比較
-    if len(available_dates) < 2:
-        raise ValueError("⚠️ 可用日期不足，無法計算差異")
-
-    latest_date = available_dates[-1]
-    prev_date = available_dates[-2]
-
-    latest = df[df['date'] == latest_date].copy()
-    prev = df[df['date'] == prev_date].copy()
-
-    # ✅ 確保沒有重複的 stock_code
-    latest = latest.drop_duplicates(subset=['stock_code'], keep='last')
-    prev = prev.drop_duplicates(subset=['stock_code'], keep='last')
-
-    # ✅ 合併時要包含 stock_name
-    merged = latest.merge(
-        prev[['stock_code', 'shares', 'stock_name']],
-        on='stock_code',
-        how='outer',
-        suffixes=('_today', '_yesterday')
-    )
-
-    # 補齊缺失值
-    merged['shares_today'] = merged['shares_today'].fillna(0)
-    merged['shares_yesterday'] = merged['shares_yesterday'].fillna(0)
-
-    # ✅ 處理 stock_name：優先用 today 的，沒有就用 yesterday 的
-    merged['stock_name'] = merged['stock_name_today'].combine_first(merged['stock_name_yesterday']).fillna('')
-
-    # ✅ 清理暫時欄位
-    merged = merged.drop(columns=['stock_name_yesterday'], errors='ignore')
-    if 'stock_name_today' in merged.columns:
-        merged = merged.drop(columns=['stock_name_today'], errors='ignore')
-
-    # 計算差異
-    merged['shares_change'] = merged['shares_today'] - merged['shares_yesterday']
-
-    # 百分比變化（避免除以 0）
-    def calc_change_pct(row):
-        if row['shares_yesterday'] > 0:
-            return (row['shares_change'] / row['shares_yesterday']) * 100
-        elif row['shares_today'] > 0:
-            return 100.0
-        else:
-            return 0.0
-
-    merged['change_pct'] = merged.apply(calc_change_pct, axis=1)
-
-    # 是否為大變動
-    merged['highlight'] = merged['change_pct'].abs() >= highlight_pct
-
-    # ========= 特殊動作判斷 =========
-    merged['action_type'] = ''
-
-    for idx, row in merged.iterrows():
-        today = row['shares_today']
-        yesterday = row['shares_yesterday']
-        pct = row['change_pct']
-
-        if yesterday == 0 and today > 0:
-            merged.at[idx, 'action_type'] = '🆕 新買入'
-
-        elif yesterday > 0 and today == 0:
-            merged.at[idx, 'action_type'] = '🔴 完全賣出'
-
-        elif pct >= 50:
-            merged.at[idx, 'action_type'] = '🚀 大幅增持'
-
-        elif pct <= -50:
-            merged.at[idx, 'action_type'] = '⚠️ 大幅減持'
-
-        elif 10 <= pct < 50:
-            merged.at[idx, 'action_type'] = '📈 顯著增持'
-
-        elif -50 < pct <= -10:
-            merged.at[idx, 'action_type'] = '📉 顯著減持'
-
-    # 排序：變動最大優先
-    merged = merged.sort_values('change_pct', ascending=False).reset_index(drop=True)
-
-    # 記錄比較日期（之後 UI 很好用）
-    merged['compare_today'] = latest_date
-    merged['compare_prev'] = prev_date
-
-    return merged
 # ----------------------
 # 🆕 計算近一個月 Top 10 持股變化
 # ----------------------
@@ -160,73 +51,7 @@ def compute_top10_trend(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     計算近一個月 Top 10 持股的持股變化趨勢（按持股百分比排序）
     """
-    # 取得最新日期
-    latest_date = df['date'].max()
-
-    # 找出最新日期的 Top 10 持股（按 weight 排序）
-    latest_df = df[df['date'] == latest_date].copy()
-    latest_df = latest_df.sort_values('weight', ascending=False).head(top_n)  # ✅ 改回 weight
-
-    # 🔍 DEBUG: 列印 Top 10
-    print("\n" + "=" * 60)
-    print("🔍 DEBUG: Top 10 股票（按持股百分比排序）")
-    print("=" * 60)
-    for idx, row in latest_df.iterrows():
-        print(
-            f"{row['stock_code']:6} {row['stock_name']:12} {row['weight']:>6.2f}%  股數: {row['shares']:>10,}")  # ✅ 改回 weight
-    print("=" * 60 + "\n")
-
-    top10_codes = latest_df['stock_code'].tolist()
-
-    # 篩選出這些股票在整個時間範圍內的資料
-    df_top10 = df[df['stock_code'].isin(top10_codes)].copy()
-    df_top10 = df_top10.sort_values(['date', 'stock_code'])
-
-    # 計算每檔股票的持股變化
-    result = []
-    for code in top10_codes:
-        stock_data = df_top10[df_top10['stock_code'] == code].copy()
-
-        if len(stock_data) >= 2:
-            first_date = stock_data['date'].min()
-            last_date = stock_data['date'].max()
-            first_shares = stock_data[stock_data['date'] == first_date]['shares'].values[0]
-            last_shares = stock_data[stock_data['date'] == last_date]['shares'].values[0]
-            first_weight = stock_data[stock_data['date'] == first_date]['weight'].values[0]  # ✅ 改回 weight
-            last_weight = stock_data[stock_data['date'] == last_date]['weight'].values[0]  # ✅ 改回 weight
-            stock_name = stock_data['stock_name'].values[0]
-
-            change = last_shares - first_shares
-            change_pct = (change / first_shares * 100) if first_shares > 0 else 0
-            weight_change = last_weight - first_weight  # ✅ 改回 weight
-
-            result.append({
-                'stock_code': code,
-                'stock_name': stock_name,
-                'first_date': first_date,
-                'last_date': last_date,
-                'first_shares': first_shares,
-                'last_shares': last_shares,
-                'shares_change': change,
-                'change_pct': change_pct,
-                'first_weight': first_weight,  # ✅ 改回 weight
-                'last_weight': last_weight,  # ✅ 改回 weight
-                'weight_change': weight_change  # ✅ 改回 weight
-            })
-
-    df_result = pd.DataFrame(result)
-    df_result = df_result.sort_values('last_weight', ascending=False)  # ✅ 改回 weight
-
-    # 🔍 DEBUG: 列印結果
-    print("\n" + "=" * 60)
-    print("🔍 DEBUG: Top 10 趨勢變化資料")
-    print("=" * 60)
-    for idx, row in df_result.iterrows():
-        print(
-            f"{row['stock_code']:6} {row['stock_name']:12} {row['last_weight']:>6.2f}% (變化: {row['weight_change']:>+6.2f}%)")  # ✅ 改回 weight
-    print("=" * 60 + "\n")
-
-    return df_result, df_top10
+    return holdings_diff.compute_top_trend(df, top_n, rank_col='weight')
 
 # ----------------------
 # 🆕 取得 Top 10 每日持股資料（用於繪圖）
@@ -235,17 +60,8 @@ def get_top10_daily_data(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     取得 Top 10 股票的每日持股數據（按持股百分比排序）
     """
-    latest_date = df['date'].max()
-    latest_df = df[df['date'] == latest_date].copy()
-
-    # 🔧 改這裡：按 percentage 排序，而不是 shares
-    latest_df = latest_df.sort_values('percentage', ascending=False).head(top_n)
-    top10_codes = latest_df['stock_code'].tolist()
-
-    df_daily = df[df['stock_code'].isin(top10_codes)].copy()
-    df_daily = df_daily.sort_values(['stock_code', 'date'])
-
-    return df_daily
+    # 持股百分比即 clean CSV 的 weight 欄位
+    return holdings_diff.get_top_daily_data(df, top_n, rank_col='weight')
 
 # ----------------------
 # 測試
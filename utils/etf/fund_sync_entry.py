@@ -1,3 +1,5 @@
+import argparse
+import os
 import sys
 import pandas as pd
 from datetime import datetime, timezone, timedelta
@@ -48,7 +50,11 @@ def count_files(directory):
     return len(list(path.glob("*.xls*"))) + len(list(path.glob("*.json")))
 
 
-def main():
+def main(full_rebuild: bool = False):
+    """
+    Args:
+        full_rebuild: True = 忽略解析紀錄 (manifest)，每個資料夾的檔案全部重新解析
+    """
     print(f"=== 基金同步任務啟動: {datetime.now(tw_tz).strftime('%Y-%m-%d %H:%M:%S')} (TW Time) ===")
 
     targets = [
@@ -84,7 +90,7 @@ def main():
 
     any_new_data = False
 
-    # 🔥 強制救援開關：設定為 True 會強制所有資料夾重新解析一次
+    # 🔥 強制救援開關：設定為 True 會讓每檔 ETF 都跑一次解析 (只補解析還沒處理過的檔案)
     FORCE_PARSE_RECOVERY = True
 
     for t in targets:
@@ -110,15 +116,16 @@ def main():
         # ✨ 觸發解析的條件升級：
         # 1. 有抓到新檔案
         # 2. CSV 還沒生出來 (像 00403A)
-        # 3. 開啟了 FORCE_PARSE_RECOVERY 強制重建 (救回 00981A)
-        if files_after > files_before or not csv_path.exists() or FORCE_PARSE_RECOVERY:
+        # 3. 開啟了 FORCE_PARSE_RECOVERY (補解析漏掉的檔案，救回 00981A) 或指定全量重建
+        if files_after > files_before or not csv_path.exists() or FORCE_PARSE_RECOVERY or full_rebuild:
             print(f"✨ 觸發解析機制！開始重新整理 {t['name']} 的資料...")
             parser = t['parser_cls'](
                 raw_dir=str(save_dir),
                 clean_dir=str(CLEAN_DIR / t['company']),
                 etf_code=t['name']  # 👈 就是這裡的防護，確保寫入正確檔名
             )
-            parser.parse_all_files()
+            # 只解析 manifest 沒紀錄的新檔；全量重建需明確指定 (--full 或 FUND_SYNC_FULL_REBUILD=1)
+            parser.parse_all_files(full=full_rebuild)
             any_new_data = True
         else:
             print(f"ℹ️ 沒有新增檔案，不需要重新解析。")
@@ -130,4 +137,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description='ETF 持股資料同步')
+    arg_parser.add_argument('--full', action='store_true',
+                            help='忽略解析紀錄，全部原始檔重新解析 (也可設環境變數 FUND_SYNC_FULL_REBUILD=1)')
+    args = arg_parser.parse_args()
+    main(full_rebuild=args.full or os.getenv('FUND_SYNC_FULL_REBUILD') == '1')
\ No newline at end of file
@@ -0,0 +1,327 @@
+# ==================================================
+# holdings_diff.py
+# ETF 持股差異共用引擎（ezmoney / fhtrust / capitalfund 通用）
+# ==================================================
+
+import numpy as np
+import pandas as pd
+
+# ----------------------
+# 特殊動作標籤 (可由呼叫端替換成自己的文字)
+# ----------------------
+ACTION_LABELS = {
+    'new': '🆕 新買入',
+    'exit': '🔴 完全賣出',
+    'big_add': '🚀 大幅增持',
+    'big_cut': '⚠️ 大幅減持',
+    'add': '📈 顯著增持',
+    'cut': '📉 顯著減持',
+    'none': '',
+}
+
+
+def change_pct(shares_yesterday, shares_today) -> np.ndarray:
+    """股數變化百分比：前日有持股 → 正常百分比；前日為 0 但今日買進 → 100；其餘 0"""
+    prev = np.asarray(shares_yesterday, dtype=float)
+    today = np.asarray(shares_today, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prev > 0, (today - prev) / prev * 100,
+                        np.where(today > 0, 100.0, 0.0))
+
+
+def classify_actions(shares_yesterday, shares_today, pct, labels: dict = None) -> np.ndarray:
+    """依前後股數與變化百分比，以 np.select 一次判斷所有股票的特殊動作"""
+    labels = {**ACTION_LABELS, **(labels or {})}
+    prev = np.asarray(shares_yesterday, dtype=float)
+    today = np.asarray(shares_today, dtype=float)
+    pct = np.asarray(pct, dtype=float)
+
+    conditions = [
+        (prev == 0) & (today > 0),
+        (prev > 0) & (today == 0),
+        pct >= 50,
+        pct <= -50,
+        (pct >= 10) & (pct < 50),
+        (pct > -50) & (pct <= -10),
+    ]
+    choices = [labels['new'], labels['exit'], labels['big_add'], labels['big_cut'], labels['add'], labels['cut']]
+    return np.select(conditions, choices, default=labels['none'])
+
+
+def compute_all_diffs(df: pd.DataFrame, highlight_pct: float = 10, code_col: str = 'stock_code',
+                      name_col: str = 'stock_name', labels: dict = None) -> pd.DataFrame:
+    """
+    一次計算「每一組相鄰有資料日期」的持股差異
+
+    Returns:
+        每列為 (compare_today, 股票) 的差異，欄位與 compute_diff 相同：
+        shares_today / shares_yesterday / shares_change / change_pct / highlight / action_type /
+        compare_today / compare_prev；今日的其他欄位 (如 weight, date) 原樣保留
+    """
+    if df.empty or 'date' not in df.columns:
+        return pd.DataFrame()
+
+    df = df.dropna(subset=['date']).drop_duplicates(subset=['date', code_col], keep='last')
+    dates = np.sort(df['date'].unique())
+    if len(dates) < 2:
+        return pd.DataFrame()
+
+    # 每筆資料的日期序號；前一日的資料序號 +1 後即可與「今日」對齊，一次 merge 完所有日期對
+    pos = np.searchsorted(dates, df['date'].to_numpy())
+    today = df.rename(columns={'shares': 'shares_today'}).assign(_pos=pos)
+    prev = df[[code_col, 'shares', name_col]].rename(columns={'shares': 'shares_yesterday'}).assign(_pos=pos + 1)
+
+    merged = today.merge(prev, on=['_pos', code_col], how='outer', suffixes=('_today', '_yesterday'))
+    merged = merged[(merged['_pos'] >= 1) & (merged['_pos'] < len(dates))]
+
+    merged['shares_today'] = merged['shares_today'].fillna(0)
+    merged['shares_yesterday'] = merged['shares_yesterday'].fillna(0)
+    merged[name_col] = merged[f'{name_col}_today'].combine_first(merged[f'{name_col}_yesterday']).fillna('')
+    merged = merged.drop(columns=[f'{name_col}_today', f'{name_col}_yesterday'])
+
+    merged['shares_change'] = merged['shares_today'] - merged['shares_yesterday']
+    merged['change_pct'] = change_pct(merged['shares_yesterday'], merged['shares_today'])
+    merged['highlight'] = merged['change_pct'].abs() >= highlight_pct
+    merged['action_type'] = classify_actions(merged['shares_yesterday'], merged['shares_today'],
+                                             merged['change_pct'], labels)
+
+    pos_arr = merged['_pos'].to_numpy()
+    merged['compare_today'] = dates[pos_arr]
+    merged['compare_prev'] = dates[pos_arr - 1]
+
+    merged = merged.drop(columns=['_pos'])
+    return merged.sort_values(['compare_today', 'change_pct'], ascending=[True, False]).reset_index(drop=True)
+
+
+def _without_diff(latest: pd.DataFrame, latest_date, code_col: str) -> pd.DataFrame:
+    """只有一個日期 (例如新上市 ETF)：回傳最新持股，差異欄位補 0 / 空字串，欄位與一般 diff 結果相同"""
+    latest = latest.drop_duplicates(subset=[code_col], keep='last').rename(columns={'shares': 'shares_today'})
+    latest['shares_yesterday'] = 0
+    latest['shares_change'] = 0
+    latest['change_pct'] = 0.0
+    latest['highlight'] = False
+    latest['action_type'] = ''
+    latest['compare_today'] = latest_date
+    latest['compare_prev'] = pd.NaT
+    return latest.reset_index(drop=True)
+
+
+def compute_diff(df: pd.DataFrame, highlight_pct: float = 10, code_col: str = 'stock_code',
+                 name_col: str = 'stock_name', labels: dict = None) -> pd.DataFrame:
+    """
+    最新 vs 前一個有資料日期的持股差異
+
+    只有一個日期時回傳最新持股 (差異欄位為 0)；沒有資料時回傳欄位齊全的空表
+    """
+    dates = np.sort(df['date'].dropna().unique()) if 'date' in df.columns else []
+    if len(dates) == 0:
+        return _without_diff(df.iloc[:0].copy(), pd.NaT, code_col)
+    if len(dates) < 2:
+        return _without_diff(df[df['date'] == dates[-1]].copy(), dates[-1], code_col)
+
+    # 只取最後兩個日期，避免對全歷史做 merge
+    recent = df[df['date'] >= dates[-2]]
+    diffs = compute_all_diffs(recent, highlight_pct, code_col, name_col, labels)
+    return diffs.sort_values('change_pct', ascending=False).reset_index(drop=True)
+
+
+def consecutive_streak(diffs: pd.DataFrame, code_col: str = 'stock_code') -> pd.Series:
+    """
+    由 compute_all_diffs 的結果計算各股票截至最新日期的連續加碼 / 減碼天數
+    正值 = 連買 N 日，負值 = 連賣 N 日，0 = 最新一日無變動
+    """
+    if diffs.empty:
+        return pd.Series(dtype=int)
+
+    sign = np.sign(diffs.pivot_table(index='compare_today', columns=code_col,
+                                     values='shares_change', aggfunc='last').fillna(0))
+    mat = sign.to_numpy()[::-1]
+    latest = mat[0]
+    run = np.cumprod(mat == latest, axis=0).sum(axis=0)
+    return pd.Series(np.where(latest != 0, run * latest, 0).astype(int), index=sign.columns)
+
+
+def compute_top_trend(df: pd.DataFrame, top_n: int = 10, rank_col: str = 'weight'):
+    """
+    最新一日前 N 大持股在整段期間的首尾變化 (以 groupby 取代逐檔篩選)
+
+    Returns:
+        (趨勢摘要 DataFrame, 前 N 大的完整歷史資料)
+    """
+    latest_date = df['date'].max()
+    latest_df = df[df['date'] == latest_date].sort_values(rank_col, ascending=False).head(top_n)
+    top_codes = latest_df['stock_code'].tolist()
+
+    df_top = df[df['stock_code'].isin(top_codes)].sort_values(['date', 'stock_code'])
+
+    grouped = df_top.groupby('stock_code', sort=False)
+    counts = grouped.size()
+    first = grouped.nth(0).set_index('stock_code')
+    last = grouped.nth(-1).set_index('stock_code')
+
+    codes = [c for c in top_codes if counts.get(c, 0) >= 2]
+    if not codes:
+        return pd.DataFrame(), df_top
+
+    first, last = first.loc[codes], last.loc[codes]
+    first_shares = first['shares'].to_numpy(dtype=float)
+    shares_change = last['shares'].to_numpy(dtype=float) - first_shares
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(first_shares > 0, shares_change / first_shares * 100, 0)
+
+    result = pd.DataFrame({
+        'stock_code': codes,
+        'stock_name': first['stock_name'].to_numpy(),
+        'first_date': first['date'].to_numpy(),
+        'last_date': last['date'].to_numpy(),
+        'first_shares': first['shares'].to_numpy(),
+        'last_shares': last['shares'].to_numpy(),
+        'shares_change': shares_change,
+        'change_pct': pct,
+        'first_weight': first['weight'].to_numpy(),
+        'last_weight': last['weight'].to_numpy(),
+        'weight_change': last['weight'].to_numpy() - first['weight'].to_numpy(),
+    })
+
+    return result.sort_values('last_weight', ascending=False), df_top
+
+
+def get_top_daily_data(df: pd.DataFrame, top_n: int = 10, rank_col: str = 'shares') -> pd.DataFrame:
+    """取得最新一日前 N 大持股的每日資料 (繪圖用)"""
+    latest_date = df['date'].max()
+    latest_df = df[df['date'] == latest_date].sort_values(rank_col, ascending=False).head(top_n)
+    top_codes = latest_df['stock_code'].tolist()
+
+    df_daily = df[df['stock_code'].isin(top_codes)].copy()
+    return df_daily.sort_values(['stock_code', 'date'])
+
+
+# ==================================================
+# 多檔 ETF 彙總 (etf × stock × date 一次計算)
+# ==================================================
+def _window_dates(df: pd.DataFrame, periods: int, etf_col: str = 'etf_id'):
+    """
+    每檔 ETF 的 (最新日, 基準日)，以 ETF 代碼序號為索引、日期以「距 epoch 天數」表示
+    基準日 = 往前第 periods-1 個有資料日 (不足時取最早一日)；只有一日資料的 ETF 兩者皆為 -1
+    """
+    codes, etfs = pd.factorize(df[etf_col])
+    days = df['date'].to_numpy(dtype='datetime64[D]').astype('int64')
+
+    # (ETF, 日期) 壓成單一整數鍵後 unique，即得各 ETF 已排序的日期清單
+    span = int(days.max()) + 1
+    pairs = np.unique(codes.astype('int64') * span + days)
+    pair_codes, pair_days = pairs // span, pairs % span
+
+    starts = np.searchsorted(pair_codes, np.arange(len(etfs)))
+    counts = np.diff(np.append(starts, len(pairs)))
+    valid = counts >= 2
+    now = np.where(valid, pair_days[np.minimum(starts + counts - 1, len(pairs) - 1)], -1)
+    base = np.where(valid, pair_days[np.minimum(starts + np.maximum(counts - periods, 0), len(pairs) - 1)], -1)
+    return codes, days, now, base
+
+
+def latest_holdings(df: pd.DataFrame, etf_col: str = 'etf_id') -> pd.DataFrame:
+    """各 ETF 最新一日的持股"""
+    if df.empty:
+        return df
+    latest = df.groupby(etf_col)['date'].transform('max')
+    return df[df['date'] == latest]
+
+
+def window_changes(df: pd.DataFrame, periods: int, etf_col: str = 'etf_id',
+                   code_col: str = 'stock_id', name_col: str = 'name') -> pd.DataFrame:
+    """
+    各 ETF「最新日 vs 往前第 periods-1 個有資料日」的持股變化 (僅保留股數有變動者)
+    資料日期不足 periods 時以最早一日為基準；只有一日資料的 ETF 不列入
+
+    Returns:
+        DataFrame[etf, stock_id, name, w_now, w_prev, s_now, s_prev, s_diff, w_diff]
+    """
+    cols = ['etf', code_col, name_col, 'w_now', 'w_prev', 's_now', 's_prev', 's_diff', 'w_diff']
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    codes, days, now_days, base_days = _window_dates(df, periods, etf_col)
+    keep = [etf_col, code_col, name_col, 'shares', 'weight']
+    subset = [etf_col, code_col]
+    # 只切出最新日與基準日兩個截面，再做一次小表 merge
+    now = df.loc[days == now_days[codes], keep].drop_duplicates(subset=subset, keep='last')
+    base = df.loc[days == base_days[codes], keep].drop_duplicates(subset=subset, keep='last')
+
+    m = now.merge(base, on=[etf_col, code_col], how='outer', suffixes=('_now', '_prev'))
+    m[name_col] = m[f'{name_col}_now'].combine_first(m[f'{name_col}_prev']).fillna('').astype(str)
+    for c in ['shares_now', 'shares_prev', 'weight_now', 'weight_prev']:
+        m[c] = m[c].fillna(0)
+
+    out = pd.DataFrame({
+        'etf': m[etf_col],
+        code_col: m[code_col].astype(str),
+        name_col: m[name_col],
+        'w_now': m['weight_now'],
+        'w_prev': m['weight_prev'],
+        's_now': m['shares_now'],
+        's_prev': m['shares_prev'],
+        's_diff': m['shares_now'] - m['shares_prev'],
+        'w_diff': m['weight_now'] - m['weight_prev'],
+    })
+    return out[out['s_diff'] != 0].reset_index(drop=True)
+
+
+def core_holdings(latest: pd.DataFrame, etf_order: list = None, min_count: int = 3,
+                  etf_col: str = 'etf_id', code_col: str = 'stock_id', name_col: str = 'name') -> pd.DataFrame:
+    """
+    跨 ETF 共同持股：被 min_count 家以上同時持有的股票
+
+    Returns:
+        DataFrame[stock_id, name, count, etfs, weight]，依合計權重由大到小
+    """
+    cols = [code_col, name_col, 'count', 'etfs', 'weight']
+    if latest.empty:
+        return pd.DataFrame(columns=cols)
+
+    latest = latest.assign(**{code_col: latest[code_col].astype(str)})
+    if etf_order:
+        order = {e: i for i, e in enumerate(etf_order)}
+        latest = latest.sort_values(etf_col, key=lambda s: s.map(order), kind='stable')
+
+    # 先用計數篩掉持有家數不足的股票，字串串接只做在少數入選者上
+    counts = latest[code_col].value_counts()
+    latest = latest[latest[code_col].isin(counts.index[counts >= min_count])]
+    if latest.empty:
+        return pd.DataFrame(columns=cols)
+
+    g = latest.groupby(code_col, sort=False)
+    core = pd.DataFrame({
+        name_col: g[name_col].last().astype(str),
+        'count': g[etf_col].size(),
+        'etfs': g[etf_col].agg(', '.join),
+        'weight': g['weight'].sum(),
+    }).reset_index()
+    return core.sort_values('weight', ascending=False, kind='stable').reset_index(drop=True)[cols]
+
+
+def consensus_summary(changes: pd.DataFrame, min_etfs: int = 2, code_col: str = 'stock_id',
+                      name_col: str = 'name'):
+    """
+    籌碼共識：同一檔股票被 min_etfs 家以上同向加碼 / 減碼
+
+    Returns:
+        (買進共識, 賣出共識)，欄位 [stock_id, name, etfs, total]；買進依合計股數由大到小、賣出由小到大
+    """
+    def side(sub, ascending):
+        if sub.empty:
+            return pd.DataFrame(columns=[code_col, name_col, 'etfs', 'total'])
+        counts = sub[code_col].value_counts()
+        sub = sub[sub[code_col].isin(counts.index[counts >= min_etfs])]
+        if sub.empty:
+            return pd.DataFrame(columns=[code_col, name_col, 'etfs', 'total'])
+        g = sub.groupby(code_col, sort=False)
+        res = pd.DataFrame({
+            name_col: g[name_col].first(),
+            'etfs': g['etf'].agg(', '.join),
+            'total': g['s_diff'].sum(),
+        }).reset_index()
+        return res.sort_values('total', ascending=ascending, kind='stable').reset_index(drop=True)
+
+    return side(changes[changes['s_diff'] > 0], False), side(changes[changes['s_diff'] < 0], True)
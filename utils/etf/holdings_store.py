@@ -0,0 +1,158 @@
+# ==================================================
+# holdings_store.py
+# ETF clean 持股資料的本地優先同步層
+# ==================================================
+#  - 本地 data/clean/{provider}/{etf}.csv 為唯一資料來源
+#  - 雲端僅用 ETag / If-Modified-Since 條件式請求驗證，有變動才下載
+#  - 解析 + 正規化後的 DataFrame 同時快取在記憶體與 parquet，切換 ETF 不碰網路也不重新解析 CSV
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+BASE_DIR = Path(__file__).resolve().parents[2]  # 戰情室根目錄
+CLEAN_DIR = BASE_DIR / "data" / "clean"
+NORM_CACHE_DIR = BASE_DIR / "data" / "cache" / "etf"
+RAW_BASE_URL = "https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/clean"
+
+# 同一檔 ETF 在此秒數內不再向雲端驗證
+REVALIDATE_SECONDS = 600
+
+_FRAME_CACHE = {}       # (provider, etf_id) -> (csv 簽章, 正規化 DataFrame)
+_LAST_CHECKED = {}      # (provider, etf_id) -> 上次驗證時間
+_LOCK = threading.Lock()
+
+
+def clean_csv_path(provider: str, etf_id: str) -> Path:
+    return CLEAN_DIR / provider / f"{etf_id}.csv"
+
+
+def _meta_path(provider: str, etf_id: str) -> Path:
+    return NORM_CACHE_DIR / f"{provider}_{etf_id}.meta.json"
+
+
+def _norm_path(provider: str, etf_id: str) -> Path:
+    return NORM_CACHE_DIR / f"{provider}_{etf_id}.parquet"
+
+
+def _signature(path: Path):
+    if not path.exists():
+        return None
+    st = path.stat()
+    return st.st_mtime, st.st_size
+
+
+def normalize_holdings(df: pd.DataFrame) -> pd.DataFrame:
+    """統一欄位名稱 (stock_id / name / shares / weight / date) 與型別"""
+    df.columns = [c.lower().strip().lstrip('\ufeff') for c in df.columns]
+    rm = {}
+    if 'stock_code' in df.columns: rm['stock_code'] = 'stock_id'
+    if 'code' in df.columns: rm['code'] = 'stock_id'
+    if 'stock_name' in df.columns: rm['stock_name'] = 'name'
+    if rm: df = df.rename(columns=rm)
+    for col in ['shares', 'weight']:
+        if col in df.columns and df[col].dtype == 'object':
+            df[col] = pd.to_numeric(df[col].str.replace(',', '').str.replace('%', ''), errors='coerce')
+    if 'stock_id' in df.columns:
+        df['stock_id'] = df['stock_id'].astype(str).str.replace(r'\.TWO?$', '', regex=True).str.strip()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+# ----------------------
+# 雲端條件式同步
+# ----------------------
+def sync_clean_csv(provider: str, etf_id: str, timeout: float = 5, force: bool = False) -> bool:
+    """
+    以 ETag / If-Modified-Since 驗證雲端檔案，只有變動時才下載覆寫本地 CSV
+
+    Returns:
+        True = 本地檔案已更新；False = 無變動、尚在驗證間隔內或網路失敗
+    """
+    key = (provider, etf_id)
+    now = time.time()
+    with _LOCK:
+        if not force and now - _LAST_CHECKED.get(key, 0) < REVALIDATE_SECONDS:
+            return False
+        _LAST_CHECKED[key] = now
+
+    csv_path = clean_csv_path(provider, etf_id)
+    meta_path = _meta_path(provider, etf_id)
+    meta = {}
+    if meta_path.exists() and csv_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except Exception:
+            meta = {}
+
+    headers = {}
+    if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        r = requests.get(f"{RAW_BASE_URL}/{provider}/{etf_id}.csv", headers=headers, timeout=timeout)
+    except Exception as e:
+        print(f"⚠️ {etf_id} 雲端驗證失敗，使用本地資料: {e}")
+        return False
+
+    # 304 = 未變動；其他狀態碼一律沿用本地檔案
+    if r.status_code != 200:
+        return False
+
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = csv_path.with_suffix('.csv.tmp')
+    tmp.write_bytes(r.content)
+    tmp.replace(csv_path)
+
+    NORM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps({
+        'etag': r.headers.get('ETag'),
+        'last_modified': r.headers.get('Last-Modified'),
+    }), encoding='utf-8')
+    print(f"🌐 {etf_id} 雲端資料已更新")
+    return True
+
+
+# ----------------------
+# 本地載入 (記憶體 → parquet → CSV)
+# ----------------------
+def load_holdings(provider: str, etf_id: str) -> pd.DataFrame:
+    """
+    讀取正規化後的持股資料 (不做任何網路請求)
+    回傳副本，呼叫端可自由修改
+    """
+    key = (provider, etf_id)
+    csv_path = clean_csv_path(provider, etf_id)
+    sig = _signature(csv_path)
+    if sig is None:
+        return pd.DataFrame()
+
+    with _LOCK:
+        cached = _FRAME_CACHE.get(key)
+    if cached and cached[0] == sig:
+        return cached[1].copy()
+
+    df = None
+    norm_path = _norm_path(provider, etf_id)
+    if norm_path.exists() and norm_path.stat().st_mtime >= sig[0]:
+        try:
+            df = pd.read_parquet(norm_path)
+        except Exception:
+            df = None
+
+    if df is None:
+        df = normalize_holdings(pd.read_csv(csv_path, encoding='utf-8-sig'))
+        try:
+            NORM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(norm_path, index=False)
+        except Exception as e:
+            print(f"⚠️ {etf_id} 快取寫入失敗: {e}")
+
+    with _LOCK:
+        _FRAME_CACHE[key] = (sig, df)
+    return df.copy()
@@ -3,6 +3,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from utils.etf.modules.parsers.incremental import IncrementalCleanStore
+
 
 class CapitalFundParser:
     def __init__(self, raw_dir, clean_dir, etf_code="00982A"):
@@ -43,8 +45,8 @@ class CapitalFundParser:
 
         return df
 
-    def parse_all_files(self):
-        """解析目錄下所有 JSON 並合併輸出 CSV"""
+    def parse_all_files(self, full: bool = False):
+        """解析目錄下新增 / 變動的 JSON 並追加到 CSV (full=True 全量重建)"""
         if not self.raw_dir.exists():
             print(f"⚠️ RAW_DIR 不存在：{self.raw_dir}")
             return
@@ -54,30 +56,27 @@ class CapitalFundParser:
             print(f"⚠️ 找不到 JSON 檔案：{self.raw_dir}")
             return
 
-        print(f"📂 找到 {len(files)} 個 JSON，開始解析 {self.etf_code} ...")
+        store = IncrementalCleanStore(self.raw_dir, self.out_file, full=full)
+        todo = store.pending(files)
+        if not todo:
+            print(f"✅ {self.etf_code} 沒有新的 JSON，略過解析")
+            store.commit({})
+            return
+
+        print(f"📂 找到 {len(files)} 個 JSON，需解析 {len(todo)} 個 ({self.etf_code}) ...")
 
-        all_rows = []
-        for f in files:
+        parsed = {}
+        for f in todo:
             try:
-                df = self.parse_json(f)
-                if not df.empty:
-                    all_rows.append(df)
+                parsed[f] = self.parse_json(f)
             except Exception as e:
                 print(f"⚠️ 解析失敗：{f.name} ({e})")
 
-        if not all_rows:
+        if not any(not df.empty for df in parsed.values()):
             print("❌ 沒有解析出任何有效資料")
+            store.commit(parsed)
             return
 
-        # 合併資料
-        result = pd.concat(all_rows, ignore_index=True)
-
-        # ✨ 新增：全域去重防呆
-        result = result.drop_duplicates(subset=['stock_code', 'date'], keep='last')
-
-        # 排序與輸出
-        result = result.sort_values(by=["date", "weight"], ascending=[True, False])
-
-        self.out_file.parent.mkdir(parents=True, exist_ok=True)
-        result.to_csv(self.out_file, index=False, encoding="utf-8-sig")
-        print(f"✅ 解析完成，輸出到：{self.out_file}")
\ No newline at end of file
+        # 追加 / 合併寫入 (全域去重防呆)
+        rows = store.commit(parsed)
+        print(f"✅ 解析完成 (+{rows} 筆)，輸出到：{self.out_file}")
@@ -7,6 +7,8 @@
 import pandas as pd
 from pathlib import Path
 
+from utils.etf.modules.parsers.incremental import IncrementalCleanStore
+
 
 class FHTrustParser:
     """復華投信 ETF 資料解析器"""
@@ -67,8 +69,11 @@ class FHTrustParser:
 
         return df
 
-    def parse_all_files(self):
-        """解析所有檔案並輸出 CSV"""
+    def parse_all_files(self, full: bool = False):
+        """
+        解析 Excel 並輸出 CSV
+        預設只解析 manifest 中沒有紀錄 (或內容有變動) 的檔案；full=True 全量重建
+        """
         # 1️⃣ 防呆：RAW_DIR 必須存在
         if not self.raw_dir.exists():
             raise FileNotFoundError(f"❌ RAW_DIR 不存在：{self.raw_dir}")
@@ -79,36 +84,32 @@ class FHTrustParser:
             print(f"⚠️ RAW_DIR 底下找不到 Excel 檔案：{self.raw_dir}")
             return
 
-        print(f"📂 找到 {len(files)} 個 Excel 檔案，開始解析 {self.etf_code} ...")
+        # 3️⃣ 只挑出需要解析的檔案
+        store = IncrementalCleanStore(self.raw_dir, self.out_file, full=full)
+        todo = store.pending(files)
+        if not todo:
+            print(f"✅ {self.etf_code} 沒有新的 Excel，略過解析")
+            store.commit({})
+            return
+
+        print(f"📂 找到 {len(files)} 個 Excel 檔案，需解析 {len(todo)} 個 ({self.etf_code}) ...")
 
-        # 3️⃣ 解析所有 Excel
-        all_rows = []
-        for f in files:
+        # 4️⃣ 解析 Excel
+        parsed = {}
+        for f in todo:
             try:
-                all_rows.append(self.parse_excel(f))
+                parsed[f] = self.parse_excel(f)
             except Exception as e:
                 print(f"⚠️ 解析失敗：{f.name}")
                 print(e)
 
-        if not all_rows:
+        if not parsed:
             raise RuntimeError("❌ 沒有任何檔案成功解析")
 
-        # 4️⃣ 合併 DataFrame
-        result = pd.concat(all_rows, ignore_index=True)
-
-        # 5️⃣ 排序（日期 + 權重）
-        result = result.sort_values(
-            by=['date', 'weight'],
-            ascending=[True, False]
-        )
-
-        # 6️⃣ 建立 clean 資料夾
-        self.out_file.parent.mkdir(parents=True, exist_ok=True)
-
-        # 7️⃣ 輸出 CSV
-        result.to_csv(self.out_file, index=False, encoding='utf-8-sig')
+        # 5️⃣ 追加 / 合併寫入 clean CSV（日期取自檔名，單檔內已去重）
+        rows = store.commit(parsed, dedupe=False)
 
-        print(f"✅ 解析完成，輸出到：{self.out_file}")
+        print(f"✅ 解析完成 (+{rows} 筆)，輸出到：{self.out_file}")
 
 
 # 保留原本的執行方式
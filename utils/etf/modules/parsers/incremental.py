@@ -0,0 +1,140 @@
+# utils/etf/modules/parsers/incremental.py
+# ==================================================
+# 增量解析：記錄已解析的 raw 檔 (路徑 / mtime / 大小 / hash)，
+# 每日只解析新檔或有變動的檔案，並以追加方式寫入 clean CSV
+# ==================================================
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+CLEAN_SORT_COLS = ['date', 'weight']
+CLEAN_KEY_COLS = ['date', 'stock_code']
+
+
+def file_hash(file_path: Path) -> str:
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class IncrementalCleanStore:
+    """
+    raw 檔清單 ↔ clean CSV 的增量同步
+
+    用法：
+        store = IncrementalCleanStore(raw_dir, out_file)
+        for f in store.pending(files): parsed[f] = parse(f)
+        store.commit(parsed)
+    """
+
+    def __init__(self, raw_dir, out_file, full: bool = False):
+        self.raw_dir = Path(raw_dir)
+        self.out_file = Path(out_file)
+        self.manifest_file = self.out_file.with_suffix('.manifest.json')
+        # manifest 或 clean CSV 任一不存在 → 全量重建
+        self.full = full or not self.manifest_file.exists() or not self.out_file.exists()
+        self.entries = {} if self.full else self._load_manifest()
+        self._hashes = {}
+
+    def _load_manifest(self) -> dict:
+        try:
+            return json.loads(self.manifest_file.read_text(encoding='utf-8')).get('files', {})
+        except Exception:
+            self.full = True
+            return {}
+
+    def _key(self, file_path: Path) -> str:
+        return Path(file_path).relative_to(self.raw_dir).as_posix()
+
+    def pending(self, files) -> list:
+        """回傳需要 (重新) 解析的檔案；mtime 變了但內容 hash 相同的檔案只更新紀錄"""
+        todo = []
+        for f in files:
+            key = self._key(f)
+            st = f.stat()
+            entry = self.entries.get(key)
+            if entry and entry['mtime'] == st.st_mtime and entry['size'] == st.st_size:
+                continue
+
+            digest = file_hash(f)
+            if entry and entry['hash'] == digest:
+                entry.update(mtime=st.st_mtime, size=st.st_size)
+                continue
+
+            self._hashes[key] = digest
+            todo.append(f)
+        return todo
+
+    def commit(self, parsed: dict, dedupe: bool = True) -> int:
+        """
+        將新解析的結果寫入 clean CSV 並更新 manifest
+
+        Args:
+            parsed: {raw 檔路徑: 解析出的 DataFrame}，依檔名排序後合併 (後者覆蓋前者)
+            dedupe: 是否以 (date, stock_code) 去重
+
+        Returns:
+            寫入的資料列數
+        """
+        frames = [df for _, df in sorted(parsed.items()) if df is not None and not df.empty]
+        new_rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        written = 0
+        if not new_rows.empty:
+            new_rows['date'] = new_rows['date'].astype(str)
+            written = self._write_clean(new_rows, dedupe)
+
+        for f, df in parsed.items():
+            key = self._key(f)
+            st = Path(f).stat()
+            self.entries[key] = {
+                'mtime': st.st_mtime,
+                'size': st.st_size,
+                'hash': self._hashes.get(key) or file_hash(f),
+                'rows': 0 if df is None else len(df),
+            }
+        self._save_manifest()
+        return written
+
+    def _write_clean(self, new_rows: pd.DataFrame, dedupe: bool) -> int:
+        if dedupe:
+            new_rows = new_rows.drop_duplicates(subset=CLEAN_KEY_COLS, keep='last')
+        new_rows = new_rows.sort_values(by=CLEAN_SORT_COLS, ascending=[True, False])
+        self.out_file.parent.mkdir(parents=True, exist_ok=True)
+
+        existing = None
+        if not self.full:
+            try:
+                existing = pd.read_csv(self.out_file, dtype={'stock_code': str, 'date': str}, encoding='utf-8-sig')
+            except pd.errors.EmptyDataError:
+                existing = None
+
+        if existing is None:
+            new_rows.to_csv(self.out_file, index=False, encoding='utf-8-sig')
+            return len(new_rows)
+
+        new_rows = new_rows.astype({'stock_code': str})
+
+        # 常態：新檔的日期都比既有資料新 → 直接追加在檔尾
+        if existing.empty or new_rows['date'].min() > existing['date'].max():
+            new_rows[existing.columns.tolist()].to_csv(
+                self.out_file, mode='a', header=False, index=False, encoding='utf-8')
+            return len(new_rows)
+
+        # 補檔或既有檔案被改寫：以新解析的日期取代舊資料後重寫 (仍不需重新解析其他 raw 檔)
+        existing = existing[~existing['date'].isin(new_rows['date'].unique())]
+        result = pd.concat([existing, new_rows], ignore_index=True)
+        if dedupe:
+            result = result.drop_duplicates(subset=CLEAN_KEY_COLS, keep='last')
+        result = result.sort_values(by=CLEAN_SORT_COLS, ascending=[True, False])
+        result.to_csv(self.out_file, index=False, encoding='utf-8-sig')
+        return len(new_rows)
+
+    def _save_manifest(self):
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_file.write_text(
+            json.dumps({'files': self.entries}, ensure_ascii=False, indent=1), encoding='utf-8')
@@ -42,8 +42,8 @@ PARSERS = {
 # ... 下面的 parse_all, parse_specific 等函式完全不用動 ...
 
 
-def parse_all():
-    """解析所有投信的資料"""
+def parse_all(full=False):
+    """解析所有投信的資料 (預設只解析新檔，full=True 全量重建)"""
     print("=" * 60)
     print("開始清理資料")
     print("=" * 60)
@@ -70,13 +70,13 @@ def parse_all():
             )
 
             try:
-                parser.parse_all_files()
+                parser.parse_all_files(full=full)
             except Exception as e:
                 print(f"❌ 解析失敗：{e}")
 
 
-def parse_specific(company):
-    """解析特定投信"""
+def parse_specific(company, full=False):
+    """解析特定投信 (預設只解析新檔，full=True 全量重建)"""
     if company not in PARSERS:
         print(f"錯誤：找不到 '{company}'")
         print(f"可用的投信: {', '.join(PARSERS.keys())}")
@@ -102,7 +102,7 @@ def parse_specific(company):
         )
 
         try:
-            parser.parse_all_files()
+            parser.parse_all_files(full=full)
         except Exception as e:
             print(f"❌ 解析失敗：{e}")
 
@@ -115,6 +115,7 @@ def print_help():
     print("  python parse.py --all         # 解析所有投信")
     print("  python parse.py ezmoney       # 只解析 EZMoney")
     print("  python parse.py fhtrust       # 只解析復華投信")
+    print("  python parse.py --all --full  # 忽略 manifest，全量重新解析")
     print("  python parse.py --help        # 顯示此說明")
     print("\n可用的投信:")
     for company, config in PARSERS.items():
@@ -124,15 +125,16 @@ def print_help():
 
 
 if __name__ == "__main__":
+    full = '--full' in sys.argv[2:]
     if len(sys.argv) > 1:
         cmd = sys.argv[1]
 
         if cmd == '--all':
-            parse_all()
+            parse_all(full)
         elif cmd in ['--help', '-h']:
             print_help()
         elif cmd in PARSERS:
-            parse_specific(cmd)
+            parse_specific(cmd, full)
         else:
             print(f"未知參數: {cmd}")
             print_help()
@@ -72,8 +72,33 @@ class StrategyAnalyzer:
             except Exception as e:
                 pass
 
+    def load_close_prices(self, stock_ids) -> pd.DataFrame:
+        """讀取多檔股票的收盤價，回傳長表 [stock_id, date, close] (依日期排序)"""
+        frames = []
+        for stock_id in stock_ids:
+            price_path = self.cache_dir / f"{stock_id}_{self.get_market_suffix(stock_id)}.parquet"
+            if not price_path.exists():
+                continue
+            try:
+                price_df = pd.read_parquet(price_path)
+                price_df.columns = [c.capitalize() for c in price_df.columns]
+                if price_df.empty or 'Close' not in price_df.columns:
+                    continue
+                frames.append(pd.DataFrame({
+                    'stock_id': stock_id,
+                    'date': pd.to_datetime(price_df.index).tz_localize(None).astype('datetime64[ns]'),
+                    'close': price_df['Close'].to_numpy(dtype=float),
+                }))
+            except Exception:
+                pass
+
+        if not frames:
+            return pd.DataFrame({'stock_id': pd.Series(dtype=str), 'date': pd.Series(dtype='datetime64[ns]'),
+                                 'close': pd.Series(dtype=float)})
+        return pd.concat(frames, ignore_index=True).sort_values('date', kind='stable')
+
     def analyze_dual_leaderboards(self):
-        """計算雙榜單所需的所有歷史與價格特徵"""
+        """計算雙榜單所需的所有歷史與價格特徵 (日期 × 股票矩陣一次算完)"""
         if not self.all_data: return pd.DataFrame()
 
         combined_df = pd.concat(self.all_data, ignore_index=True)
@@ -91,84 +116,57 @@ class StrategyAnalyzer:
         t_20 = dates[-20] if len(dates) >= 20 else dates[0]
         t_60 = dates[-60] if len(dates) >= 60 else dates[0]
 
-        analysis_results = []
-        stocks = daily_summary['stock_id'].unique()
-
         print(f"📈 啟動雙榜單籌碼追蹤引擎...")
 
-        for stock_id in stocks:
-            stock_data = daily_summary[daily_summary['stock_id'] == stock_id].sort_values('date')
-            name = stock_data['name'].iloc[0]
-
-            def get_shares(t_date):
-                return stock_data[stock_data['date'] == t_date]['shares'].sum() if t_date in stock_data[
-                    'date'].values else 0
-
-            shares_now = get_shares(t_now)
-            shares_5d_ago = get_shares(t_5)
-            shares_20d_ago = get_shares(t_20)
-            shares_60d_ago = get_shares(t_60)
-
-            diff_5d = shares_now - shares_5d_ago
-            diff_20d = shares_now - shares_20d_ago
-            diff_60d = shares_now - shares_60d_ago
-
-            # 條件過濾：我們只看「近5天有在買」的活水股
-            if diff_5d <= 0: continue
-
-            market = self.get_market_suffix(stock_id)
-            price_path = self.cache_dir / f"{stock_id}_{market}.parquet"
-
-            current_price = 0
-            estimated_cost_60d = 0
-            net_buy_value_60d = 0
-
-            if price_path.exists():
-                try:
-                    price_df = pd.read_parquet(price_path)
-                    price_df.columns = [c.capitalize() for c in price_df.columns]
-                    price_df.index = pd.to_datetime(price_df.index).tz_localize(None)
-
-                    if not price_df.empty:
-                        current_price = price_df.iloc[-1]['Close']
-
-                        stock_data_60 = stock_data[stock_data['date'] >= t_60].copy()
-                        stock_data_60['share_change'] = stock_data_60['shares'].diff().fillna(0)
-
-                        total_buy_cost = 0
-                        total_buy_shares = 0
-
-                        for _, row in stock_data_60.iterrows():
-                            if row['share_change'] > 0:
-                                p_date = row['date']
-                                if p_date in price_df.index:
-                                    daily_price = price_df.loc[p_date, 'Close']
-                                else:
-                                    nearest_idx = price_df.index.get_indexer([p_date], method='nearest')[0]
-                                    daily_price = price_df.iloc[nearest_idx]['Close']
-
-                                total_buy_cost += (row['share_change'] * daily_price)
-                                total_buy_shares += row['share_change']
-
-                        if total_buy_shares > 0:
-                            estimated_cost_60d = total_buy_cost / total_buy_shares
-                            net_buy_value_60d = total_buy_cost / 100000000
-                except Exception:
-                    pass
-
-            analysis_results.append({
-                '代號': stock_id,
-                '名稱': name,
-                '當前股數': shares_now,
-                '20日前股數': shares_20d_ago,
-                '近5日增減': diff_5d,
-                '近20日增減': diff_20d,
-                '一季耗資(億)': round(net_buy_value_60d, 0),
-                '最新收盤價': current_price,
-                '投信季成本': round(estimated_cost_60d, 2)
-            })
-
-        result_df = pd.DataFrame(analysis_results)
+        # 1️⃣ (日期 × 股票) 持股矩陣：同一天多檔 ETF 持股加總，當天沒持有即為 0
+        stocks = daily_summary['stock_id'].unique()
+        names = daily_summary.groupby('stock_id', sort=False)['name'].first()
+        shares_mat = daily_summary.pivot_table(index='date', columns='stock_id', values='shares',
+                                               aggfunc='sum', fill_value=0).reindex(columns=stocks)
+
+        snap = shares_mat.loc[[t_now, t_5, t_20, t_60]].to_numpy(dtype=float)
+        shares_now, shares_5d_ago, shares_20d_ago = snap[0], snap[1], snap[2]
+        diff_5d = shares_now - shares_5d_ago
+        diff_20d = shares_now - shares_20d_ago
+
+        # 條件過濾：我們只看「近5天有在買」的活水股
+        active = diff_5d > 0
+        active_ids = stocks[active]
+
+        # 2️⃣ 近一季每日加碼股數 (長表)，以 merge_asof 對上最接近的收盤價
+        #    各 ETF 持股先加總成「每日合計」(淨買賣：A 賣 B 買互相抵銷)，
+        #    再只在該股有出現的日期間做差分，第一筆記 0 (區間內首次出現不算買進)
+        held = daily_summary[(daily_summary['date'] >= t_60) & daily_summary['stock_id'].isin(active_ids)]
+        held = held.groupby(['stock_id', 'date'])['shares'].sum().reset_index()
+        held['buy'] = held.groupby('stock_id')['shares'].diff().fillna(0).clip(lower=0)
+        buys = held.loc[held['buy'] > 0, ['date', 'stock_id', 'buy']].copy()
+        buys['date'] = buys['date'].astype('datetime64[ns]')
+
+        prices = self.load_close_prices(active_ids)
+        buys = buys[buys['stock_id'].isin(prices['stock_id'].unique())].sort_values('date', kind='stable')
+        matched = pd.merge_asof(buys, prices, on='date', by='stock_id', direction='nearest')
+        matched['cost'] = matched['buy'] * matched['close']
+
+        agg = matched.groupby('stock_id')[['cost', 'buy']].sum()
+        current_price = prices.groupby('stock_id')['close'].last()
+
+        total_buy_cost = agg['cost'].reindex(active_ids).fillna(0).to_numpy()
+        total_buy_shares = agg['buy'].reindex(active_ids).fillna(0).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimated_cost_60d = np.where(total_buy_shares > 0, total_buy_cost / total_buy_shares, 0)
+        net_buy_value_60d = np.where(total_buy_shares > 0, total_buy_cost / 100000000, 0)
+
+        result_df = pd.DataFrame({
+            '代號': active_ids,
+            '名稱': names.reindex(active_ids).to_numpy(),
+            '當前股數': shares_now[active].astype(int),
+            '20日前股數': shares_20d_ago[active].astype(int),
+            '近5日增減': diff_5d[active].astype(int),
+            '近20日增減': diff_20d[active].astype(int),
+            '一季耗資(億)': np.round(net_buy_value_60d, 0),
+            '最新收盤價': current_price.reindex(active_ids).fillna(0).to_numpy(),
+            '投信季成本': np.round(estimated_cost_60d, 2),
+        })
         if result_df.empty: return result_df
 
         result_df['乖離(%)'] = np.where(result_df['投信季成本'] > 0,
@@ -1,19 +1,38 @@
 # utils/indicator_loader.py
 
-from pathlib import Path
-import pandas as pd
-from datetime import datetime, timedelta
-from utils.indicator_index import load_indicator_index
+from utils.indicator_index import INDEX_PATH, load_indicator_index
+from utils.indicator_store import EVENT_STORE_PATH, IndicatorEventIndex, store_signature
 
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
-# 🆕 修正路徑指向 indicators 根目錄，而非 tw
-INDICATOR_ROOT = PROJECT_ROOT / "data" / "indicators"
+# 跨呼叫共用的事件索引快取 (Dash 每次點擊篩選都會呼叫多次 load_indicator_stocks)
+_EVENT_INDEX_CACHE = {"signature": None, "index": None}
+
+
+def _index_signature() -> tuple:
+    index_mtime = INDEX_PATH.stat().st_mtime if INDEX_PATH.exists() else 0.0
+    return store_signature(), index_mtime
+
+
+def get_event_index() -> IndicatorEventIndex:
+    """
+    取得記憶體內的事件索引
+    只有事件表或 index.json 變動時才重新載入，其餘呼叫直接回傳快取
+    """
+    signature = _index_signature()
+    if _EVENT_INDEX_CACHE["index"] is None or _EVENT_INDEX_CACHE["signature"] != signature:
+        if EVENT_STORE_PATH.exists():
+            event_index = IndicatorEventIndex.from_store()
+        else:
+            event_index = IndicatorEventIndex.from_index_dict(load_indicator_index())
+
+        _EVENT_INDEX_CACHE["index"] = event_index
+        _EVENT_INDEX_CACHE["signature"] = signature
+
+    return _EVENT_INDEX_CACHE["index"]
 
 
 def load_indicator_stocks(
         indicator_name: str,
-        days: int | None = None,
-        strategy_folder: str | None = None # 🆕 選填：若需使用 legacy 掃描，需指定資料夾
+        days: int | None = None
 ) -> set[str]:
     """
     回傳符合某一 indicator 的股票代號集合 (使用索引檔加速)
@@ -21,81 +40,20 @@ def load_indicator_stocks(
     Args:
         indicator_name: 指標欄位名稱 (如 "daily_break_30w")
         days: 近N日內 (None = 不限時間)
-        strategy_folder: (Legacy用) 若索引失效，需指定去哪個資料夾掃描 (如 "break_30w")
 
     Returns:
         符合條件的股票代號集合
     """
 
-    # 1. 優先使用索引檔 (最快，不受資料夾結構影響)
-    index = load_indicator_index()
-
-    if indicator_name in index:
-        stocks_dict = index[indicator_name]  # {stock_id: [dates]}
-
-        if days is None:
-            matched = set(stocks_dict.keys())
-            print(f"📌 {indicator_name} (索引): {len(matched)} 檔")
-            return matched
-
-        cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        matched = set()
-
-        for stock_id, dates in stocks_dict.items():
-            if any(date >= cutoff_date for date in dates):
-                matched.add(stock_id)
-
-        print(f"📌 {indicator_name} (近{days}日): {len(matched)} 檔")
-        return matched
-
-    # 2. 備用方案: 掃描檔案
-    # 如果索引找不到，且沒有提供 strategy_folder，就無法掃描
-    if not strategy_folder:
-        print(f"⚠️ 索引無資料且未指定 strategy_folder，無法載入 {indicator_name}")
-        return set()
-
-    print(f"⚠️ 索引檔沒有 {indicator_name}，嘗試掃描資料夾: {strategy_folder}...")
-    return load_indicator_stocks_legacy(indicator_name, strategy_folder, days)
-
-
-def load_indicator_stocks_legacy(
-        indicator_name: str,
-        strategy_folder: str,  # 🆕 必須指定資料夾
-        days: int | None = None
-) -> set[str]:
-    """備用方案: 直接掃描指定策略資料夾下的 parquet 檔案"""
-
-    # 組合路徑: data/indicators/{strategy_folder}/tw
-    # 這裡預設掃描 tw，若有美股需求可再擴充
-    target_path = INDICATOR_ROOT / strategy_folder / "tw"
+    # 1. 常駐記憶體的事件索引 (檔案有變動才重載)，近 N 日 = 一次二分搜尋
+    event_index = get_event_index()
 
-    if not target_path.exists():
-        print(f"❌ 路徑不存在: {target_path}")
+    if indicator_name not in event_index:
+        # 舊版逐檔 parquet 由 build_indicator_index 一次轉入事件表 (import_legacy_files)，這裡不再掃描
+        print(f"⚠️ 索引無資料: {indicator_name}")
         return set()
 
-    cutoff_date = None
-    if days is not None:
-        cutoff_date = pd.Timestamp.now() - pd.Timedelta(days=days)
-
-    matched = set()
-
-    for p in target_path.glob("*.parquet"):
-        parts = p.stem.split('_')
-        stock_id = parts[0] if parts else p.stem
-
-        try:
-            df = pd.read_parquet(p)
-        except Exception:
-            continue
-
-        if indicator_name not in df.columns:
-            continue
-
-        filter_df = df
-        if cutoff_date is not None:
-            filter_df = df[df["date"] >= cutoff_date]
-
-        if filter_df[indicator_name].any():
-            matched.add(stock_id)
-
-    return matched
\ No newline at end of file
+    matched = event_index.sids_in_last_days(indicator_name, days)
+    label = f"近{days}日" if days is not None else "索引"
+    print(f"📌 {indicator_name} ({label}): {len(matched)} 檔")
+    return matched
@@ -0,0 +1,213 @@
+# utils/indicator_store.py
+
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INDICATOR_ROOT = PROJECT_ROOT / "data" / "indicators"
+# 所有策略訊號集中存成一張 (indicator, sid, date) 事件表，依 indicator 分區
+EVENT_STORE_PATH = INDICATOR_ROOT / "events"
+
+EVENT_COLUMNS = ["indicator", "sid", "date"]
+_PARTITIONING = ds.partitioning(pa.schema([("indicator", pa.string())]), flavor="hive")
+
+
+def _empty_events() -> pd.DataFrame:
+    return pd.DataFrame({
+        "indicator": pd.Series(dtype=str),
+        "sid": pd.Series(dtype=str),
+        "date": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+def events_from_frame(df: pd.DataFrame, stock_id: str, indicator_cols: list[str]) -> pd.DataFrame:
+    """
+    將寬表 (date + 多個布林指標欄位) 攤平成事件列
+
+    Args:
+        df: 含 date 欄位與指標欄位的資料
+        stock_id: 股票代號 (如 2330_TW，只保留 2330)
+        indicator_cols: 要收錄的指標欄位
+
+    Returns:
+        (indicator, sid, date) 事件 DataFrame，只包含觸發 (True) 的日子
+    """
+    cols = [c for c in indicator_cols if c in df.columns]
+    if not cols:
+        return _empty_events()
+
+    flags = df[cols].fillna(False).astype(bool).to_numpy()
+    rows, col_idx = np.nonzero(flags)
+    if len(rows) == 0:
+        return _empty_events()
+
+    dates = pd.to_datetime(df["date"]).dt.normalize().to_numpy()
+    return pd.DataFrame({
+        "indicator": np.asarray(cols, dtype=object)[col_idx],
+        "sid": stock_id.split("_")[0],
+        "date": dates[rows],
+    })
+
+
+def write_events(events: pd.DataFrame, replace: bool = False) -> int:
+    """
+    將事件寫入分區 parquet
+
+    Args:
+        events: (indicator, sid, date) 事件
+        replace: True = 整張表重建 (每日全量重算時使用)；
+                 False = 與既有事件合併去重後，只重寫有新事件的 indicator 分區 (重跑同一天不會重複)
+
+    Returns:
+        寫入的事件筆數
+    """
+    if replace and EVENT_STORE_PATH.exists():
+        shutil.rmtree(EVENT_STORE_PATH)
+    # 沒有事件也保留空的事件表目錄，避免 build_indicator_index 誤以為尚未建表而重新轉入舊版檔案
+    EVENT_STORE_PATH.mkdir(parents=True, exist_ok=True)
+
+    if events is None or events.empty:
+        return 0
+
+    events = events[EVENT_COLUMNS]
+    if not replace:
+        existing = load_events(events["indicator"].unique().tolist())
+        events = pd.concat([existing, events], ignore_index=True)
+    events = events.drop_duplicates(ignore_index=True)
+
+    table = pa.Table.from_pandas(events, preserve_index=False)
+    ds.write_dataset(
+        table,
+        EVENT_STORE_PATH,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        basename_template=f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="delete_matching",
+    )
+    return len(events)
+
+
+def load_events(indicators: list[str] | None = None) -> pd.DataFrame:
+    """讀取事件表 (可只讀指定 indicator 的分區)"""
+    if not EVENT_STORE_PATH.exists():
+        return _empty_events()
+
+    dataset = ds.dataset(EVENT_STORE_PATH, format="parquet", partitioning=_PARTITIONING)
+    filter_expr = ds.field("indicator").isin(list(indicators)) if indicators else None
+    df = dataset.to_table(filter=filter_expr).to_pandas()
+    if df.empty:
+        return _empty_events()
+
+    df["indicator"] = df["indicator"].astype(str)
+    df["sid"] = df["sid"].astype(str)
+    df["date"] = pd.to_datetime(df["date"])
+    return df[EVENT_COLUMNS].drop_duplicates(ignore_index=True)
+
+
+def store_signature() -> tuple:
+    """事件表的 (檔案數, 最新 mtime)，供記憶體索引判斷是否需要重載"""
+    if not EVENT_STORE_PATH.exists():
+        return 0, 0.0
+    mtimes = [p.stat().st_mtime for p in EVENT_STORE_PATH.rglob("*.parquet")]
+    return len(mtimes), max(mtimes, default=0.0)
+
+
+def import_legacy_files() -> int:
+    """將舊版 data/indicators/{策略}/{市場}/{股票}.parquet 一次轉入事件表"""
+    legacy_files = [p for p in INDICATOR_ROOT.rglob("*.parquet") if EVENT_STORE_PATH not in p.parents]
+    if not legacy_files:
+        return 0
+
+    frames = []
+    for file in legacy_files:
+        try:
+            df = pd.read_parquet(file)
+        except Exception as e:
+            print(f"⚠️ {file.name} 處理失敗: {e}")
+            continue
+        indicator_cols = [col for col in df.columns if col != 'date']
+        frames.append(events_from_frame(df, file.stem, indicator_cols))
+
+    events = pd.concat(frames, ignore_index=True) if frames else _empty_events()
+    return write_events(events.drop_duplicates(ignore_index=True), replace=True)
+
+
+class IndicatorEventIndex:
+    """
+    記憶體內的事件索引
+    每個 indicator 保存依日期排序的 (date, sid) 陣列，
+    「近 N 日有訊號的股票」= 一次二分搜尋 + 切片
+    """
+
+    def __init__(self, events: pd.DataFrame):
+        self._dates = {}
+        self._sids = {}
+
+        if events is None or events.empty:
+            return
+
+        events = events.sort_values(["indicator", "date"], kind="stable")
+        for name, grp in events.groupby("indicator", sort=False):
+            self._dates[name] = grp["date"].to_numpy(dtype="datetime64[D]")
+            self._sids[name] = grp["sid"].to_numpy(dtype=object)
+
+    @classmethod
+    def from_store(cls, indicators: list[str] | None = None):
+        return cls(load_events(indicators))
+
+    @classmethod
+    def from_index_dict(cls, index: dict):
+        """由舊版 index.json 的 {indicator: {sid: [dates...]}} 建立"""
+        indicators, sids, dates = [], [], []
+        for name, stocks in index.items():
+            for sid, date_list in stocks.items():
+                indicators.extend([name] * len(date_list))
+                sids.extend([sid] * len(date_list))
+                dates.extend(date_list)
+
+        if not dates:
+            return cls(None)
+        return cls(pd.DataFrame({"indicator": indicators, "sid": sids, "date": pd.to_datetime(dates)}))
+
+    def __contains__(self, indicator_name: str) -> bool:
+        return indicator_name in self._dates
+
+    @property
+    def indicators(self) -> list[str]:
+        return list(self._dates.keys())
+
+    def sids_since(self, indicator_name: str, cutoff=None) -> set[str]:
+        """回傳 cutoff (含) 之後曾觸發 indicator 的股票代號；cutoff=None 代表不限時間"""
+        dates = self._dates.get(indicator_name)
+        if dates is None:
+            return set()
+
+        sids = self._sids[indicator_name]
+        if cutoff is None:
+            return set(sids)
+
+        pos = np.searchsorted(dates, np.datetime64(pd.Timestamp(cutoff).date(), "D"), side="left")
+        return set(sids[pos:])
+
+    def sids_in_last_days(self, indicator_name: str, days: int | None = None) -> set[str]:
+        """回傳近 N 日內曾觸發 indicator 的股票代號 (與舊版 index.json 的日期比較規則一致)"""
+        cutoff = None if days is None else (datetime.now() - timedelta(days=days)).date()
+        return self.sids_since(indicator_name, cutoff)
+
+    def to_dict(self) -> dict:
+        """轉回舊版 index.json 的 {indicator: {sid: [dates...]}} 格式"""
+        result = {}
+        for name, dates in self._dates.items():
+            df = pd.DataFrame({"sid": self._sids[name], "date": np.datetime_as_string(dates, unit="D")})
+            result[name] = {
+                sid: sorted(set(grp))
+                for sid, grp in df.groupby("sid", sort=True)["date"]
+            }
+        return result
@@ -3,6 +3,8 @@
 from pathlib import Path
 import pandas as pd
 
+from utils.indicator_store import events_from_frame, write_events
+
 # 修改為指向 indicators 根目錄 (不再寫死 tw)
 INDICATOR_ROOT = Path(__file__).resolve().parent.parent / "data" / "indicators"
 
@@ -15,32 +17,23 @@ def write_daily_indicators(
         market: str = "tw"  # 🆕 新增：市場別 (預設 tw)
 ):
     """
-    將日級 indicator 事件寫入 indicators parquet
+    將日級 indicator 事件合併進事件表 (data/indicators/events)，同一天重跑不會產生重複事件
 
     Args:
         df: 資料來源
         stock_id: 股票代號 (如 2330_TW)
         indicator_cols: 要保留的指標欄位
-        sub_folder: 策略名稱 (如 "break_30w", "consolidation")，將建立獨立資料夾
-        market: 市場 (tw/us)，建立第二層資料夾
+        sub_folder: 舊版的策略資料夾名稱，事件表以 indicator 分區後已不再使用，保留參數相容
+        market: 舊版的市場資料夾，同上
+
+    批次運算請改用 events_from_frame 收集事件後一次呼叫 write_events，
+    避免每檔股票都重寫一次分區
     """
 
     # 檢查是否有任何觸發
     if not df[indicator_cols].any().any():
         return
 
-    event_df = df.loc[
-        df[indicator_cols].any(axis=1),
-        ["date"] + indicator_cols
-    ].copy()
-
-    event_df["date"] = pd.to_datetime(event_df["date"])
-
-    # 🆕 動態建構路徑: data/indicators/{sub_folder}/{market}/
-    output_dir = INDICATOR_ROOT / sub_folder / market
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    output_path = output_dir / f"{stock_id}.parquet"
-    event_df.to_parquet(output_path, index=False)
+    write_events(events_from_frame(df, stock_id, indicator_cols))
 
-    # print(f"✅ indicators 已輸出：{output_path}") # 除錯用
\ No newline at end of file
+    # print(f"✅ indicators 已輸出：{stock_id}") # 除錯用
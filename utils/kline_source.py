@@ -0,0 +1,169 @@
+# ==================================================
+# kline_source.py
+# 日 K 的分層載入：本地快取 -> HTTP 磁碟快取 -> 遠端 (GitHub)
+# ==================================================
+#  - 第一層：CacheManager 的 data/cache/tw|us (本機已有約 2000 檔，命中時完全不連網)
+#  - 第二層：data/cache/http 下的遠端檔副本，附 .meta.json 記錄 ETag / Last-Modified；
+#    FRESH_SECONDS 內直接使用，過期才送條件式請求 (304 沿用副本，200 才重新下載)
+#  - 第三層：遠端下載失敗時，若有舊副本仍沿用 (離線也能開圖)
+#  - 快取鍵只有股票代號：日 / 週 / 月共用同一份日線，週期轉換交給 utils.cache.period_bars
+#    (本地快取有預先聚合的週 / 月 K 時沿用歷史週期，見 load_period_bars)
+
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import requests
+
+from utils.cache.manager import CacheManager
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HTTP_CACHE_DIR = PROJECT_ROOT / 'data' / 'cache' / 'http'
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/phanchang/stock-room-data/main/data/cache"
+FRESH_SECONDS = 600          # 副本在這段時間內不重新驗證
+TIMEOUT = 10
+
+_cache_manager: Optional[CacheManager] = None
+
+
+def _manager() -> CacheManager:
+    global _cache_manager
+    if _cache_manager is None:
+        _cache_manager = CacheManager()
+    return _cache_manager
+
+
+def _market(symbol: str) -> str:
+    return 'tw' if ('.TW' in symbol or '.TWO' in symbol) else 'us'
+
+
+def _file_name(symbol: str) -> str:
+    # 與 CacheManager 相同：2330.TW -> 2330_TW.parquet
+    return f"{symbol.replace('.', '_')}.parquet"
+
+
+def remote_url(symbol: str, base_url: str = REMOTE_BASE_URL) -> str:
+    return f"{base_url.rstrip('/')}/{_market(symbol)}/{_file_name(symbol)}"
+
+
+def http_cache_path(symbol: str) -> Path:
+    return HTTP_CACHE_DIR / _market(symbol) / _file_name(symbol)
+
+
+def _read_meta(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def fetch_remote(symbol: str, base_url: str = REMOTE_BASE_URL) -> Optional[Path]:
+    """
+    取得遠端日線檔的本機副本 (必要時下載)
+
+    Returns:
+        副本路徑；遠端失敗且沒有舊副本時回傳 None
+    """
+    path = http_cache_path(symbol)
+    meta_path = path.with_suffix('.meta.json')
+    meta = _read_meta(meta_path) if path.exists() else {}
+
+    if meta and time.time() - meta.get('checked', 0) < FRESH_SECONDS:
+        return path
+
+    headers = {'User-Agent': 'pandas'}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        print(f"📡 [網路請求] 驗證遠端日線: {_file_name(symbol)}")
+        resp = requests.get(remote_url(symbol, base_url), headers=headers, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        print(f"⚠️ 遠端日線請求失敗: {e}")
+        return path if path.exists() else None
+
+    if resp.status_code == 304 and path.exists():
+        meta['checked'] = time.time()
+    elif resp.status_code == 200 and resp.content:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(resp.content)
+        tmp.replace(path)
+        meta = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'checked': time.time(),
+        }
+    else:
+        print(f"⚠️ 遠端日線回應 {resp.status_code}: {_file_name(symbol)}")
+        return path if path.exists() else None
+
+    try:
+        meta_path.write_text(json.dumps(meta), encoding='utf-8')
+    except OSError:
+        pass
+    return path
+
+
+def _read_daily(path: Path) -> Optional[pd.DataFrame]:
+    """讀取遠端副本並整理成與 CacheManager.load() 相同的格式 (日期索引、無時區、已排序)"""
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        print(f"⚠️ 讀取日線副本失敗 ({path.name}): {e}")
+        return None
+
+    if 'Date' in df.columns:
+        df = df.set_index('Date')
+    if not isinstance(df.index, pd.DatetimeIndex):
+        unit = 'ms' if pd.api.types.is_numeric_dtype(df.index) else None
+        df.index = pd.to_datetime(df.index, unit=unit)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df.sort_index()
+
+
+def load_daily(symbol: str, base_url: str = REMOTE_BASE_URL, allow_remote: bool = True) -> Optional[pd.DataFrame]:
+    """
+    依序從本地快取 -> HTTP 磁碟快取 -> 遠端取得日線
+
+    Args:
+        symbol: 股票代號 (如 '2330.TW')
+        base_url: 遠端 data/cache 根目錄
+        allow_remote: False = 只用本機資料 (本地快取或既有副本)
+
+    Returns:
+        欄位沿用快取檔 (小寫 open/high/low/close/volume ...) 的 DataFrame；全部失敗時為 None
+    """
+    df = _manager().load(symbol)
+    if df is not None and not df.empty:
+        return df
+
+    if allow_remote:
+        path = fetch_remote(symbol, base_url)
+    else:
+        path = http_cache_path(symbol)
+        path = path if path.exists() else None
+    if path is None:
+        return None
+
+    df = _read_daily(path)
+    return df if df is not None and not df.empty else None
+
+
+def load_period_bars(symbol: str, tf: str, daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    以 load_daily() 取得的日線產生週 / 月 K
+
+    本地快取有 CacheManager 維護的預先聚合表時沿用其歷史週期，只以 daily 重算最後一個週期；
+    日線來自 HTTP 副本 / yfinance 而與聚合表對不上時，自動整段重算
+
+    Args:
+        tf: 'W' / 'M'
+        daily: 日期索引的日線 (欄位大小寫不拘)
+    """
+    return _manager().load_bars(symbol, tf, daily)
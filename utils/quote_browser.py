@@ -0,0 +1,182 @@
+# ==================================================
+# quote_browser.py
+# 以 headless Chrome 池抓取 CMoney 報價頁 (QuoteSource 的 Selenium 備援路徑)
+# ==================================================
+
+import re
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# 若您的環境需要 Service，可自行取消註解
+# from selenium.webdriver.chrome.service import Service
+
+CMONEY_URL = "https://www.cmoney.tw/forum/stock/{stock_id}"
+
+# 報價區塊渲染完成的判斷依據：出現「成交 + 數字」
+QUOTE_READY_PATTERN = re.compile(r"成交\s*[+-]?[\d,]+\.?\d*")
+
+
+def init_chrome_driver():
+    """初始化 Chrome Driver (eager：DOMContentLoaded 後即返回，不等圖片/廣告)"""
+    print("🔧 [QuoteWorker] 正在啟動 Chrome Driver (Headless)...")
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # 背景執行
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument(
+        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.page_load_strategy = 'eager'
+
+    # 直接初始化
+    return webdriver.Chrome(options=chrome_options)
+
+
+class _BrowserContext:
+    """一個 Chrome 實例 + 以股票代號為鍵的分頁 (LRU)"""
+
+    def __init__(self, driver, max_tabs):
+        self.driver = driver
+        self.max_tabs = max_tabs
+        self.tabs = OrderedDict()  # stock_id -> window handle
+
+    def open(self, stock_id, url):
+        """切到該股票的分頁：已開過就 refresh 重用，否則開新分頁或借用最久沒用的分頁"""
+        d = self.driver
+        handle = self.tabs.get(stock_id)
+        if handle is not None:
+            self.tabs.move_to_end(stock_id)
+            d.switch_to.window(handle)
+            d.refresh()
+            return
+
+        if not self.tabs:
+            handle = d.current_window_handle
+        elif len(self.tabs) < self.max_tabs:
+            d.switch_to.new_window('tab')
+            handle = d.current_window_handle
+        else:
+            _, handle = self.tabs.popitem(last=False)
+            d.switch_to.window(handle)
+        self.tabs[stock_id] = handle
+        d.get(url)
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """
+    多個 headless Chrome 並行抓取報價頁
+
+    - pool_size 個瀏覽器同時工作，每個瀏覽器最多保留 max_tabs 個分頁重複使用
+    - 以 DOM 條件 (QUOTE_READY_PATTERN) 等待報價渲染完成，取代固定 sleep
+    - driver_factory / url_template 可替換，方便對本地 HTML fixture 測試
+    """
+
+    def __init__(self, pool_size=3, max_tabs=6, ready_timeout=8.0,
+                 url_template=CMONEY_URL, driver_factory=init_chrome_driver):
+        self.pool_size = max(1, pool_size)
+        self.max_tabs = max(1, max_tabs)
+        self.ready_timeout = ready_timeout
+        self.url_template = url_template
+        self.driver_factory = driver_factory
+
+        self._idle = queue.Queue()
+        self._contexts = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="quote-browser")
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if len(self._contexts) < self.pool_size:
+                    ctx = _BrowserContext(self.driver_factory(), self.max_tabs)
+                    self._contexts.append(ctx)
+                    return ctx
+            # 全部忙碌：稍等後重試 (期間若有瀏覽器被丟棄，可改為重建)
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _discard(self, ctx):
+        with self._lock:
+            if ctx in self._contexts:
+                self._contexts.remove(ctx)
+        ctx.quit()
+
+    def _wait_ready(self, driver):
+        def ready(d):
+            if d.execute_script("return document.readyState") == 'loading':
+                return False
+            text = d.find_element(By.TAG_NAME, "body").text
+            return text if QUOTE_READY_PATTERN.search(text) else False
+
+        try:
+            return WebDriverWait(driver, self.ready_timeout, poll_frequency=0.2).until(ready)
+        except TimeoutException:
+            # 逾時仍回傳目前內容，交給解析端判斷是否有數據
+            return driver.find_element(By.TAG_NAME, "body").text
+
+    def fetch_page_text(self, stock_id):
+        """抓取單檔報價頁的文字 (在 pool 執行緒中執行)"""
+        ctx = self._acquire()
+        try:
+            ctx.open(stock_id, self.url_template.format(stock_id=stock_id))
+            text = self._wait_ready(ctx.driver)
+        except Exception:
+            # 瀏覽器狀態不明 (崩潰 / 分頁遺失) → 丟棄，下次重建
+            self._discard(ctx)
+            raise
+        self._idle.put(ctx)
+        return text
+
+    def fetch_many(self, stock_ids, should_continue=lambda: True):
+        """
+        並行抓取多檔，依完成順序產生 (stock_id, text, error)
+        stock_ids 的順序即派工優先序
+        """
+        futures = {}
+        for sid in stock_ids:
+            futures[self._executor.submit(self._fetch_if_running, sid, should_continue)] = sid
+
+        for fut in as_completed(futures):
+            sid = futures[fut]
+            try:
+                text = fut.result()
+            except Exception as e:
+                yield sid, None, e
+                continue
+            if text is not None:
+                yield sid, text, None
+
+    def _fetch_if_running(self, stock_id, should_continue):
+        # 停止後，尚未開始的工作直接跳過
+        if not should_continue():
+            return None
+        return self.fetch_page_text(stock_id)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            contexts, self._contexts = self._contexts, []
+        for ctx in contexts:
+            ctx.quit()
@@ -0,0 +1,317 @@
+# ==================================================
+# quote_sources.py
+# 即時報價來源抽象層：QuoteWorker 只負責輪詢與發送訊號，實際抓取交給 QuoteSource
+# ==================================================
+#  - TwseMisSource      : 證交所 MIS JSON API，整份監控清單一次請求 (預設)
+#  - CMoneyBrowserSource: headless Chrome 抓 CMoney 頁面 (備援，需 selenium)
+#  - ReplayQuoteSource  : 重播錄製好的報價 (測試 / 離線展示)
+#  - FallbackQuoteSource: 主來源抓不到的股票交給備援來源
+#
+# 所有來源輸出相同格式: {stock_id: {'realtime': {...}, 'info': {...}}}
+# 成交量一律為「股」(與日線 Volume 欄相同)；來源以「張」報量時在各自的 parse 乘上 SHARES_PER_LOT
+
+import abc
+import datetime
+import json
+import re
+from pathlib import Path
+
+import requests
+
+SHARES_PER_LOT = 1000
+
+
+def safe_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def make_quote(latest, open_p=0, high=0, low=0, trade_volume=0, accumulate_volume=0,
+               bid=0, ask=0, previous_close=0, date=None, time=None):
+    """
+    組出 UI 使用的標準報價格式 (KLineModule / ExpandedKLineWindow / StockListModule 共用)
+
+    trade_volume / accumulate_volume 單位為股
+    """
+    now = datetime.datetime.now()
+    latest = safe_float(latest)
+    return {
+        'realtime': {
+            'latest_trade_price': latest,
+            'open': safe_float(open_p),
+            'high': safe_float(high),
+            'low': safe_float(low),
+            'close': latest,
+            'trade_volume': safe_float(trade_volume),
+            'accumulate_trade_volume': safe_float(accumulate_volume),
+            'best_bid_price': [safe_float(bid)],
+            'best_ask_price': [safe_float(ask)],
+            'previous_close': safe_float(previous_close)
+        },
+        'info': {
+            'time': time or now.strftime('%H:%M:%S'),
+            'date': date or now.strftime('%Y%m%d')
+        }
+    }
+
+
+class QuoteSource(abc.ABC):
+    """
+    報價來源介面
+
+    fetch() 為 generator，每次產生一批 {stock_id: quote}；
+    批次式來源整份清單只產生一次，逐檔式來源則每完成一檔就產生一次
+    """
+    name = 'base'
+
+    @abc.abstractmethod
+    def fetch(self, stock_ids, should_continue=lambda: True):
+        ...
+
+    def close(self):
+        pass
+
+
+# ----------------------
+# 證交所 MIS (HTTP JSON)
+# ----------------------
+class TwseMisSource(QuoteSource):
+    """證交所基本市況報導 API：上市 / 上櫃一次查詢，一輪只發一個請求"""
+    name = 'twse_mis'
+
+    API_URL = "https://mis.twse.com.tw/stock/api/getStockInfo.jsp"
+    HOME_URL = "https://mis.twse.com.tw/stock/index.jsp"
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Referer": HOME_URL,
+    }
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self.session = None
+        self.markets = {}  # stock_id -> 'tse' / 'otc' (由回應學習，未知者兩邊都查)
+
+    def _ensure_session(self):
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers.update(self.HEADERS)
+            try:
+                # 先拿 cookie，否則 API 偶爾回空陣列
+                self.session.get(self.HOME_URL, timeout=self.timeout)
+            except Exception:
+                pass
+        return self.session
+
+    def _channels(self, stock_ids):
+        chans = []
+        for sid in stock_ids:
+            mkt = self.markets.get(sid)
+            chans += [f"{mkt}_{sid}.tw"] if mkt else [f"tse_{sid}.tw", f"otc_{sid}.tw"]
+        return "|".join(chans)
+
+    @staticmethod
+    def _first(book):
+        # 五檔以 '_' 分隔，例如 "1015.0000_1010.0000_..._"
+        return book.split('_')[0] if isinstance(book, str) and book else 0
+
+    def parse(self, payload):
+        """將 API 回應的 msgArray 轉為 {stock_id: quote}"""
+        result = {}
+        for m in payload.get('msgArray', []):
+            sid = m.get('c')
+            if not sid:
+                continue
+            if m.get('ex') in ('tse', 'otc'):
+                self.markets[sid] = m['ex']
+
+            bid, ask = safe_float(self._first(m.get('b'))), safe_float(self._first(m.get('a')))
+            # 'z' 為最近成交價，尚未成交或揭示空檔時為 '-'，以買賣價暫代
+            latest = safe_float(m.get('z')) or bid or ask
+            if latest == 0:
+                continue
+
+            # 'tv' (當盤量) / 'v' (累積量) 單位為張
+            t = m.get('t')
+            result[sid] = make_quote(
+                latest, m.get('o'), m.get('h'), m.get('l'),
+                trade_volume=safe_float(m.get('tv')) * SHARES_PER_LOT,
+                accumulate_volume=safe_float(m.get('v')) * SHARES_PER_LOT,
+                bid=bid, ask=ask, previous_close=m.get('y'),
+                date=m.get('d'), time=t if t and t != '-' else None)
+        return result
+
+    def fetch(self, stock_ids, should_continue=lambda: True):
+        stock_ids = list(stock_ids)
+        if not stock_ids or not should_continue():
+            return
+        try:
+            r = self._ensure_session().get(
+                self.API_URL,
+                params={'ex_ch': self._channels(stock_ids), 'json': 1, 'delay': 0},
+                timeout=self.timeout)
+            r.raise_for_status()
+            quotes = self.parse(r.json())
+        except Exception as e:
+            print(f"❌ [QuoteSource:{self.name}] 批次報價失敗: {e}")
+            self.session = None
+            return
+        if quotes:
+            yield quotes
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+# ----------------------
+# CMoney 頁面 (Selenium 備援)
+# ----------------------
+class CMoneyBrowserSource(QuoteSource):
+    """以 headless Chrome 池抓 CMoney 頁面文字再 Regex 解析 (慢，但不依賴 API)"""
+    name = 'cmoney_browser'
+
+    # 定義解析欄位 (來自您的範例)
+    FIELD_MAP = {
+        '成交': '成交', '漲跌': '漲跌', '漲跌幅': '漲跌幅',
+        '單量': '單量', '總量': '總量', '金額': r'金額\(?億\)?',
+        '開盤': '開盤', '最高': '最高', '最低': '最低', '均價': '均價',
+        '買價': '買價', '賣價': '賣價', '內盤': r'內盤\(?張\)?', '外盤': r'外盤\(?張\)?',
+        '本益比': '本益比', '市值': r'市值\(?億\)?'
+    }
+
+    def __init__(self, pool_size=3, **pool_kwargs):
+        self.pool_size = pool_size
+        self.pool_kwargs = pool_kwargs
+        self.pool = None
+
+    def _ensure_pool(self):
+        if self.pool is None:
+            # selenium 只在真的需要備援時才載入
+            from utils.quote_browser import BrowserPool
+            self.pool = BrowserPool(pool_size=self.pool_size, **self.pool_kwargs)
+        return self.pool
+
+    def parse_cmoney_text(self, text):
+        """使用 Regex 解析 CMoney 網頁文字"""
+        result = {}
+        clean_text = text.replace('\n', ' ')
+        for field_name, keyword in self.FIELD_MAP.items():
+            pattern = rf"{keyword}\s*([+-]?[\d,]+\.?\d*%?)"
+            match = re.search(pattern, clean_text)
+            val = match.group(1) if match else "-"
+            # 移除逗號以便後續轉換數值
+            if val != "-":
+                val = val.replace(',', '')
+            result[field_name] = val
+        return result
+
+    def convert_to_ui_format(self, cmoney_data):
+        """將 CMoney 的中文欄位轉換為 UI 顯示用的標準格式"""
+        g = cmoney_data.get
+        # 這裡計算不出昨收，UI 會自己去 Cache 抓，傳 0 即可；單量 / 總量單位為張
+        return make_quote(g('成交', 0), g('開盤', 0), g('最高', 0), g('最低', 0),
+                          trade_volume=safe_float(g('單量', 0)) * SHARES_PER_LOT,
+                          accumulate_volume=safe_float(g('總量', 0)) * SHARES_PER_LOT,
+                          bid=g('買價', 0), ask=g('賣價', 0))
+
+    def fetch(self, stock_ids, should_continue=lambda: True):
+        for stock_id, body_text, err in self._ensure_pool().fetch_many(stock_ids, should_continue):
+            if err is not None:
+                print(f"❌ [QuoteSource:{self.name}] {stock_id} 抓取失敗: {err}")
+                continue
+
+            # 擷取前 5000 字元解析即可
+            raw_data = self.parse_cmoney_text(body_text[:5000])
+            if raw_data.get('成交') == '-':
+                print(f"⚠️ [QuoteSource:{self.name}] {stock_id} 暫無數據 (可能載入不全)")
+                continue
+            yield {stock_id: self.convert_to_ui_format(raw_data)}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+# ----------------------
+# 重播 (測試 / 離線)
+# ----------------------
+class ReplayQuoteSource(QuoteSource):
+    """
+    依序重播錄製的報價快照
+
+    frames: [{stock_id: quote}, ...]；quote 可為標準格式，
+    或僅含 make_quote 參數的扁平 dict (例如 {'latest': 101.5, 'previous_close': 100})
+    """
+    name = 'replay'
+
+    def __init__(self, frames, loop=True):
+        self.frames = [
+            {sid: q if 'realtime' in q else make_quote(**q) for sid, q in frame.items()}
+            for frame in frames
+        ]
+        self.loop = loop
+        self.cursor = 0
+
+    @classmethod
+    def from_file(cls, path, loop=True):
+        """讀取 JSON 陣列或 JSONL (每行一個快照)"""
+        text = Path(path).read_text(encoding='utf-8').strip()
+        if text.startswith('['):
+            frames = json.loads(text)
+        else:
+            frames = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return cls(frames, loop=loop)
+
+    def fetch(self, stock_ids, should_continue=lambda: True):
+        if not self.frames or not should_continue():
+            return
+        if self.cursor >= len(self.frames):
+            if not self.loop:
+                return
+            self.cursor = 0
+        frame = self.frames[self.cursor]
+        self.cursor += 1
+
+        quotes = {sid: frame[sid] for sid in stock_ids if sid in frame}
+        if quotes:
+            yield quotes
+
+
+class FallbackQuoteSource(QuoteSource):
+    """先用主來源批次抓取，缺漏的股票再交給備援來源 (備援延遲建立)"""
+    name = 'fallback'
+
+    def __init__(self, primary, fallback_factory):
+        self.primary = primary
+        self.fallback_factory = fallback_factory
+        self.fallback = None
+
+    def fetch(self, stock_ids, should_continue=lambda: True):
+        stock_ids = list(stock_ids)
+        got = set()
+        for quotes in self.primary.fetch(stock_ids, should_continue):
+            got.update(quotes)
+            yield quotes
+
+        missing = [sid for sid in stock_ids if sid not in got]
+        if not missing or not should_continue():
+            return
+        if self.fallback is None:
+            print(f"🔁 [QuoteSource] {self.primary.name} 缺 {len(missing)} 檔，改用備援來源")
+            self.fallback = self.fallback_factory()
+        yield from self.fallback.fetch(missing, should_continue)
+
+    def close(self):
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
+            self.fallback = None
+
+
+def default_quote_source(**browser_kwargs):
+    """預設：證交所 MIS 批次報價，抓不到的股票改用 CMoney 頁面"""
+    return FallbackQuoteSource(TwseMisSource(), lambda: CMoneyBrowserSource(**browser_kwargs))
@@ -0,0 +1,172 @@
+# ==================================================
+# realtime_bars.py
+# 即時報價的增量 K 棒合併
+# ==================================================
+#  - 一筆報價只會改動「最後一根日 K」與「它所屬的週 / 月 K」，不再複製整段歷史重新 resample
+#  - 均線與 PrevClose / Change / PctChange 只重算最後一列 (前面各列不受最後一根 K 棒影響)
+#  - 週 / 月 K 的索引與 resample 後的整理相同：最後一根標在實際最後交易日，其餘標在週期結束日
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+_PERIOD_FREQ = {'W': 'W-FRI', 'M': 'M'}                   # 與 resample 的 W-FRI / ME 同一組週期邊界
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+ADJ_COLS = {'Open': 'Adj_open', 'High': 'Adj_high', 'Low': 'Adj_low', 'Close': 'Adj_close'}
+
+
+def _first_valid(s: pd.Series):
+    s = s.dropna()
+    return s.iat[0] if len(s) else np.nan
+
+
+def _last_valid(s: pd.Series):
+    s = s.dropna()
+    return s.iat[-1] if len(s) else np.nan
+
+
+# 與 resample().agg() 相同的聚合語意 (first / last 略過缺值)
+_REDUCERS = {
+    'first': _first_valid, 'last': _last_valid,
+    'max': pd.Series.max, 'min': pd.Series.min, 'sum': pd.Series.sum, 'mean': pd.Series.mean,
+}
+
+
+def period_bounds(ts, tf: str):
+    """ts 所屬週 / 月的 (起始日, 結束日)；結束日即 resample 的標籤"""
+    p = pd.Timestamp(ts).to_period(_PERIOD_FREQ[tf])
+    return p.start_time, p.end_time.normalize()
+
+
+def merge_quote(daily: pd.DataFrame, date, bar: Dict[str, float], tol: float = 1e-4):
+    """
+    把一筆即時報價合併進日 K (最後一根同日則更新，較新則新增)
+
+    Args:
+        date: 報價日期 (已去掉時分秒)
+        bar: {'Open', 'High', 'Low', 'Close', 'Volume'}，High / Low 會與既有值取極值
+    Returns:
+        (daily, status)  status: 'append' / 'update'；報價沒有變動或日期較舊時為 None
+    """
+    has_adj = ADJ_COLS['Close'] in daily.columns
+    if daily.empty or date > daily.index[-1].normalize():
+        row = {c: bar.get(c, np.nan) for c in OHLCV_AGG}
+        if has_adj:
+            # 還原價以最新一日為基準，當日還原價 = 原始價
+            row.update({adj: row[c] for c, adj in ADJ_COLS.items()})
+        new = pd.DataFrame([row], index=pd.DatetimeIndex([date]))
+        return pd.concat([daily, new]), 'append'
+
+    last = daily.index[-1]
+    if date < last.normalize():
+        return daily, None
+
+    cur_close, cur_vol = daily.at[last, 'Close'], daily.at[last, 'Volume']
+    cur_high, cur_low = daily.at[last, 'High'], daily.at[last, 'Low']
+    if (abs(cur_close - bar['Close']) <= tol and abs(cur_vol - bar['Volume']) <= tol
+            and bar['High'] <= cur_high and bar['Low'] >= cur_low):
+        return daily, None
+
+    factor = 1.0
+    if has_adj:
+        adj_close = daily.at[last, ADJ_COLS['Close']]
+        if cur_close and pd.notna(adj_close):
+            factor = adj_close / cur_close
+
+    values = {
+        'Open': bar['Open'], 'High': max(cur_high, bar['High']), 'Low': min(cur_low, bar['Low']),
+        'Close': bar['Close'], 'Volume': bar['Volume'],
+    }
+    for c, v in values.items():
+        daily.at[last, c] = v
+        if has_adj and c in ADJ_COLS:
+            daily.at[last, ADJ_COLS[c]] = v * factor
+    return daily, 'update'
+
+
+def _price_view(part: pd.DataFrame, use_adj: bool) -> pd.DataFrame:
+    if use_adj and ADJ_COLS['Close'] in part.columns:
+        part = part.copy()
+        for c, adj in ADJ_COLS.items():
+            part[c] = part[adj]
+    return part
+
+
+def last_bar(daily: pd.DataFrame, tf: str, use_adj: bool = False,
+             extra_agg: Optional[Dict[str, str]] = None) -> pd.Series:
+    """
+    日 K 最後一根所在週期的 K 棒 (D = 最後一列本身；W / M = 只對該週期的幾根日 K 做聚合)
+
+    Args:
+        use_adj: 以 Adj_ 系列取代 OHLC (與各模組的還原開關相同)
+        extra_agg: OHLCV 以外要一併聚合的欄位 {欄位: 聚合方式}
+    """
+    date = daily.index[-1]
+    if tf == 'D':
+        part = daily.iloc[-1:]
+    else:
+        start, _ = period_bounds(date, tf)
+        part = daily.loc[start:date]
+    part = _price_view(part, use_adj)
+
+    if tf == 'D':
+        return part.iloc[-1]
+    logic = {c: how for c, how in {**OHLCV_AGG, **(extra_agg or {})}.items() if c in part.columns}
+    return pd.Series({c: _REDUCERS[how](part[c]) for c, how in logic.items()}, name=date)
+
+
+def merge_last_bar(df: pd.DataFrame, date, bar: pd.Series, tf: str):
+    """
+    把 last_bar() 的結果寫回顯示用的 K 線 (原地更新最後一列，換日 / 換週期才新增一列)
+
+    Returns:
+        (df, appended)
+    """
+    date = pd.Timestamp(date)
+    if df.empty:
+        return pd.DataFrame([bar], index=pd.DatetimeIndex([date])), True
+
+    last = df.index[-1]
+    if tf == 'D':
+        same = date.normalize() == last.normalize()
+    else:
+        start, end = period_bounds(date, tf)
+        same = start <= last <= end
+
+    if not same:
+        if tf != 'D':
+            # 舊的最後一根已收完，改回週期結束日標籤 (與整段 resample 的結果一致)
+            df.index = df.index[:-1].append(pd.DatetimeIndex([period_bounds(last, tf)[1]]))
+        new = pd.DataFrame([bar], index=pd.DatetimeIndex([date]))
+        return pd.concat([df, new]), True
+
+    for c, v in bar.items():
+        if c in df.columns:
+            df.at[last, c] = v
+    if last != date:
+        df.index = df.index[:-1].append(pd.DatetimeIndex([date]))
+    return df, False
+
+
+def refresh_last_row(df: pd.DataFrame, ma_windows: Iterable[int] = ()):
+    """只重算最後一列的 PrevClose / Change / PctChange 與各條均線"""
+    n = len(df)
+    if n == 0:
+        return df
+    last = df.index[-1]
+    close = df['Close'].to_numpy(dtype='float64', na_value=np.nan)
+
+    prev = close[-2] if n > 1 else float(df['Open'].iat[-1])
+    change = close[-1] - prev
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.float64(change) / np.float64(prev) * 100
+    df.at[last, 'PrevClose'] = prev
+    df.at[last, 'Change'] = change
+    df.at[last, 'PctChange'] = pct
+
+    for ma in ma_windows:
+        window = close[-ma:]
+        # 與 rolling(ma).mean() 相同：不足 ma 根或區間內有缺值時為 NaN
+        df.at[last, f'MA{ma}'] = window.mean() if n >= ma else np.nan
+    return df
@@ -6,10 +6,11 @@ from utils.scoring.trend_factors import TrendScorer
 class L3Scorer:
     @staticmethod
     def calculate_score(rs_score: float, fundamental_data: dict, kline_df: pd.DataFrame, tags: str,
-                        boll_width: float) -> dict:
+                        boll_width: float, vwap_res: dict = None) -> dict:
         """
         計算 L3 個股綜合評分與黑馬標籤
         滿分 100 分 = RS(30) + 基本面(25) + 籌碼與成本(30) + 技術型態(15)
+        vwap_res: 可直接傳入 InstitutionalVWAPBook.lookup(sid) 的結果，省去單檔重算
         """
         # 1. 基礎動能 RS (30分)
         s_rs = round(min(30.0, (rs_score / 100) * 30), 1)
@@ -31,7 +32,8 @@ class L3Scorer:
 
         # 3. 籌碼與成本優勢 (30分)
         inst_data = fundamental_data.get('institutional_investors', [])
-        vwap_res = TrendScorer.calc_institutional_vwap(inst_data, kline_df)
+        if vwap_res is None:
+            vwap_res = TrendScorer.calc_institutional_vwap(inst_data, kline_df)
 
         s_chip = 0
         if vwap_res['status'] == "✅ 安全建倉區":
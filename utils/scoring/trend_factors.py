@@ -78,97 +78,167 @@ class TrendScorer:
 
         return {"trend_5d": float(trend_5d)}
 
+    @staticmethod
+    def _inst_net_buy_series(inst_data: list):
+        """將法人 JSON 清單轉為 (日期 -> 外資+投信淨買超) 序列，失敗時回傳 (None, 狀態說明)"""
+        inst_df = pd.DataFrame(inst_data)
+        if inst_df.empty:
+            return None, "無法人資料"
+
+        # 對齊 JSON 的時間 (強制 .dt.normalize() 抹除時分秒)
+        time_col = TrendScorer._get_time_col(inst_df)
+        if not time_col:
+            return None, "無法人時間欄位"
+        dates = pd.to_datetime(inst_df[time_col], errors='coerce').dt.normalize()
+
+        # 動態尋找外資與投信的買賣超欄位
+        inst_cols = [c for c in inst_df.columns
+                     if ('foreign' in c.lower() or 'trust' in c.lower()) and
+                     ('buy_sell' in c.lower() or 'diff' in c.lower() or 'change' in c.lower())]
+        if not inst_cols:
+            return None, "找不到法人買賣超欄位"
+
+        net_buy = inst_df[inst_cols].apply(pd.to_numeric, errors='coerce').fillna(0).sum(axis=1)
+        net_buy.index = dates
+        net_buy = net_buy[net_buy.index.notna()]
+        return net_buy.groupby(level=0).last(), ""
+
+    @staticmethod
+    def _kline_close_series(kline_df: pd.DataFrame):
+        """將 K 線轉為 (日期 -> 收盤價) 序列，失敗時回傳 (None, 狀態說明)"""
+        if kline_df is None or kline_df.empty or 'close' not in kline_df.columns:
+            return None, "價量資料無法對齊"
+
+        time_col = TrendScorer._get_time_col(kline_df)
+        if time_col:
+            raw_dates = kline_df[time_col]
+            if pd.api.types.is_numeric_dtype(raw_dates) and raw_dates.max() > 10000000000:
+                dates = pd.to_datetime(raw_dates, unit='ms')
+            else:
+                dates = pd.to_datetime(raw_dates, errors='coerce')
+            dates = pd.DatetimeIndex(dates)
+        elif isinstance(kline_df.index, pd.DatetimeIndex):
+            dates = kline_df.index
+        else:
+            return None, "無K線時間欄位"
+
+        close = pd.Series(pd.to_numeric(kline_df['close'], errors='coerce').to_numpy(),
+                          index=dates.normalize())
+        close = close[close.index.notna()]
+        return close.groupby(level=0).last(), ""
+
     @staticmethod
     def calc_institutional_vwap(inst_data: list, kline_df: pd.DataFrame) -> dict:
         """
         計算近 20 日法人建倉成本線 (VWAP) 與當前乖離率
+        (單檔版本，內部直接套用 InstitutionalVWAPBook 的矩陣運算)
         """
-        inst_df = pd.DataFrame(inst_data)
-        if inst_df.empty:
+        net_buy, err = TrendScorer._inst_net_buy_series(inst_data)
+        if net_buy is None:
+            return {"vwap": 0.0, "bias_pct": 0.0, "status": err}
+
+        close, err = TrendScorer._kline_close_series(kline_df)
+        if close is None:
+            return {"vwap": 0.0, "bias_pct": 0.0, "status": err}
+
+        book = InstitutionalVWAPBook.from_series({'_': net_buy}, {'_': close})
+        return book.lookup('_')
+
+
+class InstitutionalVWAPBook:
+    """
+    全市場法人建倉成本線 (VWAP) 運算
+    以對齊後的 (日期 × 股票) 淨買超矩陣與收盤價矩陣，一次算出所有股票的
+    近 N 日買盤加權成本、乖離率與燈號，再由 lookup(sid) 提供單檔查詢
+    """
+
+    STATUS_NO_ALIGN = "價量資料無法對齊"
+    STATUS_NO_BUY = "📉 20日零買盤(無支撐)"
+    STATUS_NET_SELL = "⚠️ 總體淨賣超 (均價轉壓力)"
+    STATUS_OVERHEAT = "⚠️ 乖離過熱 (結帳風險)"
+    STATUS_BELOW_COST = "🚨 跌破成本 (停損警示)"
+    STATUS_SAFE = "✅ 安全建倉區"
+
+    def __init__(self, net_buy: pd.DataFrame, close: pd.DataFrame, window: int = 20):
+        net_buy, close = net_buy.align(close, join='outer')
+        self.window = window
+        self.table = self._compute(net_buy.sort_index(), close.sort_index(), window)
+
+    @classmethod
+    def from_series(cls, net_buy_map: dict, close_map: dict, window: int = 20):
+        """由 {sid: 淨買超序列} 與 {sid: 收盤價序列} 組成對齊矩陣"""
+        sids = [sid for sid in net_buy_map if sid in close_map]
+        net_buy = pd.DataFrame({sid: net_buy_map[sid] for sid in sids})
+        close = pd.DataFrame({sid: close_map[sid] for sid in sids})
+        return cls(net_buy, close, window)
+
+    @classmethod
+    def from_records(cls, inst_map: dict, kline_map: dict, window: int = 20):
+        """由 {sid: 法人 JSON 清單} 與 {sid: K 線 DataFrame} 建立，無法解析的股票直接略過"""
+        net_buy_map, close_map = {}, {}
+        for sid, inst_data in inst_map.items():
+            if sid not in kline_map:
+                continue
+            net_buy, _ = TrendScorer._inst_net_buy_series(inst_data)
+            close, _ = TrendScorer._kline_close_series(kline_map[sid])
+            if net_buy is not None and close is not None:
+                net_buy_map[sid] = net_buy
+                close_map[sid] = close
+        return cls.from_series(net_buy_map, close_map, window)
+
+    @classmethod
+    def _compute(cls, net_buy: pd.DataFrame, close: pd.DataFrame, window: int) -> pd.DataFrame:
+        nb = net_buy.to_numpy(dtype=float)
+        px = close.to_numpy(dtype=float)
+        n_rows, n_cols = px.shape
+
+        # 1. 只有價量同時存在的日子才算對齊，並保留每檔最後 window 筆
+        valid = ~np.isnan(nb) & ~np.isnan(px)
+        rank_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+        in_window = valid & (rank_from_end <= window)
+        is_buy = in_window & (nb > 0)
+
+        # 2. 遮罩加總：總淨買超、買盤張數與買盤金額
+        total_net = np.where(in_window, nb, 0.0).sum(axis=0)
+        buy_vol = np.where(is_buy, nb, 0.0).sum(axis=0)
+        buy_amt = np.where(is_buy, nb * px, 0.0).sum(axis=0)
+
+        # 3. 每檔最後一筆對齊日的收盤價
+        has_data = valid.any(axis=0)
+        last_row = n_rows - 1 - np.argmax(valid[::-1], axis=0) if n_rows else np.zeros(n_cols, dtype=int)
+        latest_close = np.full(n_cols, np.nan)
+        if n_rows:
+            latest_close[has_data] = px[last_row[has_data], np.arange(n_cols)[has_data]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(buy_vol > 0, buy_amt / buy_vol, 0.0)
+            bias_pct = np.where(buy_vol > 0, (latest_close - vwap) / vwap * 100, 0.0)
+
+        has_buy = buy_vol > 0
+        status = np.select(
+            [~has_data, ~has_buy, total_net < 0, bias_pct > 15, bias_pct < 0],
+            [cls.STATUS_NO_ALIGN, cls.STATUS_NO_BUY, cls.STATUS_NET_SELL, cls.STATUS_OVERHEAT,
+             cls.STATUS_BELOW_COST],
+            default=cls.STATUS_SAFE
+        )
+
+        return pd.DataFrame({
+            'vwap': vwap, 'bias_pct': bias_pct, 'status': status,
+            'latest_close': latest_close, 'total_net': total_net, 'has_data': has_data
+        }, index=close.columns)
+
+    def lookup(self, sid) -> dict:
+        """回傳與 TrendScorer.calc_institutional_vwap 相同格式的單檔結果"""
+        if sid not in self.table.index:
             return {"vwap": 0.0, "bias_pct": 0.0, "status": "無法人資料"}
 
-        # 1. 對齊 JSON 的時間 (強制 .dt.normalize() 抹除時分秒)
-        time_col_inst = TrendScorer._get_time_col(inst_df)
-        if not time_col_inst:
-            return {"vwap": 0.0, "bias_pct": 0.0, "status": "無法人時間欄位"}
-        inst_df['date'] = pd.to_datetime(inst_df[time_col_inst], errors='coerce').dt.normalize()
-
-        # 2. 動態尋找外資與投信的買賣超欄位
-        net_buy_series = pd.Series(0.0, index=inst_df.index)
-        found_inst_cols = False
-        for col in inst_df.columns:
-            col_lower = col.lower()
-            if ('foreign' in col_lower or 'trust' in col_lower) and (
-                    'buy_sell' in col_lower or 'diff' in col_lower or 'change' in col_lower):
-                net_buy_series += pd.to_numeric(inst_df[col], errors='coerce').fillna(0)
-                found_inst_cols = True
-
-        if not found_inst_cols:
-            return {"vwap": 0.0, "bias_pct": 0.0, "status": "找不到法人買賣超欄位"}
-
-        inst_df['net_buy'] = net_buy_series
-
-        # 3. 對齊 K 線的時間
-        kline_df = kline_df.copy()
-        time_col_k = TrendScorer._get_time_col(kline_df)
-        if not time_col_k:
-            if 'Date' in kline_df.columns:
-                time_col_k = 'Date'
-            else:
-                return {"vwap": 0.0, "bias_pct": 0.0, "status": "無K線時間欄位"}
-
-        if pd.api.types.is_numeric_dtype(kline_df[time_col_k]) and kline_df[time_col_k].max() > 10000000000:
-            kline_df['date'] = pd.to_datetime(kline_df[time_col_k], unit='ms').dt.normalize()
-        else:
-            kline_df['date'] = pd.to_datetime(kline_df[time_col_k], errors='coerce').dt.normalize()
-
-        # 4. 合併資料並取近 20 日
-        merged = pd.merge(kline_df, inst_df, on='date', how='inner')
-        if merged.empty:
-            return {"vwap": 0.0, "bias_pct": 0.0, "status": "價量資料無法對齊"}
-
-        merged = merged.sort_values('date').tail(20)
-
-        # 🔥 提前抓取最新收盤價
-        latest_close = merged['close'].iloc[-1]
-
-        # 🕵️ 加入印出機制，讓數據自己說話
-        print("\n🕵️ [內部除錯] 實際對齊的 K 線與法人買賣超資料 (近 20 日)：")
-        print(merged[['date', 'close', 'net_buy']].to_string(index=False))
-        print(f"👉 20日總淨買超加總: {merged['net_buy'].sum()} 張\n")
-
-        # 5. 計算 VWAP (只取有買的那些天來算加權成本)
-        buy_days = merged[merged['net_buy'] > 0]
-        latest_close = merged['close'].iloc[-1]
-
-        # 如果這 20 天連一天都沒買，才回傳 0
-        if buy_days.empty:
-            return {
-                "vwap": 0.0,
-                "bias_pct": 0.0,
-                "status": "📉 20日零買盤(無支撐)",
-                "latest_close": round(latest_close, 2)
-            }
-
-        # 算出這 20 天內「有買進的日子」的加權平均成本
-        vwap = (buy_days['net_buy'] * buy_days['close']).sum() / buy_days['net_buy'].sum()
-        bias_pct = ((latest_close - vwap) / vwap) * 100
-
-        # 再依據 20 日「總淨買賣超」來決定最終燈號狀態
-        total_net = merged['net_buy'].sum()
-
-        if total_net < 0:
-            status = "⚠️ 總體淨賣超 (均價轉壓力)"
-        elif bias_pct > 15:
-            status = "⚠️ 乖離過熱 (結帳風險)"
-        elif bias_pct < 0:
-            status = "🚨 跌破成本 (停損警示)"
-        else:
-            status = "✅ 安全建倉區"
+        row = self.table.loc[sid]
+        if not row['has_data']:
+            return {"vwap": 0.0, "bias_pct": 0.0, "status": self.STATUS_NO_ALIGN}
 
         return {
-            "vwap": round(vwap, 2),
-            "bias_pct": round(bias_pct, 2),
-            "status": status,
-            "latest_close": round(latest_close, 2)
-        }
\ No newline at end of file
+            "vwap": round(float(row['vwap']), 2),
+            "bias_pct": round(float(row['bias_pct']), 2),
+            "status": row['status'],
+            "latest_close": round(float(row['latest_close']), 2)
+        }
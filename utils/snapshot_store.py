@@ -0,0 +1,80 @@
+# ==================================================
+# snapshot_store.py
+# factor_snapshot.parquet 的共用載入層
+# ==================================================
+#  - 讀入一次 Arrow Table (解碼後常駐記憶體)，程序內所有模組共用
+#  - 不使用 memory map：calc_snapshot_factors 會在 App 執行中原地覆寫快照檔，
+#    Windows 上被其他程序 map 住的檔案無法截斷 / 覆寫
+#  - 各模組以 load_frame(columns=[...]) 取得自己需要的欄位：Arrow 端的欄位投影不複製，
+#    只有轉成 pandas 時才複製所選欄位，回傳的 DataFrame 可直接修改 (.loc 寫入)
+#  - 以檔案 (mtime, size) 判斷是否需要重讀；快照重算後下一次呼叫自動換新
+
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SNAPSHOT_PATH = BASE_DIR / "data" / "strategy_results" / "factor_snapshot.parquet"
+
+_TABLES = {}    # path -> ((mtime, size), pa.Table)
+_LOCK = threading.Lock()
+
+
+def signature(path: Path = SNAPSHOT_PATH):
+    """檔案簽章 (mtime, size)；檔案不存在回傳 None"""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def load_table(path: Path = SNAPSHOT_PATH):
+    """
+    取得共用的 Arrow Table (檔案有變動才重讀)
+
+    Returns:
+        pa.Table；檔案不存在時回傳 None
+    """
+    path = Path(path)
+    sig = signature(path)
+    if sig is None:
+        return None
+
+    with _LOCK:
+        cached = _TABLES.get(path)
+        if cached and cached[0] == sig:
+            return cached[1]
+
+        table = pq.read_table(path, memory_map=False)
+        _TABLES[path] = (sig, table)
+        return table
+
+
+def load_frame(cols: Optional[Iterable[str]] = None, path: Path = SNAPSHOT_PATH) -> pd.DataFrame:
+    """
+    以 DataFrame 取得快照的欄位投影
+
+    Args:
+        cols: 需要的欄位 (不存在的欄位自動略過)；None = 全部欄位
+
+    Returns:
+        呼叫端自己的可寫 DataFrame (不與共用的 Arrow Table 共用記憶體)
+    """
+    table = load_table(path)
+    if table is None:
+        return pd.DataFrame()
+    if cols is not None:
+        wanted = set(cols)
+        table = table.select([c for c in table.column_names if c in wanted])
+    # 依 dtype 合併成少數 block (會複製)；split_blocks 雖可零複製引用 Arrow 記憶體，但陣列為唯讀，.loc 寫入會失敗
+    return table.to_pandas()
+
+
+def invalidate(path: Path = SNAPSHOT_PATH):
+    """捨棄快取 (例如寫入新快照後需要立即釋放舊表)"""
+    with _LOCK:
+        _TABLES.pop(Path(path), None)
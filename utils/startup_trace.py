@@ -0,0 +1,96 @@
+# ==================================================
+# startup_trace.py
+# 啟動時間剖析：python main_app.py --trace-startup (或環境變數 SWR_TRACE_STARTUP=1)
+# ==================================================
+#  - 記錄每個頂層 import 的累計耗時 (含其子模組)
+#  - 記錄 section() 包住的初始化區段
+#  - 首次繪製後呼叫 report() 印出排序後的明細
+
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()
+_enabled = False
+_imports = {}       # 模組名稱 -> 秒
+_sections = []      # (名稱, 開始, 秒)
+_depth = 0
+_orig_import = builtins.__import__
+_reported = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    # 已載入的模組或相對 import 不計時，避免雜訊
+    if _depth > 0 or level != 0 or name in sys.modules:
+        _depth += 1
+        try:
+            return _orig_import(name, globals, locals, fromlist, level)
+        finally:
+            _depth -= 1
+
+    _depth += 1
+    t = time.perf_counter()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        _imports[name] = _imports.get(name, 0.0) + time.perf_counter() - t
+
+
+def enable():
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    builtins.__import__ = _timed_import
+
+
+def enable_from_argv(argv=None):
+    """偵測 --trace-startup 參數或 SWR_TRACE_STARTUP 環境變數"""
+    argv = sys.argv if argv is None else argv
+    if '--trace-startup' in argv:
+        argv.remove('--trace-startup')
+        enable()
+    elif os.environ.get('SWR_TRACE_STARTUP', '') not in ('', '0'):
+        enable()
+    return _enabled
+
+
+@contextmanager
+def section(name):
+    """量測一段初始化程式碼 (未啟用時幾乎零成本)"""
+    if not _enabled:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _sections.append((name, t - _T0, time.perf_counter() - t))
+
+
+def report(title="首次繪製", top=15):
+    """印出啟動耗時明細並還原 import hook (只印一次)"""
+    global _reported
+    if not _enabled or _reported:
+        return
+    _reported = True
+    builtins.__import__ = _orig_import
+
+    total = time.perf_counter() - _T0
+    print(f"\n⏱️ [StartupTrace] {title}: {total * 1000:.0f} ms")
+
+    print("── import (累計，含子模組) ──")
+    for name, sec in sorted(_imports.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {sec * 1000:8.1f} ms  {name}")
+
+    print("── 初始化區段 ──")
+    for name, start, sec in _sections:
+        print(f"  {sec * 1000:8.1f} ms  {name}  (@{start * 1000:.0f} ms)")
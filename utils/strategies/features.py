@@ -0,0 +1,51 @@
+import pandas as pd
+from utils.indicators import Indicators
+
+
+class StrategyFeatures:
+    """
+    單檔股票的共用特徵層 (Feature Layer)
+    原則：
+    1. 各策略需要的滾動運算 (均線、量均、滾動高低點、WVF...) 只在第一次取用時計算
+    2. 同一檔股票的其他策略直接重用快取，不重算
+    3. 回傳的 Series 為共用物件，策略端只讀不改
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache = {}
+
+    def _get(self, key, func):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def shifted(self, col: str = 'Close', periods: int = 1) -> pd.Series:
+        """前 N 根的值 (periods=0 直接回傳原欄位)"""
+        if periods == 0:
+            return self.df[col]
+        return self._get(('shift', col, periods), lambda: self.df[col].shift(periods))
+
+    def ma(self, window: int, col: str = 'Close') -> pd.Series:
+        """簡單移動平均"""
+        return self._get(('mean', col, window), lambda: self.df[col].rolling(window=window).mean())
+
+    def rolling_max(self, window: int, col: str = 'Close', shift: int = 0) -> pd.Series:
+        """滾動最高 (shift=1 代表不含當日)"""
+        return self._get(('max', col, window, shift),
+                         lambda: self.shifted(col, shift).rolling(window=window).max())
+
+    def rolling_min(self, window: int, col: str = 'Close', shift: int = 0) -> pd.Series:
+        """滾動最低 (shift=1 代表不含當日)"""
+        return self._get(('min', col, window, shift),
+                         lambda: self.shifted(col, shift).rolling(window=window).min())
+
+    def wvf(self, period: int = 22) -> pd.Series:
+        """CM Williams Vix Fix，與 Indicators.cm_williams_vix_fix 結果一致，但共用滾動最高收盤"""
+        def calc():
+            if len(self.df) < period:
+                return Indicators.cm_williams_vix_fix(self.df, period)
+            highest_close = self.rolling_max(period)
+            return (((highest_close - self.df['Low']) / highest_close) * 100).fillna(0)
+
+        return self._get(('wvf', period), calc)
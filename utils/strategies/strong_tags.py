@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# 強勢特徵標籤的位元表 (順序 = 顯示順序 = bit 位置)；新增標籤只能往後加，避免舊快照的位元錯位
+# ST轉多 / 30W黏貼後突破 / 30W甩轎 的顯示文字會附上週數 (例如 "ST轉多(2週前)")，位元只記基底名稱；
+# "連N月創高" 與 "營收連創新高" 同條件，僅作顯示不另佔位元
+STRONG_TAGS = (
+    'ST轉多', '突破30週', '創季高', '創月高', '強勢多頭', '波段黑馬', '超強勢',
+    '極度壓縮', '波動壓縮', '盤整5日', '盤整10日', '盤整20日', '盤整60日',
+    '主力掃單(ILSS)', '投信認養', '散戶退場', '土洋對作(投勝)', '土洋對作(外勝)', '波段吸籌發動',
+    '30W黏貼後突破', '30W甩轎', '假跌破', '回測季線', '回測年線', 'Vix反轉', '30W臨門一腳',
+    '營收創兩年高', '營收創年高', '營收連創新高', '三率三升(季增)', '三率三升(年增)',
+)
+TAG_BIT = {tag: np.uint64(1) << np.uint64(i) for i, tag in enumerate(STRONG_TAGS)}
+BITS_COLUMN = '強勢特徵_bits'
+
+
+def bits_for(text: str, case: bool = True) -> np.uint64:
+    """所有「名稱包含 text」的標籤位元聯集 (等同在顯示字串上做子字串比對)"""
+    if not case:
+        text = text.lower()
+    out = np.uint64(0)
+    for tag, bit in TAG_BIT.items():
+        if text in (tag if case else tag.lower()):
+            out |= bit
+    return out
+
+
+def tag_mask(bits: np.ndarray, tags, mode: str = 'and') -> np.ndarray:
+    """
+    以位元運算篩選標籤
+
+    Args:
+        bits: uint64 陣列 (快照的 強勢特徵_bits 欄)
+        tags: 標籤名稱清單 (可為基底名稱的子字串，例如 "三率三升")
+        mode: 'and' = 全部符合；'or' = 任一符合
+    """
+    bits = np.asarray(bits, dtype=np.uint64)
+    masks = [(bits & bits_for(t)) != 0 for t in tags]
+    if not masks:
+        return np.ones(len(bits), dtype=bool)
+    return np.logical_and.reduce(masks) if mode == 'and' else np.logical_or.reduce(masks)
+
+
+def _num(df: pd.DataFrame, col: str, default: float) -> np.ndarray:
+    # 與 row.get(col, default) 相同：欄位不存在才用預設值，存在但為 NaN 時比較結果一律為 False
+    if col not in df.columns:
+        return np.full(len(df), default, dtype='float64')
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _week_suffix(offset: np.ndarray) -> np.ndarray:
+    """週數後綴："(本週)" / "(N週前)" / "" """
+    out = np.full(len(offset), '', dtype=object)
+    out[offset == 0] = '(本週)'
+    ago = np.flatnonzero(offset > 0)
+    out[ago] = [f"({int(v)}週前)" for v in offset[ago]]
+    return out
+
+
+def compute_strong_tags(df: pd.DataFrame):
+    """
+    向量化計算強勢特徵
+
+    Returns:
+        (labels, bits)
+        labels: 逗號串接的顯示字串 (與舊版逐列 get_strong_tags 相同)
+        bits:   uint64 位元遮罩，位元定義見 STRONG_TAGS
+    """
+    n = len(df)
+    g = lambda col, default=0: _num(df, col, default)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        st_week = g('str_st_week_offset', -1)
+        bb_width = g('bb_width', 100)
+        m_net, m_5d = g('m_net_today'), g('m_sum_5d')
+        t_net, vol = g('t_net_today'), g('今日成交股數')
+        t_10d, f_10d = g('t_sum_10d'), g('f_sum_10d')
+        t_20d, f_20d = g('t_sum_20d'), g('f_sum_20d')
+        pct_5d = g('漲幅5d')
+        rev_consec = g('rev_consecutive_highs')
+        rev_highest = g('rev_highest_months')
+
+        # === 投信認養 (近5日買3日版，嚴格濾網) ===
+        iss_shares, it_pct = g('issued_shares'), g('invest_trust_hold_pct')
+        t_ratio = np.where(vol > 0, t_net * 1000 / np.where(vol > 0, vol, 1) * 100, 0)
+        adopt = ((0 < iss_shares) & (iss_shares < 500000) & (1.0 <= it_pct) & (it_pct <= 8.0)
+                 & (g('t_buy_days_5') >= 3) & (t_net > 0) & (vol > 0) & (t_ratio > 10.0))
+
+        # === 土洋對作：10日或20日投信 (外資) 吃掉對方賣壓 30% 以上 + 5日價格點火 ===
+        t_win = (((t_10d > 0) & (f_10d < 0) & (t_10d >= np.abs(f_10d) * 0.3))
+                 | ((t_20d > 0) & (f_20d < 0) & (t_20d >= np.abs(f_20d) * 0.3)))
+        f_win = (((f_10d > 0) & (t_10d < 0) & (f_10d >= np.abs(t_10d) * 0.3))
+                 | ((f_20d > 0) & (t_20d < 0) & (f_20d >= np.abs(t_20d) * 0.3)))
+
+        flags = {
+            'ST轉多': (st_week >= 0) & (st_week <= 4),
+            '突破30週': g('str_break_30w') == 1,
+            '創季高': g('str_high_60') == 1,
+            '創月高': g('str_high_30') == 1,
+            '強勢多頭': g('str_uptrend') == 1,
+            '波段黑馬': g('漲幅60d') > 30,
+            '超強勢': g('RS強度') > 90,
+            '極度壓縮': bb_width < 5.0,
+            '波動壓縮': (bb_width >= 5.0) & (bb_width < 8.0),
+            '盤整5日': g('str_consol_5') == 1,
+            '盤整10日': g('str_consol_10') == 1,
+            '盤整20日': g('str_consol_20') == 1,
+            '盤整60日': g('str_consol_60') == 1,
+            '主力掃單(ILSS)': (g('str_ilss_sweep') == 1) & (g('rev_cum_yoy') > 0) & ((m_net < 0) | (m_5d < 0)),
+            '投信認養': adopt,
+            '散戶退場': m_net <= -200,
+            '土洋對作(投勝)': t_win & (pct_5d > 0),
+            '土洋對作(外勝)': f_win & (pct_5d > 0),
+            '波段吸籌發動': (g('legal_diff_20d') > 1.5) & (t_net > 0),
+            '30W黏貼後突破': g('str_30w_adh') == 1,
+            '30W甩轎': g('str_30w_shk') == 1,
+            '假跌破': g('str_fake_breakdown') == 1,
+            '回測季線': g('str_ma55_sup') == 1,
+            '回測年線': g('str_ma200_sup') == 1,
+            'Vix反轉': g('str_vix_rev') == 1,
+            '30W臨門一腳': g('str_30w_standby') == 1,
+            '營收創兩年高': rev_highest >= 23,
+            '營收創年高': rev_highest >= 11,
+            '營收連創新高': rev_consec >= 1,
+            '三率三升(季增)': g('fund_three_up_qoq') == 1.0,
+            '三率三升(年增)': g('fund_three_up_yoy') == 1.0,
+        }
+
+    bits = np.zeros(n, dtype=np.uint64)
+    for tag, hit in flags.items():
+        bits[hit] |= TAG_BIT[tag]
+
+    # 顯示字串：依 STRONG_TAGS 順序組合，帶週數的標籤補上後綴
+    st_text = np.where(st_week == 0, 'ST轉多(本週)', '')
+    ago = np.flatnonzero(flags['ST轉多'] & (st_week > 0))
+    st_text = st_text.astype(object)
+    st_text[ago] = [f'ST轉多({int(v)}週前)' for v in st_week[ago]]
+    suffix_30w = _week_suffix(g('str_30w_week_offset', -1))
+    streak_text = np.full(n, '', dtype=object)
+    hit = np.flatnonzero(flags['營收連創新高'])
+    streak_text[hit] = [f'營收連創新高,連{int(v)}月創高' for v in rev_consec[hit]]
+
+    parts = []
+    for tag in STRONG_TAGS:
+        hit = flags[tag]
+        if tag == 'ST轉多':
+            parts.append(st_text)
+        elif tag in ('30W黏貼後突破', '30W甩轎'):
+            parts.append(np.where(hit, tag + suffix_30w, ''))
+        elif tag == '營收連創新高':
+            parts.append(streak_text)
+        else:
+            parts.append(np.where(hit, tag, ''))
+
+    labels = pd.Series([','.join(p for p in row if p) for row in zip(*parts)], index=df.index, dtype=object)
+    return labels, pd.Series(bits, index=df.index, name=BITS_COLUMN)
+
@@ -3,6 +3,7 @@ import numpy as np
 import json
 from pathlib import Path
 from utils.indicators import Indicators
+from utils.strategies.features import StrategyFeatures
 
 
 class TechnicalStrategies:
@@ -219,58 +220,69 @@ class TechnicalStrategies:
         return results
     # ==============================================================================
     # 💎 以下完整保留您原本所有的選股 Fuction，不做任何刪減
+    #    (可選參數 feats: 同一檔股票跑多個策略時共用 StrategyFeatures，均線等只算一次)
     # ==============================================================================
 
     @staticmethod
-    def break_30w_ma(df: pd.DataFrame) -> pd.Series:
+    def break_30w_ma(df: pd.DataFrame, feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < 150: return pd.Series(False, index=df.index)
-        ma_30w = df['Close'].rolling(window=150).mean()
-        vol_ma_5 = df['Volume'].rolling(window=5).mean()
-        return (df['Close'] > ma_30w) & (df['Close'].shift(1) <= ma_30w.shift(1)) & (
+        f = feats or StrategyFeatures(df)
+        ma_30w = f.ma(150)
+        vol_ma_5 = f.ma(5, 'Volume')
+        return (df['Close'] > ma_30w) & (f.shifted('Close') <= ma_30w.shift(1)) & (
                     df['Volume'] > vol_ma_5.shift(1) * 2.0)
 
     @staticmethod
-    def above_ma(df: pd.DataFrame, window: int = 55) -> pd.Series:
+    def above_ma(df: pd.DataFrame, window: int = 55, feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < window: return pd.Series(False, index=df.index)
-        return df['Close'] > df['Close'].rolling(window=window).mean()
+        f = feats or StrategyFeatures(df)
+        return df['Close'] > f.ma(window)
 
     @staticmethod
-    def vix_green(df: pd.DataFrame, length: int = 22) -> pd.Series:
+    def vix_green(df: pd.DataFrame, length: int = 22, feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < length: return pd.Series(False, index=df.index)
-        p_max = df['Close'].rolling(window=length).max()
+        f = feats or StrategyFeatures(df)
+        p_max = f.rolling_max(length)
         wvf = ((p_max - df['Low']) / p_max) * 100
         return wvf >= (wvf.rolling(window=length).max() * 0.90) & (wvf > 2.0)
 
     @staticmethod
-    def consolidation(df: pd.DataFrame, period_days: int = 20, threshold: float = 0.15) -> pd.Series:
+    def consolidation(df: pd.DataFrame, period_days: int = 20, threshold: float = 0.15,
+                      feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < 60: return pd.Series(False, index=df.index)
-        r_max = df['Close'].rolling(window=period_days).max()
-        r_min = df['Close'].rolling(window=period_days).min()
+        f = feats or StrategyFeatures(df)
+        r_max = f.rolling_max(period_days)
+        r_min = f.rolling_min(period_days)
         amp = (r_max - r_min) / r_min
-        vol_20 = df['Volume'].rolling(window=20).mean()
-        ma_60 = df['Close'].rolling(window=60).mean()
+        vol_20 = f.ma(20, 'Volume')
+        ma_60 = f.ma(60)
         return (amp < threshold) & (df['Volume'] < vol_20 * 0.75) & (df['Close'] > ma_60)
 
     @staticmethod
-    def strong_uptrend(df: pd.DataFrame) -> pd.Series:
+    def strong_uptrend(df: pd.DataFrame, feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < 60: return pd.Series(False, index=df.index)
-        m5, m10, m20, m60 = [df['Close'].rolling(w).mean() for w in [5, 10, 20, 60]]
+        f = feats or StrategyFeatures(df)
+        m5, m10, m20, m60 = [f.ma(w) for w in [5, 10, 20, 60]]
         return (m5 > m10) & (m10 > m20) & (m20 > m60) & (m60 > m60.shift(1)) & (df['Close'] > df['Open'])
 
     @staticmethod
-    def near_ma_support(df: pd.DataFrame, window: int = 60, dist_pct: float = 0.02) -> pd.Series:
+    def near_ma_support(df: pd.DataFrame, window: int = 60, dist_pct: float = 0.02,
+                        feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < window + 1: return pd.Series(False, index=df.index)
-        ma = df['Close'].rolling(window=window).mean()
+        f = feats or StrategyFeatures(df)
+        ma = f.ma(window)
         return (df['Close'] > ma) & ((df['Close'] - ma) / ma < dist_pct) & (ma > ma.shift(1))
 
     @staticmethod
-    def breakout_n_days_high(df: pd.DataFrame, days: int = 30) -> pd.Series:
+    def breakout_n_days_high(df: pd.DataFrame, days: int = 30, feats: StrategyFeatures = None) -> pd.Series:
         if len(df) < days + 1: return pd.Series(False, index=df.index)
-        return df['Close'] > df['High'].shift(1).rolling(window=days).max()
+        f = feats or StrategyFeatures(df)
+        return df['Close'] > f.rolling_max(days, 'High', shift=1)
 
     @staticmethod
-    def vix_reversal(df: pd.DataFrame, period: int = 22) -> pd.Series:
-        wvf = Indicators.cm_williams_vix_fix(df, period)
+    def vix_reversal(df: pd.DataFrame, period: int = 22, feats: StrategyFeatures = None) -> pd.Series:
+        f = feats or StrategyFeatures(df)
+        wvf = f.wvf(period)
         upper = wvf.rolling(20).mean() + (2.0 * wvf.rolling(20).std())
         r_high = wvf.rolling(50).max() * 0.85
         is_green = (wvf >= upper) | (wvf >= r_high)
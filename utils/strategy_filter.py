@@ -0,0 +1,165 @@
+# ==================================================
+# strategy_filter.py
+# 選股策略面板的預編譯過濾引擎
+# ==================================================
+#  - 載入快照時一次建好：搜尋用小寫字串、產業陣列、概念/細產業倒排索引、數值欄 float 陣列、標籤位元 (或布林矩陣)
+#  - 每次調整條件只做 NumPy 遮罩運算，最後才依結果列號取出一次顯示用的 DataFrame
+#  - 比對語意與舊版 str.contains 相同 (子字串比對)，只是改成先在「詞彙表」上比對再查索引
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.strategies.strong_tags import BITS_COLUMN, tag_mask as bits_tag_mask
+
+
+def _split_terms(value) -> List[str]:
+    """逗號分隔字串 -> 去空白的詞彙清單"""
+    if not isinstance(value, str) or not value:
+        return []
+    return [t.strip() for t in value.split(',') if t.strip()]
+
+
+class _TermIndex:
+    """逗號分隔欄位的倒排索引：詞彙 -> 列號布林矩陣的欄"""
+
+    def __init__(self, series: Optional[pd.Series], n_rows: int):
+        vocab: Dict[str, int] = {}
+        rows, cols = [], []
+        if series is not None:
+            for i, value in enumerate(series.tolist()):
+                for term in _split_terms(value):
+                    j = vocab.setdefault(term, len(vocab))
+                    rows.append(i)
+                    cols.append(j)
+
+        self.terms = list(vocab)
+        self.matrix = np.zeros((n_rows, len(vocab)), dtype=bool)
+        if rows:
+            self.matrix[rows, cols] = True
+
+    def match(self, text: str) -> np.ndarray:
+        """任一詞彙包含 text 的列 (等同在原字串上做子字串比對)"""
+        hit = np.fromiter((text in t for t in self.terms), dtype=bool, count=len(self.terms))
+        if not hit.any():
+            return np.zeros(self.matrix.shape[0], dtype=bool)
+        return self.matrix[:, hit].any(axis=1)
+
+
+class StrategyFilterEngine:
+    """
+    StrategyModule 的過濾引擎
+
+    用法:
+        engine = StrategyFilterEngine(full_df)
+        idx = engine.filter(search='台積', industry='半導體業', ranges={'RS強度': (80, 100)},
+                            tags=['三率三升'], tag_mode='and')
+        view = engine.materialize(idx, visible_cols)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n = len(df)
+
+        self._sid = self._str_array('sid')
+        self._sid_lower = np.array([s.lower() for s in self._sid], dtype=object)
+        self._name_lower = np.array([s.lower() for s in self._str_array('name')], dtype=object)
+        self._industry = self._str_array('industry')
+        self._sid_pos = {sid: i for i, sid in enumerate(self._sid)}
+
+        self.concepts = _TermIndex(df.get('sub_concepts'), self.n)
+        self.dj_subs = _TermIndex(df.get('dj_sub_ind'), self.n)
+        # 新版快照附有 強勢特徵_bits 位元欄，直接做位元運算；舊快照才退回解析字串
+        if BITS_COLUMN in df.columns:
+            self._tag_bits = df[BITS_COLUMN].fillna(0).to_numpy(dtype=np.uint64)
+            self.tags = None
+        else:
+            self._tag_bits = None
+            self.tags = _TermIndex(df.get('強勢特徵'), self.n)
+
+        # 數值欄一次轉成 float64；非數值欄在第一次被過濾時才轉換
+        self._floats: Dict[str, np.ndarray] = {
+            c: df[c].to_numpy(dtype='float64', na_value=np.nan)
+            for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+        }
+
+    def _str_array(self, col: str) -> np.ndarray:
+        if col not in self.df.columns:
+            return np.full(self.n, '', dtype=object)
+        return self.df[col].fillna('').astype(str).to_numpy(dtype=object)
+
+    def floats(self, col: str) -> Optional[np.ndarray]:
+        arr = self._floats.get(col)
+        if arr is None and col in self.df.columns:
+            arr = pd.to_numeric(self.df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            self._floats[col] = arr
+        return arr
+
+    # ----------------------
+    # 個別條件 -> 布林遮罩
+    # ----------------------
+    def search_mask(self, text: str) -> np.ndarray:
+        text = text.lower()
+        return np.fromiter(
+            (text in s or text in n for s, n in zip(self._sid_lower, self._name_lower)),
+            dtype=bool, count=self.n)
+
+    def sid_mask(self, sids: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(self.n, dtype=bool)
+        pos = [self._sid_pos[s] for s in sids if s in self._sid_pos]
+        mask[pos] = True
+        return mask
+
+    def range_mask(self, col: str, lo: float, hi: float) -> np.ndarray:
+        arr = self.floats(col)
+        if arr is None:
+            return np.zeros(self.n, dtype=bool)
+        # NaN 的比較結果為 False，與舊版行為一致 (缺值不入選)
+        return (arr >= lo) & (arr <= hi)
+
+    def tag_mask(self, tags: List[str], mode: str = 'and') -> np.ndarray:
+        if self._tag_bits is not None:
+            return bits_tag_mask(self._tag_bits, tags, mode)
+        masks = [self.tags.match(t) for t in tags]
+        if mode == 'and':
+            return np.logical_and.reduce(masks)
+        return np.logical_or.reduce(masks)
+
+    # ----------------------
+    # 組合
+    # ----------------------
+    def filter(self, search: str = '', industry: str = '', watchlist: Optional[Iterable[str]] = None,
+               concept: str = '', dj_sub: str = '', ranges: Optional[Dict[str, tuple]] = None,
+               tags: Optional[List[str]] = None, tag_mode: str = 'and') -> np.ndarray:
+        """
+        組合所有條件並回傳入選列的位置 (依原始順序)
+
+        Args:
+            watchlist: 自選股代號清單；給定時取代 industry 條件
+            ranges: {欄位: (min, max)}，只放有被使用者調整的欄位
+        """
+        mask = np.ones(self.n, dtype=bool)
+        if search:
+            mask &= self.search_mask(search)
+        if watchlist is not None:
+            mask &= self.sid_mask(watchlist)
+        elif industry:
+            mask &= self._industry == industry
+        if concept:
+            mask &= self.concepts.match(concept)
+        if dj_sub:
+            mask &= self.dj_subs.match(dj_sub)
+        for col, (lo, hi) in (ranges or {}).items():
+            mask &= self.range_mask(col, lo, hi)
+        if tags:
+            mask &= self.tag_mask(tags, tag_mode)
+        return np.flatnonzero(mask)
+
+    def materialize(self, idx: np.ndarray, cols: List[str]) -> pd.DataFrame:
+        """只取出入選列 × 顯示欄，insight 等不在快照內的欄位補空字串"""
+        src_cols = [c for c in cols if c in self.df.columns]
+        out = self.df.iloc[idx][src_cols]
+        if len(src_cols) != len(cols):
+            out = out.reindex(columns=cols, fill_value='')
+        return out